@@ -0,0 +1,112 @@
+import json
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+from mattenklopper.Adjectives import Adjectives
+from mattenklopper.Benchmark import Benchmark
+from mattenklopper.Participles import Participles
+from mattenklopper.RoodGroen import RoodGroen
+from mattenklopper.SyntheticCorpus import SyntheticCorpus
+
+#
+# Argument parsing
+#
+
+parser = argparse.ArgumentParser(description='mattenklopper Benchmark - measure the throughput of the case studies on a synthetic corpus')
+parser.add_argument('--corpus_path', type=str, nargs='?', default=None, help='Path to an existing Alpino corpus, if not given, a synthetic corpus is generated')
+parser.add_argument('--files', type=int, nargs='?', default=8, help='Number of files in the synthetic corpus')
+parser.add_argument('--sentences_per_file', type=int, nargs='?', default=1000, help='Number of sentences in every file of the synthetic corpus')
+parser.add_argument('--sentence_length', type=int, nargs='?', default=12, help='Number of words in a sentence of the synthetic corpus')
+parser.add_argument('--hit_density', type=float, nargs='?', default=0.3, help='Fraction of sentences with a perfective verb cluster in the synthetic corpus')
+parser.add_argument('--seed', type=int, nargs='?', default=1, help='Random seed of the synthetic corpus')
+parser.add_argument('--workers', type=int, nargs='?', default=1, help='Number of worker processes for the end to end benchmark')
+parser.add_argument('--repeat', type=int, nargs='?', default=5, help='Number of runs of every stage, the fastest run is kept')
+parser.add_argument('--closed_items_path', type=str, nargs='?', default='data/RoodGroen/closed_items.json', help='Path to the closed items of the RoodGroen case study')
+parser.add_argument('--baseline_path', type=str, nargs='?', default='data/Benchmark/baseline.json', help='Path to the stored baseline')
+parser.add_argument('--tolerance', type=float, nargs='?', default=0.4, help='Allowed relative drop in throughput before a stage counts as a regression')
+parser.add_argument('--absolute', action='store_true',
+					help='Compare inputs/s with the baseline directly instead of relative to the read stage, only meaningful if the baseline was stored on this machine')
+parser.add_argument('--update_baseline', action='store_true', help='Store the results as the new baseline instead of comparing against it')
+parser.add_argument('--output_path', type=str, nargs='?', default=None, help='Name of a JSON file the results are written to')
+
+args = parser.parse_args()
+
+# Start the performance counter
+t1 = time.perf_counter()
+
+with open(args.closed_items_path, "rt") as reader:
+    closed_class_items = json.loads(reader.read())
+
+# The configuration is stored with the baseline, results of different configurations cannot be compared
+configuration = { "corpus_path": args.corpus_path, "files": args.files, "sentences_per_file": args.sentences_per_file,
+                  "sentence_length": args.sentence_length, "hit_density": args.hit_density, "seed": args.seed,
+                  "workers": args.workers }
+
+with tempfile.TemporaryDirectory() as temporary_directory:
+    corpus_path = args.corpus_path
+    if corpus_path is None:
+        print(f"[Data] Generating synthetic corpus ({args.files} files, {args.sentences_per_file} sentences per file)")
+        corpus_path = os.path.join(temporary_directory, "corpus")
+        SyntheticCorpus(args.sentence_length, args.hit_density, args.seed).generate(corpus_path, args.files, args.sentences_per_file)
+
+    benchmark = Benchmark(corpus_path, args.repeat)
+    print(f"[Data] {benchmark.sentence_count} sentences, {benchmark.byte_count / 1024 / 1024:.1f} MB")
+
+    case_studies = { "RoodGroen": (RoodGroen(corpus_path, closed_class_items, args.workers), "red_green"),
+                     "Participles": (Participles(corpus_path, workers=args.workers), None),
+                     "Adjectives": (Adjectives(corpus_path, workers=args.workers), None) }
+
+    results = {}
+    peak_rss = {}
+    for name, (case_study, order) in case_studies.items():
+        print(f"[Benchmark] {name}")
+        xpath = case_study.query(order) if order is not None else case_study.query()
+        results[name] = benchmark.run(case_study, xpath)
+
+        for stage, measurement in results[name].items():
+            # Inputs are sentences, accepted sentences, trees or matched nodes, depending on the stage
+            print(f"    {stage:<12} {measurement['seconds']:8.3f} s {measurement['inputs']:8d} inputs {measurement['inputs_per_second']:12.0f} inputs/s " +
+                  f"{measurement['corpus_sentences_per_second']:12.0f} corpus sentences/s {measurement['corpus_mb_per_second']:8.1f} corpus MB/s")
+
+        # The peak includes the earlier case studies, it cannot be attributed to a single stage
+        peak_rss[name] = benchmark.peak_rss()
+        if peak_rss[name] is not None:
+            print(f"    peak RSS so far {peak_rss[name]:.1f} MB")
+
+report = { "configuration": configuration, "results": results, "peak_rss_mb": peak_rss }
+
+if args.output_path is not None:
+    Benchmark.save(args.output_path, report)
+
+t2 = time.perf_counter()
+
+if args.update_baseline:
+    Benchmark.save(args.baseline_path, report)
+    print(f"[Baseline] Stored baseline in {args.baseline_path}")
+    print(f'Finished in {t2-t1} seconds')
+    sys.exit(0)
+
+baseline = Benchmark.load(args.baseline_path)
+if baseline is None:
+    print(f"[Baseline] No baseline found at {args.baseline_path}, use --update_baseline to store one")
+elif baseline["configuration"] != configuration:
+    print("[Baseline] The baseline was measured with a different configuration, the results are not compared")
+else:
+    # A single run of a stage is easily disturbed by other work on the machine
+    if args.repeat < 3:
+        print(f"[Baseline] Only {args.repeat} run(s) per stage, throughput differences are likely noise")
+
+    regressions = Benchmark.compare(results, baseline["results"], args.tolerance, not args.absolute)
+    for regression in regressions:
+        print(f"[Regression] {regression}")
+
+    if len(regressions) > 0:
+        print(f'Finished in {t2-t1} seconds')
+        sys.exit(1)
+
+    print("[Baseline] No regressions")
+
+print(f'Finished in {t2-t1} seconds')
@@ -0,0 +1,27 @@
+import time
+import argparse
+
+from mattenklopper.CorpusIndex import CorpusIndex
+
+#
+# Argument parsing
+#
+
+parser = argparse.ArgumentParser(description='mattenklopper BuildIndex - build a sentence offset index for an Alpino corpus')
+parser.add_argument('alpino_corpus_path', type=str,
+					help='Path to the Alpino corpus files')
+parser.add_argument('--index_path', type=str, nargs='?', default='corpus.index', help='Name of the index file')
+
+args = parser.parse_args()
+
+# Start the performance counter
+t1 = time.perf_counter()
+
+print(f"[Index] Indexing {args.alpino_corpus_path}")
+index = CorpusIndex.build(args.alpino_corpus_path, args.index_path)
+print(f"[Index] Indexed {index.file_count()} files into {args.index_path}")
+index.close()
+
+t2 = time.perf_counter()
+
+print(f'Finished in {t2-t1} seconds')
@@ -0,0 +1,26 @@
+import time
+import argparse
+
+from mattenklopper.ColumnarCorpus import ColumnarCorpus
+
+#
+# Argument parsing
+#
+
+parser = argparse.ArgumentParser(description='mattenklopper ConvertColumnar - convert an Alpino corpus into the columnar format')
+parser.add_argument('alpino_corpus_path', type=str,
+					help='Path to the Alpino corpus files')
+parser.add_argument('--columnar_path', type=str, nargs='?', default='corpus.columnar', help='Name of the output directory')
+
+args = parser.parse_args()
+
+# Start the performance counter
+t1 = time.perf_counter()
+
+print(f"[Columnar] Converting {args.alpino_corpus_path}")
+corpus = ColumnarCorpus.convert(args.alpino_corpus_path, args.columnar_path)
+print(f"[Columnar] Converted {corpus.meta['sentences']} sentences ({corpus.meta['nodes']} nodes) into {args.columnar_path}")
+
+t2 = time.perf_counter()
+
+print(f'Finished in {t2-t1} seconds')
@@ -0,0 +1,39 @@
+import time
+import argparse
+
+from mattenklopper.Adjectives import Adjectives
+from mattenklopper.Participles import Participles
+from mattenklopper.RoodGroen import RoodGroen
+from mattenklopper.Shards import Shards
+from mattenklopper.Sinks import SINKS
+
+# Case studies whose outputs can be merged
+CASE_STUDIES = { "RoodGroen": RoodGroen, "Participles": Participles, "Adjectives": Adjectives }
+
+#
+# Argument parsing
+#
+
+parser = argparse.ArgumentParser(description='mattenklopper MergeShards - merge the output files of several shards in a deterministic order')
+parser.add_argument('case_study', type=str, choices=list(CASE_STUDIES.keys()),
+					help='The case study which produced the output files, used for the column types and to remove duplicates')
+parser.add_argument('input_paths', type=str, nargs='+',
+					help='Paths to the output files of the shards')
+parser.add_argument('--output_path', type=str, nargs='?', default='merged.csv', help='Name of the merged output file')
+parser.add_argument('--output_format', type=str, nargs='?', default='csv', choices=list(SINKS.keys()), help='Format of the merged output file')
+parser.add_argument('--batch_size', type=int, nargs='?', default=10000, help='Number of rows which are written at once')
+
+args = parser.parse_args()
+
+# Start the performance counter
+t1 = time.perf_counter()
+
+print(f"[Merge] Merging {len(args.input_paths)} files into {args.output_path}")
+case_study = CASE_STUDIES[args.case_study]
+count = Shards.merge(args.input_paths, args.output_path, args.output_format, case_study.SCHEMA, case_study.DUPLICATE_COLUMNS, args.batch_size)
+
+print("Found", count, "attestations")
+
+t2 = time.perf_counter()
+
+print(f'Finished in {t2-t1} seconds')
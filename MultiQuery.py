@@ -0,0 +1,102 @@
+import json
+import time
+import argparse
+import contextlib
+
+from mattenklopper.MultiCaseStudy import MultiCaseStudy
+from mattenklopper.RoodGroen import RoodGroen
+from mattenklopper.Participles import Participles
+from mattenklopper.Adjectives import Adjectives
+from mattenklopper.Sampler import Sampler
+from mattenklopper.Shards import Shards
+from mattenklopper.Sinks import SINKS
+
+#
+# Argument parsing
+#
+
+parser = argparse.ArgumentParser(description='mattenklopper MultiQuery - run the RoodGroen, Participles and Adjectives case studies in a single pass over the corpus')
+parser.add_argument('closed_items_path', type=str,
+					help='Path to the JSON file containing the closed items for the RoodGroen case study')
+parser.add_argument('alpino_corpus_path', type=str,
+					help='Path to the Alpino corpus files')
+parser.add_argument('--rood_groen_output_path', type=str, nargs='?', default='RoodGroenAnthe.csv', help='Name of the RoodGroen output file')
+parser.add_argument('--participles_output_path', type=str, nargs='?', default='ParticiplesAnthe.csv', help='Name of the Participles output file')
+parser.add_argument('--adjectives_output_path', type=str, nargs='?', default='AdjectivesAnthe.csv', help='Name of the Adjectives output file')
+parser.add_argument('--output_format', type=str, nargs='?', default='csv', choices=list(SINKS.keys()), help='Format of the output files')
+parser.add_argument('--batch_size', type=int, nargs='?', default=10000, help='Number of rows kept in memory before they are written to an output file')
+parser.add_argument('--workers', type=int, nargs='?', default=None, help='Number of worker processes (default: number of CPUs)')
+parser.add_argument('--chunk_size', type=int, nargs='?', default=16, help='Number of corpus files handed to a worker process at once')
+parser.add_argument('--index_path', type=str, nargs='?', default=None, help='Path to a sentence offset index of the corpus (see BuildIndex.py)')
+parser.add_argument('--cache_directory', type=str, nargs='?', default=None, help='Directory for the result cache, unchanged files are not processed again on a rerun')
+parser.add_argument('--cache_size', type=int, nargs='?', default=None, help='Maximum size of the result cache in MB')
+parser.add_argument('--stats_path', type=str, nargs='?', default='MultiQueryStats.json', help='Name of the JSON statistics report which is written at the end of the run')
+parser.add_argument('--max_hits', type=int, nargs='?', default=None, help='Stop as soon as this many hits were found (for pilot queries)')
+parser.add_argument('--sample', type=float, nargs='?', default=None, help='Only process a random fraction (between 0 and 1) of the corpus (for pilot queries)')
+parser.add_argument('--sample_unit', type=str, nargs='?', default='file', choices=Sampler.UNITS, help='Whether files or sentences are sampled')
+parser.add_argument('--seed', type=int, nargs='?', default=0, help='Random seed of the sample, the same seed always gives the same sample')
+parser.add_argument('--shard', type=str, nargs='?', default=None, help='Only process one shard of the corpus, e.g. 2/8 for the second of eight shards (see ShardCorpus.py)')
+parser.add_argument('--manifest_path', type=str, nargs='?', default=None, help='Path to the shard manifest, if not given, the shards are computed from the corpus directory')
+parser.add_argument('--journal_path', type=str, nargs='?', default=None, help='Path to a journal of finished files, if the run is interrupted, run it again with the same journal to resume where it stopped')
+parser.add_argument('--split_size', type=int, nargs='?', default=32, help='Plain XML files larger than this number of MB are split into ranges which are processed in parallel (0 disables splitting)')
+parser.add_argument('--read_ahead', type=int, nargs='?', default=None, help='Number of files every worker process reads ahead while it processes the current file (for corpora on network filesystems)')
+parser.add_argument('--read_ahead_size', type=int, nargs='?', default=256, help='Maximum number of MB every worker process reads ahead')
+
+args = parser.parse_args()
+
+# The cache size is given in MB
+cache_size = args.cache_size * 1024 * 1024 if args.cache_size is not None else None
+
+# The split and read-ahead sizes are given in MB as well
+split_size = args.split_size * 1024 * 1024 if args.split_size else None
+read_ahead_size = args.read_ahead_size * 1024 * 1024
+
+# Pilot queries only look at a random sample of the corpus
+sampler = Sampler(args.sample, args.sample_unit, args.seed) if args.sample is not None else None
+
+# Distributed runs only process their own part of the corpus
+shard = Shards.select(args.alpino_corpus_path, args.shard, args.manifest_path)
+
+# Start the performance counter
+t1 = time.perf_counter()
+
+print("[Data] Loading closed items")
+
+# We use the "closed items" class as a way to narrow down the search space
+with open(args.closed_items_path, "rt") as reader:
+    closed_class_items = json.loads(reader.read())
+
+# Register all case studies, the corpus is only read and parsed once for all of them
+multi_case_study = MultiCaseStudy(args.alpino_corpus_path, args.workers, args.chunk_size, args.index_path,
+                                  args.cache_directory, cache_size, args.stats_path, args.max_hits, sampler, shard, args.journal_path,
+                                  split_size, args.read_ahead, read_ahead_size)
+multi_case_study.register("rood_groen", RoodGroen(args.alpino_corpus_path, closed_class_items), "red_green")
+multi_case_study.register("participles", Participles(args.alpino_corpus_path))
+multi_case_study.register("adjectives", Adjectives(args.alpino_corpus_path))
+
+output_paths = { "rood_groen": args.rood_groen_output_path,
+                 "participles": args.participles_output_path,
+                 "adjectives": args.adjectives_output_path }
+
+print("[Filter]: Filtering red and green items, participles and adjectives")
+results = multi_case_study.filter(stream=True)
+
+counts = { name: 0 for name in output_paths }
+
+# Every case study gets its own output file, hits are written while the corpus is being filtered
+with contextlib.ExitStack() as stack:
+    sinks = {}
+    for name, output_path in output_paths.items():
+        print(f"[Output] Writing {args.output_format} file {output_path}")
+        sinks[name] = stack.enter_context(SINKS[args.output_format](output_path, multi_case_study.case_studies[name].SCHEMA, args.batch_size))
+
+    for name, hit in results:
+        sinks[name].write(hit)
+        counts[name] += 1
+
+for name, count in counts.items():
+    print(f"Found {count} attestations for {name}")
+
+t2 = time.perf_counter()
+
+print(f'Finished in {t2-t1} seconds')
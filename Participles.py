@@ -1,9 +1,14 @@
 import json
 import time
 import argparse
-import pandas as pd
+import itertools
 
 from mattenklopper.Participles import Participles
+from mattenklopper.ColumnarCorpus import ColumnarCorpus
+from mattenklopper.ColumnarQuery import ColumnarQuery
+from mattenklopper.Sampler import Sampler
+from mattenklopper.Shards import Shards
+from mattenklopper.Sinks import SINKS
 
 #
 # Argument parsing
@@ -13,40 +18,75 @@ parser = argparse.ArgumentParser(description='mattenklopper Participles - corpus
 parser.add_argument('alpino_corpus_path', type=str,
 					help='Path to the Alpino corpus files')
 parser.add_argument('--output_path', type=str, nargs='?', default='ParticiplesAnthe.csv', help='Name of the output file')
+parser.add_argument('--output_format', type=str, nargs='?', default='csv', choices=list(SINKS.keys()), help='Format of the output file')
+parser.add_argument('--batch_size', type=int, nargs='?', default=10000, help='Number of rows kept in memory before they are written to the output file')
+
+parser.add_argument('--workers', type=int, nargs='?', default=None, help='Number of worker processes (default: number of CPUs)')
+parser.add_argument('--chunk_size', type=int, nargs='?', default=16, help='Number of corpus files handed to a worker process at once')
+parser.add_argument('--index_path', type=str, nargs='?', default=None, help='Path to a sentence offset index of the corpus (see BuildIndex.py)')
+parser.add_argument('--cache_directory', type=str, nargs='?', default=None, help='Directory for the result cache, unchanged files are not processed again on a rerun')
+parser.add_argument('--cache_size', type=int, nargs='?', default=None, help='Maximum size of the result cache in MB')
+parser.add_argument('--stats_path', type=str, nargs='?', default=None, help='Name of the JSON statistics report which is written at the end of the run (default: the output path followed by .stats.json)')
+parser.add_argument('--max_hits', type=int, nargs='?', default=None, help='Stop as soon as this many hits were found (for pilot queries)')
+parser.add_argument('--sample', type=float, nargs='?', default=None, help='Only process a random fraction (between 0 and 1) of the corpus (for pilot queries)')
+parser.add_argument('--sample_unit', type=str, nargs='?', default='file', choices=Sampler.UNITS, help='Whether files or sentences are sampled')
+parser.add_argument('--seed', type=int, nargs='?', default=0, help='Random seed of the sample, the same seed always gives the same sample')
+parser.add_argument('--shard', type=str, nargs='?', default=None, help='Only process one shard of the corpus, e.g. 2/8 for the second of eight shards (see ShardCorpus.py)')
+parser.add_argument('--manifest_path', type=str, nargs='?', default=None, help='Path to the shard manifest, if not given, the shards are computed from the corpus directory')
+parser.add_argument('--journal_path', type=str, nargs='?', default=None, help='Path to a journal of finished files, if the run is interrupted, run it again with the same journal to resume where it stopped')
+parser.add_argument('--split_size', type=int, nargs='?', default=32, help='Plain XML files larger than this number of MB are split into ranges which are processed in parallel (0 disables splitting)')
+parser.add_argument('--read_ahead', type=int, nargs='?', default=None, help='Number of files every worker process reads ahead while it processes the current file (for corpora on network filesystems)')
+parser.add_argument('--read_ahead_size', type=int, nargs='?', default=256, help='Maximum number of MB every worker process reads ahead')
+parser.add_argument('--columnar_path', type=str, nargs='?', default=None, help='Path to a columnar version of the corpus (see ConvertColumnar.py), if given, the vectorised backend is used')
 
 args = parser.parse_args()
 
+# The columnar backend runs the whole query at once, options which work per file or per sentence do not apply to it
+if args.columnar_path is not None:
+    unsupported = [ f"--{name}" for name in [ "index_path", "cache_directory", "stats_path", "max_hits", "sample", "shard", "journal_path", "read_ahead" ]
+                    if getattr(args, name) is not None ]
+    if len(unsupported) > 0:
+        parser.error(f"{', '.join(unsupported)} cannot be combined with --columnar_path")
+
+# The cache size is given in MB
+cache_size = args.cache_size * 1024 * 1024 if args.cache_size is not None else None
+
+# The split and read-ahead sizes are given in MB as well
+split_size = args.split_size * 1024 * 1024 if args.split_size else None
+read_ahead_size = args.read_ahead_size * 1024 * 1024
+
+# Pilot queries only look at a random sample of the corpus
+sampler = Sampler(args.sample, args.sample_unit, args.seed) if args.sample is not None else None
+
+# Distributed runs only process their own part of the corpus
+shard = Shards.select(args.alpino_corpus_path, args.shard, args.manifest_path)
+
+# The statistics report is written next to the output file by default
+stats_path = args.stats_path if args.stats_path is not None else f"{args.output_path}.stats.json"
+
 # Start the performance counter
 t1 = time.perf_counter()
 
 # Find corpus hits
-participles = Participles(args.alpino_corpus_path)
+participles = Participles(args.alpino_corpus_path, workers=args.workers, chunk_size=args.chunk_size, index_path=args.index_path,
+                         cache_directory=args.cache_directory, cache_size=cache_size, stats_path=stats_path,
+                         max_hits=args.max_hits, sampler=sampler, shard=shard,
+                         journal_path=args.journal_path, split_size=split_size,
+                         read_ahead=args.read_ahead, read_ahead_size=read_ahead_size)
 print("[Filter]: Filtering for participles")
-results = participles.filter()
-
-print("Found", len(results), "attestations")
-
-print("[Pandas] Preparing output")
-
-def results_to_dataframe(results):
-    df_dict = []
-    for result in results:
-        row = {"sentence": result[0],
-               "participle": result[3][0],
-               "participle_lemma": result[3][1],
-               "file": result[1],
-               "sentence_id": result[2] }
-        df_dict.append(row)        
- 
-    return pd.DataFrame.from_dict(df_dict)
+if args.columnar_path is not None:
+    # Vectorised queries over the columnar corpus, the case study object is still used to create the hits
+    results = itertools.starmap(participles.record, ColumnarQuery(ColumnarCorpus(args.columnar_path), None).participles())
+else:
+    results = participles.filter(stream=True)
 
-# Convert results to dataframes
-df = results_to_dataframe(results)
+print(f"[Output] Writing {args.output_format} file {args.output_path}")
 
-print(f"[Pandas] Writing CSV file {args.output_path}")
+# Hits are written to the output file while the corpus is being filtered
+with SINKS[args.output_format](args.output_path, participles.SCHEMA, args.batch_size) as sink:
+    count = sink.write_all(results)
 
-# Write to CSV
-df.to_csv(args.output_path, index=False)
+print("Found", count, "attestations")
 
 t2 = time.perf_counter()
 
@@ -0,0 +1,40 @@
+import json
+import argparse
+
+from mattenklopper.QueryServer import QueryServer
+
+#
+# Argument parsing
+#
+
+parser = argparse.ArgumentParser(description='mattenklopper QueryServer - answer queries over HTTP with warm worker processes')
+parser.add_argument('alpino_corpus_path', type=str,
+					help='Path to the Alpino corpus files')
+parser.add_argument('--closed_items_path', type=str, nargs='?', default=None, help='Path to the JSON file containing the closed items of the RoodGroen case study')
+parser.add_argument('--host', type=str, nargs='?', default='127.0.0.1', help='Address to listen on (default: only local clients can connect)')
+parser.add_argument('--port', type=int, nargs='?', default=8000, help='Port to listen on')
+
+parser.add_argument('--workers', type=int, nargs='?', default=None, help='Number of worker processes (default: number of CPUs)')
+parser.add_argument('--chunk_size', type=int, nargs='?', default=16, help='Number of corpus files handed to a worker process at once')
+parser.add_argument('--index_path', type=str, nargs='?', default=None, help='Path to a sentence offset index of the corpus (see BuildIndex.py)')
+parser.add_argument('--split_size', type=int, nargs='?', default=32, help='Plain XML files larger than this number of MB are split into ranges which are processed in parallel (0 disables splitting)')
+parser.add_argument('--read_ahead', type=int, nargs='?', default=None, help='Number of files every worker process reads ahead while it processes the current file (for corpora on network filesystems)')
+parser.add_argument('--read_ahead_size', type=int, nargs='?', default=256, help='Maximum number of MB every worker process reads ahead')
+
+args = parser.parse_args()
+
+# The split and read-ahead sizes are given in MB
+split_size = args.split_size * 1024 * 1024 if args.split_size else None
+read_ahead_size = args.read_ahead_size * 1024 * 1024
+
+closed_class_items = None
+if args.closed_items_path is not None:
+    print("[Data] Loading closed items")
+
+    with open(args.closed_items_path, "rt") as reader:
+        closed_class_items = json.loads(reader.read())
+
+print(f"[Server] Loading {args.alpino_corpus_path}")
+query_server = QueryServer(args.alpino_corpus_path, closed_class_items, args.workers, args.chunk_size, args.index_path,
+                           split_size, args.read_ahead, read_ahead_size)
+query_server.serve(args.host, args.port)
@@ -0,0 +1,33 @@
+import time
+import argparse
+
+from mattenklopper.Shards import Shards
+
+#
+# Argument parsing
+#
+
+parser = argparse.ArgumentParser(description='mattenklopper ShardCorpus - split the files of an Alpino corpus into shards of roughly equal size')
+parser.add_argument('alpino_corpus_path', type=str,
+					help='Path to the Alpino corpus files')
+parser.add_argument('shard_count', type=int,
+					help='Number of shards')
+parser.add_argument('--manifest_path', type=str, nargs='?', default='shards.json', help='Name of the manifest file')
+
+args = parser.parse_args()
+
+# Start the performance counter
+t1 = time.perf_counter()
+
+print(f"[Shards] Splitting {args.alpino_corpus_path} into {args.shard_count} shards")
+shards = Shards.create(args.alpino_corpus_path, args.shard_count)
+shards.save(args.manifest_path)
+
+for number, (shard, size) in enumerate(zip(shards.shards, shards.sizes), start=1):
+    print(f"[Shards] Shard {number}/{args.shard_count}: {len(shard)} files, {size / 1024 / 1024:.1f} MB")
+
+print(f"[Shards] Wrote manifest {args.manifest_path}")
+
+t2 = time.perf_counter()
+
+print(f'Finished in {t2-t1} seconds')
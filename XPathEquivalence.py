@@ -0,0 +1,57 @@
+import sys
+import argparse
+
+from mattenklopper.Constants import Constants
+from mattenklopper.CorpusFile import CorpusFile
+from mattenklopper.XPathOptimiser import XPathOptimiser
+
+#
+# Argument parsing
+#
+
+parser = argparse.ArgumentParser(description='mattenklopper XPathEquivalence - check that the optimised general xpaths return the same hits as the original ones')
+parser.add_argument('alpino_corpus_path', type=str,
+					help='Path to the Alpino corpus files used as sample sentences')
+parser.add_argument('--max_sentences', type=int, nargs='?', default=10000, help='Maximum number of sample sentences')
+
+args = parser.parse_args()
+
+print("[Data] Loading sample sentences")
+
+sentences = []
+for corpus_file in CorpusFile.find(args.alpino_corpus_path):
+    for filename, splitter in corpus_file.splitters():
+        for start, end in splitter.spans():
+            sentences.append(splitter.xml(start, end))
+            if len(sentences) >= args.max_sentences:
+                break
+
+        # Archives contain more than one XML file
+        if len(sentences) >= args.max_sentences:
+            break
+
+    if len(sentences) >= args.max_sentences:
+        break
+
+print(f"[Data] Loaded {len(sentences)} sentences")
+
+failed = False
+for name, xpath in Constants.GENERAL_XPATHS.items():
+    original = XPathOptimiser.normalise(xpath)
+    optimised = XPathOptimiser.optimise(xpath)
+
+    for path in XPathOptimiser.absolute_paths(original):
+        print(f"[{name}] Absolute path inside a predicate: {path}")
+
+    if original == optimised:
+        print(f"[{name}] Not rewritten")
+        continue
+
+    differences = XPathOptimiser.check_equivalence(original, optimised, sentences)
+    if len(differences) > 0:
+        failed = True
+        print(f"[{name}] NOT EQUIVALENT on {len(differences)} sentences, e.g. sentence {differences[0]}")
+    else:
+        print(f"[{name}] Equivalent on all {len(sentences)} sentences")
+
+sys.exit(1 if failed else 0)
@@ -1,25 +1,45 @@
 from .CaseStudy import CaseStudy
 from .Constants import Constants
+from .HitSchema import HitSchema
+from .XPathCache import XPathCache
 from lxml import etree as ET
+from typing import Iterator
 
 class Adjectives(CaseStudy):
-    def filter(self) -> list[tuple]:
+    # Output columns and their types
+    SCHEMA = HitSchema({ "sentence": "text", "adjective": "string", "adjective_lemma": "category", "file": "category", "sentence_id": "string" })
+
+    def filter(self, stream: bool=False) -> list[tuple] | Iterator[tuple]:
         """Apply the filtering operation for adjectives search
 
+        Args:
+            stream (bool): if True, return a generator which yields hits as they are found
+
+        Returns:
+            list[tuple] | Iterator[tuple]: list (or generator) of hits, with the columns of Adjectives.SCHEMA
+        """
+
+        return super().filter(self.query(), stream)
+
+    def query(self) -> str:
+        """Get the general xpath for the adjectives search, without running it
+
         Returns:
-            list[tuple]: list of tuples containing: (sentence, (participle, participle lemma), filename)
+            str: the general xpath
         """
 
         # We use the general XPATH to look for sentences with an adjective
         general_xpath = Constants.GENERAL_XPATHS["adjectives"]
 
-        return super().filter(general_xpath)
+        return general_xpath
 
-    def secondary_processing(self, element : ET) -> list[tuple]:
+    def secondary_processing(self, element : ET, filename : str = "??.xml", sentence_id : str="??") -> list[tuple]:
         """Apply secondary processing for the participles search
 
         Args:
             element (ET): the element containing the matched sentence
+            filename (str): the name of the parsed file
+            sentence_id (str): the name of this sentence
 
         Returns:
             tuple: a tuple containing the participle and participle lemma
@@ -27,14 +47,19 @@ class Adjectives(CaseStudy):
 
         # The following two xpaths are used to find the specific participles and auxiliaries
         # The query is the same for both orders, only the operators are different
-        adjective_xpath = Constants.SPECIFIC_XPATHS["adjectives"]
+        adjective_xpath = XPathCache.compiled(Constants.SPECIFIC_XPATHS["adjectives"])
 
         matches = []
 
-        for adjective_match in element.xpath(adjective_xpath):
+        for adjective_match in adjective_xpath(element):
             adjective = adjective_match.get('word')
             adjective_lemma = adjective_match.get('lemma')
 
             matches.append((adjective, adjective_lemma))
 
         return matches
+
+    def record(self, sentence: str, filename: str, sentence_id: str, data: tuple) -> tuple:
+        adjective, adjective_lemma = data
+
+        return sentence, adjective, adjective_lemma, filename, sentence_id
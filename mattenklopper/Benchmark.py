@@ -0,0 +1,246 @@
+from lxml import etree as ET
+from .CaseStudy import CaseStudy
+from .CorpusFile import CorpusFile
+from .XPathCache import XPathCache
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+# Peak memory usage can only be measured on unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class Benchmark:
+    # The stages of a query, in the order in which they run
+    STAGES = [ "read", "prefilter", "parse", "xpath", "secondary", "end_to_end" ]
+
+    def __init__(self, corpus_directory: str, repeat: int=5) -> None:
+        """Benchmark object which measures the throughput of every stage of a case study, and of the case study as a whole
+
+        Every stage is timed on its own, on the input the previous stages would give it.
+        Its throughput is given per input it processed (e.g. accepted sentences for parsing, matched nodes for secondary processing),
+        and per sentence and MB of the whole corpus, which shows how much of the total time of a query the stage takes.
+        Each measurement is repeated and the fastest run is kept, which makes the numbers less noisy.
+
+        Args:
+            corpus_directory (str): the directory where the Alpino-compatible corpus is stored
+            repeat (int): the number of times every stage is run
+        """
+
+        self.corpus_directory = corpus_directory
+        self.repeat = repeat
+
+        self.files = CorpusFile.find(corpus_directory)
+        if len(self.files) == 0:
+            raise Exception("Corpus directory contains no XML files")
+
+        # Corpus size, so every stage can be reported in sentences/s and MB/s
+        self.sentence_count = 0
+        self.byte_count = 0
+        for corpus_file in self.files:
+            for _, splitter in corpus_file.splitters():
+                self.sentence_count += sum(1 for _ in splitter.spans())
+                self.byte_count += len(splitter.buffer)
+
+    @staticmethod
+    def peak_rss() -> float | None:
+        """Get the peak resident set size of this process and its (finished) worker processes
+
+        The operating system only keeps the highest value since the process started, so this is the peak of everything that ran so far,
+        not of a single stage.
+
+        Returns:
+            float | None: the peak RSS in MB, or None if it cannot be measured on this platform
+        """
+
+        if resource is None:
+            return None
+
+        peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+        # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+        if sys.platform == "darwin":
+            return peak / 1024 / 1024
+
+        return peak / 1024
+
+    def measure(self, function) -> tuple[float, object]:
+        # Run a stage several times, keep the fastest time
+        best = None
+        for _ in range(self.repeat):
+            t1 = time.perf_counter()
+            result = function()
+            t2 = time.perf_counter()
+
+            best = t2 - t1 if best is None else min(best, t2 - t1)
+
+        return best, result
+
+    def spans(self, case_study: CaseStudy, accepted_only: bool) -> list[bytes]:
+        # The raw XML of all (accepted) sentences in the corpus
+        sentences = []
+        for corpus_file in self.files:
+            for _, splitter in corpus_file.splitters():
+                # The same candidates as CaseStudy.filter_single, i.e. with the keyword scanner if the case study uses it
+                spans = case_study.candidate_spans(splitter) if accepted_only else splitter.spans()
+                for start, end in spans:
+                    if not accepted_only or case_study.accepts(splitter, start, end):
+                        sentences.append(splitter.xml(start, end))
+
+        return sentences
+
+    def run(self, case_study: CaseStudy, xpath: str) -> dict:
+        """Benchmark every stage of a case study
+
+        Args:
+            case_study (CaseStudy): the case study object
+            xpath (str): the general xpath of the case study
+
+        Returns:
+            dict: stage -> { "seconds", "inputs", "inputs_per_second", "corpus_sentences_per_second", "corpus_mb_per_second", "items" }
+        """
+
+        case_study.prepare(xpath)
+        results = {}
+
+        def read() -> int:
+            # Splitting the corpus into sentences
+            count = 0
+            for corpus_file in self.files:
+                for _, splitter in corpus_file.splitters():
+                    for start, end in splitter.spans():
+                        splitter.sentence(start, end)
+                        count += 1
+            return count
+
+        def prefilter() -> int:
+            # Keyword scanner, attribute prefilter and closed class items, as in CaseStudy.filter_single
+            count = 0
+            for corpus_file in self.files:
+                for _, splitter in corpus_file.splitters():
+                    count += sum(1 for start, end in case_study.candidate_spans(splitter) if case_study.accepts(splitter, start, end))
+            return count
+
+        sentences = self.spans(case_study, accepted_only=True)
+        parse = lambda: [ ET.fromstring(sentence) for sentence in sentences ]
+
+        trees = parse()
+        query = XPathCache.compiled(case_study.xpath)
+        xpath_stage = lambda: [ (tree, element) for tree in trees for element in query(tree) ]
+
+        matches = xpath_stage()
+
+        def secondary() -> int:
+            count = 0
+            for tree, element in matches:
+                sentence_element = tree.find("sentence")
+                if case_study.secondary_processing(element, "benchmark", sentence_element.get("sentid")) is not None:
+                    count += 1
+            return count
+
+        def end_to_end() -> int:
+            # Worker processes, scheduling and result collection included
+            return sum(1 for _ in case_study.filter_stream(self.files))
+
+        # Every stage with the number of inputs it processes: sentences, accepted sentences, trees or matched nodes
+        stages = { "read": (read, self.sentence_count),
+                   "prefilter": (prefilter, self.sentence_count),
+                   "parse": (lambda: len(parse()), len(sentences)),
+                   "xpath": (lambda: len(xpath_stage()), len(trees)),
+                   "secondary": (secondary, len(matches)),
+                   "end_to_end": (end_to_end, self.sentence_count) }
+
+        for stage in self.STAGES:
+            function, inputs = stages[stage]
+
+            # Progress bars and sanity check messages would end up in the timings
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                seconds, items = self.measure(function)
+
+            results[stage] = { "seconds": seconds,
+                               "inputs": inputs,
+                               "inputs_per_second": inputs / seconds if seconds > 0 else None,
+                               "corpus_sentences_per_second": self.sentence_count / seconds if seconds > 0 else None,
+                               "corpus_mb_per_second": self.byte_count / 1024 / 1024 / seconds if seconds > 0 else None,
+                               "items": items }
+
+        return results
+
+    @staticmethod
+    def compare(results: dict, baseline: dict, tolerance: float=0.4, relative: bool=True) -> list[str]:
+        """Compare benchmark results with a stored baseline
+
+        A stage regresses if its throughput drops more than the tolerance below the baseline,
+        or if it processes a different number of items (i.e. the results changed).
+
+        The baseline is usually measured on another machine. With relative thresholds, the throughput of every stage is divided by
+        the throughput of the read stage of the same run, which cancels out most of the difference in speed between machines.
+        The read stage itself is then only checked for its number of items.
+
+        Args:
+            results (dict): case study -> stage -> measurements, as returned by run
+            baseline (dict): the baseline, in the same format
+            tolerance (float): the allowed relative drop in throughput
+            relative (bool): if True, compare throughput relative to the read stage, if False, compare inputs/s directly
+
+        Returns:
+            list[str]: a description of every regression
+        """
+
+        def throughput(stages: dict, stage: str) -> float | None:
+            inputs_per_second = stages[stage].get("inputs_per_second")
+            if not relative or inputs_per_second is None:
+                return inputs_per_second
+
+            reference = stages.get("read", {}).get("inputs_per_second")
+            return inputs_per_second / reference if reference else None
+
+        unit = "x read" if relative else "inputs/s"
+        precision = 3 if relative else 0
+
+        regressions = []
+        for case_study, stages in results.items():
+            for stage, measurement in stages.items():
+                if case_study not in baseline or stage not in baseline[case_study]:
+                    continue
+
+                reference = baseline[case_study][stage]
+
+                if measurement["items"] != reference["items"]:
+                    regressions.append(f"{case_study}/{stage}: {measurement['items']} items instead of {reference['items']}")
+
+                # The read stage is the yardstick of the others
+                if relative and stage == "read":
+                    continue
+
+                current = throughput(stages, stage)
+                expected = throughput(baseline[case_study], stage)
+                if current is None or expected is None:
+                    continue
+
+                if current < expected * (1 - tolerance):
+                    regressions.append(f"{case_study}/{stage}: {current:.{precision}f} {unit} instead of {expected:.{precision}f} {unit}")
+
+        return regressions
+
+    @staticmethod
+    def load(baseline_path: str) -> dict | None:
+        if not os.path.exists(baseline_path):
+            return None
+
+        with open(baseline_path, "rt") as reader:
+            return json.loads(reader.read())
+
+    @staticmethod
+    def save(baseline_path: str, baseline: dict) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+
+        with open(baseline_path, "wt") as writer:
+            writer.write(json.dumps(baseline, indent=4))
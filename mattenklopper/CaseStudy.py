@@ -1,21 +1,57 @@
 from flashtext import KeywordProcessor
 from pathlib import Path
-from tqdm.auto import tqdm
-from typing import Callable
+from concurrent.futures import Future
+from typing import Callable, Iterable, Iterator
 from io import BytesIO
 from lxml import etree as ET
-
-import concurrent.futures
-
+from .CorpusFile import CorpusFile
+from .CorpusIndex import CorpusIndex
+from .HitSchema import HitSchema
+from .Journal import Journal
+from .KeywordScanner import KeywordScanner
+from .ResultCache import ResultCache
+from .RunStatistics import RunStatistics
+from .Sampler import Sampler
+from .Scheduler import Scheduler
+from .SentenceSplitter import SentenceSplitter
+from .XPathCache import XPathCache
+from .XPathConstraints import XPathConstraints
+from .XPathOptimiser import XPathOptimiser
+
+import json
 import os.path
+import time
 
 class CaseStudy:
-    def __init__(self, corpus_directory: str, closed_class_items: dict=None) -> None:
+    # Increase this number whenever secondary_processing changes, so cached results of the old version are not reused
+    SECONDARY_PROCESSING_VERSION = 3
+    # Output columns and their types, a hit is a tuple with one value for every column (see record)
+    SCHEMA = HitSchema({ "sentence": "text", "file": "category", "sentence_id": "string", "data": "object" })
+    # Output columns which identify duplicate hits within a sentence, also used when merging output files
+    DUPLICATE_COLUMNS = None
+
+    def __init__(self, corpus_directory: str, closed_class_items: dict=None, workers: int=None, chunk_size: int=16, index_path: str=None,
+                 cache_directory: str=None, cache_size: int=None, stats_path: str=None, max_hits: int=None, sampler: Sampler=None,
+                 shard: set[str]=None, journal_path: str=None, split_size: int=32 * 1024 * 1024,
+                 read_ahead: int=None, read_ahead_size: int=256 * 1024 * 1024) -> None:
         """Case study object which provides an abstraction for individual case studies
 
         Args:
             corpus_directory (str): the directory where the Alpino-compatible corpus is stored, all XML files in here will be processed
             closed_class_items (dict): a dictionary specifying the lexical items that should definitely be part of the sentence in order for a match to occur
+            workers (int): the number of worker processes, defaults to the number of CPUs
+            chunk_size (int): the number of files which are handed to a worker process at once
+            index_path (str): path to a sentence offset index of the corpus (see CorpusIndex.build), if given, only candidate sentences are read
+            cache_directory (str): directory for the result cache, if given, files which have not changed since the previous run with the same query are not processed again
+            cache_size (int): maximum size of the result cache in bytes, if None, the cache is never trimmed
+            stats_path (str): path of the JSON statistics report which is written at the end of every run, if None, no report is written
+            max_hits (int): stop as soon as this many hits were found and cancel the remaining work, if None, the whole corpus is processed
+            sampler (Sampler): if given, only a reproducible random sample of the corpus files or sentences is processed
+            shard (set[str]): names of the corpus files to process (see Shards), if None, all files are processed
+            journal_path (str): path to a journal of finished files and their hits, if given, a run which was interrupted resumes where it stopped
+            split_size (int): plain XML files larger than this number of bytes are split into sentence-aligned ranges which are processed in parallel, if None, files are never split
+            read_ahead (int): the number of files every worker process reads ahead while it processes the current file (see Prefetcher), if None, files are not read ahead
+            read_ahead_size (int): the maximum number of bytes every worker process reads ahead
         """
 
         # Check if corpus directory exists
@@ -25,75 +61,439 @@ class CaseStudy:
         # Save the corpus directory
         self.corpus_directory = corpus_directory
 
-        # Keyword processor
+        # Save the closed class items, the corpus index needs them for its own prefilter
+        self.closed_class_items = closed_class_items
+
+        # Check if the corpus index exists
+        if index_path is not None and not os.path.exists(index_path):
+            raise FileNotFoundError(index_path)
+
+        self.index_path = index_path
+
+        # Keyword processor, and a keyword scanner which finds the candidate sentences of a whole file in a single pass
         if closed_class_items is not None:
             self.keyword_processor = KeywordProcessor()
             self.keyword_processor.add_keywords_from_dict(closed_class_items)
+            self.keyword_scanner = KeywordScanner([ keyword for keyword_list in closed_class_items.values() for keyword in keyword_list ])
         else:
             self.keyword_processor = None
+            self.keyword_scanner = None
+
+        if split_size is not None and split_size < 1:
+            raise ValueError("The split size should be at least 1 byte")
+
+        # Large files are split, so a single file does not keep one worker busy while the others are idle
+        self.split_size = split_size
+
+        if read_ahead is not None and read_ahead < 1:
+            raise ValueError("The read-ahead window should be at least 1 file")
+
+        if read_ahead_size < 1:
+            raise ValueError("The read-ahead size should be at least 1 byte")
+
+        # On network filesystems, reading the next files while the current one is processed hides the latency of the reads
+        self.read_ahead = read_ahead
+        self.read_ahead_size = read_ahead_size
+
+        # Scheduler which distributes the corpus files over the worker processes
+        # A chunk never holds more than one range of a split file, so the ranges end up with different workers
+        self.scheduler = Scheduler(workers, chunk_size, split_size)
+
+        # Cache of per-file hits from previous runs
+        if cache_directory is not None:
+            self.result_cache = ResultCache(cache_directory, cache_size)
+        else:
+            self.result_cache = None
+
+        # Counters and timers of the current run, every worker process collects its own and they are merged afterwards
+        self.statistics = RunStatistics()
+        self.stats_path = stats_path
+
+        if max_hits is not None and max_hits < 1:
+            raise ValueError("The maximum number of hits should be at least 1")
 
-    def filter(self, xpath: str) -> list[tuple]:
+        # Pilot queries only look at part of the corpus
+        self.max_hits = max_hits
+        self.sampler = sampler
+
+        # When the corpus is split over several machines, this run only processes its own shard
+        self.shard = shard
+
+        # Finished files are journaled, so long runs can be resumed
+        self.journal_path = journal_path
+
+        # Set by the query server (see QueryServer): the query from which its warm worker processes build their own copy of this case study
+        self.warm_query = None
+
+    def filter(self, xpath: str, stream: bool=False) -> list[tuple] | Iterator[tuple]:
         """Filter Alpino XML files with the given xpath string
 
         Args:
             xpath (str): the xpath string which matches the desired syntactic phenomena
+            stream (bool): if True, return a generator which yields hits as soon as the workers find them instead of a list
 
         Raises:
             Exception: if corpus directory contains no XML files
 
         Returns:
-            list[tuple]: list of corpus hits with the given syntactic structure
+            list[tuple] | Iterator[tuple]: list (or generator, if streaming) of corpus hits with the given syntactic structure
         """
 
-        # Make xpath query relative, because we will be executing it on subnodes if low_memory_usage
-        # Cf. https://stackoverflow.com/a/74798156/1150683
-        xpath = f".{xpath}"
+        self.prepare(xpath)
+
+        if self.index_path is not None:
+            hits = self.filter_index()
+        else:
+            # Recursively find all Alpino XML files, including compressed files and archives
+            files = CorpusFile.find(self.corpus_directory)
+
+            if len(files) == 0:
+                raise Exception("Corpus directory contains no XML files")
 
-        # Rewrite Gretel XML query to be lxml compatible
-        # Cf. https://stackoverflow.com/a/74797463/1150683
-        xpath = xpath.replace("number(@begin)", "@begin")
+            hits = self.filter_stream(files)
+
+        # Streaming mode: hand the generator to the caller, nothing is gathered here
+        if stream:
+            return hits
+
+        return list(hits)
+
+    def prepare(self, xpath: str) -> None:
+        """Set the xpath which this case study will run, without running it yet
+
+        Args:
+            xpath (str): the xpath string which matches the desired syntactic phenomena
+        """
+
+        # Make the GrETEL query relative and rewrite it into a form lxml can evaluate efficiently
+        xpath = XPathOptimiser.optimise(xpath)
 
         # Set the xpath that we will be using
         self.xpath = xpath
 
-        # Recursively find all Alpino XML files
-        files = list(Path(self.corpus_directory).rglob("*.xml"))
+        # The attribute values which any matching sentence must contain, derived from the xpath
+        # Sentences without them can be skipped before any XML is parsed
+        self.constraints = XPathConstraints(xpath)
 
-        if len(files) == 0:
-            raise Exception("Corpus directory contains no XML files")
+    def filter_stream(self, files: list[CorpusFile]) -> Iterator[tuple]:
+        """Filter the given Alpino XML files and yield hits as soon as the workers find them
 
-        # Turn all files into Paths
-        files = [ Path(file) for file in files]
+        Args:
+            files (list[CorpusFile]): the Alpino XML files to process
 
-        # Register a tqdm progress bar
-        progress_bar = tqdm(total=len(files), desc='Query progress')
+        Returns:
+            Iterator[tuple]: generator of corpus hits with the given syntactic structure
+        """
 
-        # Start a processing pool
-        with concurrent.futures.ProcessPoolExecutor() as executor:
-            # For each file, spawn a new process
-            futures = [ executor.submit(self.filter_single, file) for file in files ]
+        # Every file is processed as a whole, or in ranges if it is large
+        tasks = list(self.select([ (file, None) for file in files ]))
+        total = sum(file.size() for file, _ in tasks)
 
-            output = []
-            # Loop over future results as they become available
-            for future in concurrent.futures.as_completed(futures):
-                progress_bar.update(n=1)  # Increments counter
+        return self.run(self.split(tasks), total)
 
-                result = future.result()
-                # The result of the filter_single method can be empty
-                # We check for an empty result and only save actual results
-                if len(result) == 0:
-                    continue
-                
-                # Add the found results to the current results
-                output = output + result
+    def filter_tasks(self, tasks: list[tuple[CorpusFile, list]]) -> Iterator[tuple]:
+        """Filter tasks which were already split (see CaseStudy.split) and yield hits as soon as the workers find them
+
+        A query server splits the corpus once and reuses the same tasks for every query.
+
+        Args:
+            tasks (list[tuple[CorpusFile, list]]): the Alpino XML files (or ranges of them) to process, with their sentence spans
+
+        Returns:
+            Iterator[tuple]: generator of corpus hits with the given syntactic structure
+        """
+
+        tasks = list(self.select(tasks))
+        total = sum(Scheduler.weight(file, spans) for file, spans in tasks)
+
+        return self.run(tasks, total)
+
+    def filter_index(self) -> Iterator[tuple]:
+        """Filter only the candidate sentences listed in the corpus index and yield hits as soon as the workers find them
+
+        The closed class items and the attribute constraints of the xpath are looked up in the index,
+        so the corpus does not have to be crawled and only sentences which satisfy both are read.
+
+        Returns:
+            Iterator[tuple]: generator of corpus hits with the given syntactic structure
+        """
+
+        index = CorpusIndex(self.index_path)
+
+        # Spans of files which changed after indexing would point at the wrong sentences
+        index.check(self.corpus_directory)
+
+        # Files without candidate sentences are never touched
+        tasks = index.candidates(self.corpus_directory, self.keywords(), self.constraints)
+
+        return self.run(self.split(self.select(tasks)))
+
+    def split(self, tasks: Iterable[tuple[Path | CorpusFile, list]]) -> Iterator[tuple[CorpusFile, list]]:
+        """Split the tasks of large files into several smaller tasks, which can be processed by different workers
+
+        Files without spans are split into sentence-aligned byte ranges (see CorpusFile.split),
+        the spans of files with known spans are divided into groups which cover at most split_size bytes.
+
+        Args:
+            tasks (Iterable[tuple[Path | CorpusFile, list]]): the Alpino XML files to process, with their sentence spans
+
+        Yields:
+            tuple[CorpusFile, list]: the tasks after splitting
+        """
+
+        for pfin, spans in tasks:
+            if not isinstance(pfin, CorpusFile):
+                pfin = CorpusFile(pfin)
+
+            if self.split_size is None:
+                yield pfin, spans
+                continue
+
+            if spans is None:
+                ranges = pfin.split(self.split_size)
+                if len(ranges) > 1:
+                    self.statistics.count("split_files")
+
+                for file_range in ranges:
+                    yield file_range, None
+                continue
+
+            # Group consecutive spans, a span which is larger than split_size gets a group of its own
+            group = []
+            group_size = 0
+            for start, end in spans:
+                if len(group) > 0 and group_size + end - start > self.split_size:
+                    yield pfin, group
+
+                    group = []
+                    group_size = 0
+
+                group.append((start, end))
+                group_size += end - start
+
+            if len(group) > 0 or len(spans) == 0:
+                yield pfin, group
+
+    def select(self, tasks: Iterable[tuple[Path | CorpusFile, list]]) -> Iterator[tuple[Path | CorpusFile, list]]:
+        """Select the files which are part of the shard and of the sample, if files are sampled
+
+        Args:
+            tasks (Iterable[tuple[Path | CorpusFile, list]]): the Alpino XML files to process, with their sentence spans
+
+        Yields:
+            tuple[Path | CorpusFile, list]: the tasks of the selected files
+        """
+
+        for task in tasks:
+            if self.shard is not None and self.unit_name(task[0]) not in self.shard:
+                continue
+
+            if self.sampler is None or not self.sampler.samples_files() or self.sampler.keep(self.unit_name(task[0])):
+                yield task
+
+    def unit_name(self, pfin: Path | CorpusFile) -> str:
+        """Get the name which identifies a corpus file in a sample or a shard
+
+        Args:
+            pfin (Path | CorpusFile): the corpus file
+
+        Returns:
+            str: the path of the file relative to the corpus directory, so samples do not depend on where the corpus is stored
+        """
+
+        if not isinstance(pfin, CorpusFile):
+            pfin = CorpusFile(pfin)
+
+        return pfin.relative_name(self.corpus_directory)
+
+    def keywords(self) -> list[str] | None:
+        """Get all closed class items as a flat list
+
+        Returns:
+            list[str] | None: the closed class items, or None if every sentence should be considered
+        """
+
+        if self.closed_class_items is None:
+            return None
+
+        return [ keyword for keyword_list in self.closed_class_items.values() for keyword in keyword_list ]
+
+    def run(self, tasks: Iterator[tuple[Path, list]], total: int=None) -> Iterator[tuple]:
+        """Hand the given files to the scheduler and yield their hits
+
+        Args:
+            tasks (Iterator[tuple[Path, list]]): the Alpino XML files to process, with the sentence spans to check (None for all sentences)
+            total (int): the number of bytes to process, if known in advance
+
+        Yields:
+            tuple: corpus hits with the given syntactic structure
+        """
+
+        # Key which identifies this query in the result cache
+        self.query_key = self.get_query_key()
+
+        # The statistics of the workers are merged into these by the scheduler
+        self.statistics = RunStatistics()
+        t1 = time.perf_counter()
+
+        # Files which were finished by an earlier, interrupted run are taken from the journal
+        journal = None
+        finished = None
+        if self.journal_path is not None:
+            journal = Journal(self.journal_path, self.query_key)
+            tasks, finished = self.resume(journal, tasks)
+
+            if total is not None:
+                total -= sum(Scheduler.weight(file, spans) for file, spans, _ in finished)
+
+        results = self.scheduler.run(self, tasks, total, self.warm_query)
+        hits = self.collect(results, journal, finished)
+        try:
+            hit_count = 0
+            for hit in hits:
+                yield hit
+
+                hit_count += 1
+                if self.max_hits is not None and hit_count >= self.max_hits:
+                    break
+        finally:
+            # Closing the scheduler cancels the work which has not started yet
+            hits.close()
+            results.close()
+
+            if journal is not None:
+                journal.close()
+
+        # Trim the cache once all workers are done with it
+        if self.result_cache is not None:
+            self.result_cache.evict()
+
+        # Sentences for which secondary processing failed are written in one go
+        self.statistics.write_errors()
+
+        # Failed files are not journaled, so they are tried again when the run is resumed
+        for file, error in self.statistics.failures:
+            print(f"[Error] Skipped {file}: {error}")
+
+        if self.stats_path is not None:
+            self.statistics.write(self.stats_path, time.perf_counter() - t1)
+
+    def resume(self, journal: Journal, tasks: Iterable[tuple[Path | CorpusFile, list]]) -> tuple[list[tuple], list[tuple]]:
+        """Split the tasks into the files which still have to be processed and the files which are already in the journal
+
+        Args:
+            journal (Journal): the journal of an earlier run of the same query
+            tasks (Iterable[tuple[Path | CorpusFile, list]]): the Alpino XML files to process, with their sentence spans
+
+        Returns:
+            tuple[list[tuple], list[tuple]]: the remaining tasks, and the (file, spans, journal key) of every finished file
+        """
+
+        remaining = []
+        finished = []
+        for pfin, spans in tasks:
+            if not isinstance(pfin, CorpusFile):
+                pfin = CorpusFile(pfin)
+
+            key = journal.key(pfin, spans)
+            if key in journal:
+                finished.append((pfin, spans, key))
+            else:
+                remaining.append((pfin, spans))
+
+        if len(finished) > 0:
+            print(f"[Journal] Resuming, {len(finished)} files were already finished")
+
+        self.statistics.count("resumed_files", len(finished))
+
+        return remaining, finished
+
+    def collect(self, results: Iterator[tuple[CorpusFile, list, list[tuple]]], journal: Journal=None,
+                finished: list[tuple]=None) -> Iterator[tuple]:
+        """Yield the hits of the finished files in the journal, followed by the hits of the files the workers finish
 
-        return output
+        Args:
+            results (Iterator[tuple[CorpusFile, list, list[tuple]]]): the finished files, their spans and their hits, as yielded by the scheduler
+            journal (Journal): the journal, every file the workers finish is added to it, if None, nothing is journaled
+            finished (list[tuple]): the (file, spans, journal key) of the files which were finished by an earlier run, if any
+
+        Yields:
+            tuple: corpus hits with the given syntactic structure
+        """
+
+        if finished is not None:
+            for file_hits in journal.replay([ key for _, _, key in finished ]):
+                self.statistics.count("hits", len(file_hits))
+                yield from file_hits
+
+        for file, spans, file_hits in results:
+            # The file is only journaled once all its hits are known
+            if journal is not None:
+                journal.add(journal.key(file, spans), file_hits)
+
+            yield from file_hits
+
+    def get_query_key(self) -> str:
+        """Get a key which identifies the current query, used for the result cache
+
+        Returns:
+            str: the query key, which changes whenever the xpath, the secondary processing or the closed class items change
+        """
+
+        closed_class_items = None
+        if self.closed_class_items is not None:
+            closed_class_items = { name: sorted(items) for name, items in sorted(self.closed_class_items.items()) }
+
+        return json.dumps([ type(self).__name__, self.xpath, self.SECONDARY_PROCESSING_VERSION, closed_class_items, self.sentence_sample_key() ])
+
+    def sentence_sample_key(self) -> str | None:
+        # Sampling sentences changes the hits of a file, sampling files does not
+        if self.sampler is None or not self.sampler.samples_sentences():
+            return None
+
+        return repr(self.sampler)
+
+    def filter_file(self, pfin: Path | CorpusFile, spans: list[tuple[int, int]]=None, contents: Future=None) -> list[tuple]:
+        """Filter a single Alpino XML file, or get its hits from the result cache if the file and the query have not changed
 
-    def filter_single(self, pfin: Path) -> list[tuple]:
+        Args:
+            pfin (Path | CorpusFile): the (possibly compressed or archived) Alpino XML file to check
+            spans (list[tuple[int, int]]): the (start, end) byte spans of the sentences to check, if None, all sentences in the file are checked
+            contents (Future): the contents of the file (see CorpusFile.load) which are being read ahead, if None, the file is read when it is processed
+
+        Returns:
+            list[tuple]: list of corpus hits in the given file with the given syntactic structure
+        """
+
+        if not isinstance(pfin, CorpusFile):
+            pfin = CorpusFile(pfin)
+
+        if self.result_cache is None:
+            hits = self.filter_single(pfin, spans, contents)
+            self.statistics.count("hits", len(hits))
+            return hits
+
+        key = ResultCache.key(pfin, self.query_key, spans)
+
+        hits = self.result_cache.get(key)
+        if hits is None:
+            hits = self.filter_single(pfin, spans, contents)
+            self.result_cache.put(key, hits)
+        else:
+            self.statistics.count("cached_files")
+
+        self.statistics.count("hits", len(hits))
+
+        return hits
+
+    def filter_single(self, pfin: Path | CorpusFile, spans: list[tuple[int, int]]=None, contents: Future=None) -> list[tuple]:
         """Filter a single Alpino XML file and return all hits
 
         Args:
-            pfin (Path): a Path object pointing to the Alpino XML file to check
+            pfin (Path | CorpusFile): the (possibly compressed or archived) Alpino XML file to check
+            spans (list[tuple[int, int]]): the (start, end) byte spans of the sentences to check, if None, all sentences in the file are checked
+                (only for files containing a single XML file)
+            contents (Future): the contents of the file (see CorpusFile.load) which are being read ahead, if None, the file is read here
 
         Returns:
             list[tuple]: list of corpus hits in the given file with the given syntactic structure
@@ -101,63 +501,166 @@ class CaseStudy:
 
         total_hits = []
 
-        buffer_open = False # controls whether lines can be added to the buffer
-        parse_OK = False # controls whether the buffer should be parsed at all
-
-        with pfin.open("rt") as reader:
-            buf = []
-
-            for line in reader:
-                # Open the buffer for writing when sentence opening tag has been found
-                if line.startswith("<alpino_ds"):
-                    buffer_open = True
-                # We check using flash text whether it's worth even parsing this sentence
-                # We can already do this in the buffer stage so we skip parsing
-                # (which is expensive)
-                elif line.startswith("  <sentence"):
-                    # If keyword processing is not available, always parse
-                    if self.keyword_processor is None:
-                        parse_OK = True
-                    # Else, go for it
-                    elif len(self.keyword_processor.extract_keywords(line)) > 0:
-                        parse_OK = True
-                # Close the buffer when closing tag is found
-                # In addition, parse the current buffer and get its hits (if allowed)
-                elif line.startswith("</alpino_ds"):
-                    buf.append(line)
-
-                    # Only parse if anything interesting was found using flashtext
-                    if parse_OK:
-                        total_hits = total_hits + self.filter_xml_buffer("\n".join(buf), pfin.stem)
-
-                    # Reset flags
-                    buffer_open = False
-                    parse_OK = False
-                    
-                    # Reset buffer
-                    buf = []
-
-                # Only add lines if the buffer is open
-                if buffer_open:
-                    buf.append(line)
+        if not isinstance(pfin, CorpusFile):
+            pfin = CorpusFile(pfin)
+
+        t1 = time.perf_counter()
+        sentence_count = 0
+        byte_count = 0
+
+        # The file is memory-mapped (or decompressed) and split into sentences on the byte level
+        # No decoding or line handling is needed before the XML reaches lxml
+        # Archives contain more than one XML file
+        # Contents which were read ahead are only waited for here, the file is not read a second time
+        for filename, splitter in pfin.splitters(contents.result() if contents is not None else None):
+            # Without known spans, find all sentences in the file
+            # If there are closed class items, only sentences containing one of them are considered at all
+            # A byte range of a large file only covers part of the buffer
+            start, end = pfin.byte_range if pfin.byte_range is not None else splitter.extent()
+
+            file_spans = spans
+            if file_spans is None:
+                file_spans = self.candidate_spans(splitter, start, end)
+                byte_count += end - start
+            else:
+                byte_count += sum(end - start for start, end in file_spans)
+
+            # The keyword scanner never yields the sentences it skips, but they were read all the same
+            if spans is None and self.keyword_scanner is not None:
+                file_spans = list(file_spans)
+                rejected = splitter.count(start, end) - len(file_spans)
+                sentence_count += rejected
+                self.statistics.count("scanner_rejected", rejected)
+
+            # Sentences are identified by their file and their offset
+            if self.sampler is not None and self.sampler.samples_sentences():
+                unit_name = self.unit_name(pfin)
+                file_spans = list(file_spans)
+                sampled_spans = [ (start, end) for start, end in file_spans if self.sampler.keep(unit_name, filename, start) ]
+                sentence_count += len(file_spans) - len(sampled_spans)
+                self.statistics.count("sampled_out", len(file_spans) - len(sampled_spans))
+                file_spans = sampled_spans
+
+            for start, end in file_spans:
+                sentence_count += 1
+                total_hits.extend(self.filter_sentence(splitter, start, end, filename))
+
+        self.statistics.add_file(str(pfin), time.perf_counter() - t1, sentence_count, byte_count)
 
         return total_hits
 
-    def filter_xml_buffer(self, xml: str, filename:str)-> list[tuple]:
+    def candidate_spans(self, splitter: SentenceSplitter, start: int=None, end: int=None) -> Iterator[tuple[int, int]]:
+        """Find the sentences of (a part of) a file which are worth checking
+
+        Args:
+            splitter (SentenceSplitter): the splitter of the file
+            start (int): the byte offset to start from, defaults to the start of the buffer
+            end (int): the byte offset to stop at, defaults to the end of the buffer
+
+        Returns:
+            Iterator[tuple[int, int]]: start and end offset of every sentence, or only of the sentences with a closed class item
+                if the keyword scanner is used
+        """
+
+        if self.keyword_scanner is None:
+            return splitter.spans(start, end)
+
+        return self.keyword_scanner.spans(splitter, start, end)
+
+    def filter_sentence(self, splitter: SentenceSplitter, start: int, end: int, filename: str) -> list[tuple]:
+        """Filter a single Alpino sentence, if it passes the prefilters
+
+        Args:
+            splitter (SentenceSplitter): the splitter of the file the sentence is in
+            start (int): start offset of the <alpino_ds> element
+            end (int): end offset of the <alpino_ds> element
+            filename (str): the filename of the file the Alpino sentence came from
+
+        Returns:
+            list[tuple]: list of corpus hits in the given sentence with the given syntactic structure
+        """
+
+        with self.statistics.timer("prefilter"):
+            accepted = self.accepts(splitter, start, end)
+
+        if not accepted:
+            return []
+
+        self.statistics.count("prefilter_passed")
+
+        return self.filter_xml_buffer(splitter.xml(start, end), filename)
+
+    def accepts(self, splitter: SentenceSplitter, start: int, end: int) -> bool:
+        """Check whether a sentence is worth parsing, without parsing it
+
+        Args:
+            splitter (SentenceSplitter): the splitter of the file the sentence is in
+            start (int): start offset of the <alpino_ds> element
+            end (int): end offset of the <alpino_ds> element
+
+        Returns:
+            bool: True if the sentence should be parsed
+        """
+
+        # Sentences which lack an attribute value required by the xpath can never match
+        if not self.constraints.matches(splitter.buffer, start - splitter.offset, end - splitter.offset):
+            return False
+
+        # We check using flash text whether it's worth even parsing this sentence
+        # We can already do this before parsing (which is expensive)
+        return self.prefilter(splitter.sentence(start, end))
+
+    def prefilter(self, sentence: str | None) -> bool:
+        """Check whether a sentence is worth parsing, i.e. whether it contains any of the closed class items
+
+        Args:
+            sentence (str | None): the raw text of the sentence
+
+        Returns:
+            bool: True if the sentence should be parsed
+        """
+
+        # If keyword processing is not available, always parse
+        if self.keyword_processor is None:
+            return True
+
+        # Sentences without a sentence element cannot contain a closed class item
+        if sentence is None:
+            return False
+
+        return len(self.keyword_processor.extract_keywords(sentence)) > 0
+
+    def filter_xml_buffer(self, xml: str | bytes, filename:str)-> list[tuple]:
         """Filter a single Alpino sentence buffer and return the specified information
 
         Args:
-            xml (str): a string containing a single Alpino sentence (i.e. one <alpino_ds> element)
+            xml (str | bytes): a single Alpino sentence (i.e. one <alpino_ds> element), as text or raw bytes
             filename (str): the filename of the file the Alpino sentence came from
 
         Returns:
             list[tuple]: list of corpus hits in the given file with the given syntactic structure
         """
+        # Parse the XML from string or bytes
+        with self.statistics.timer("parse"):
+            alpino_ds = ET.fromstring(xml)
+
+        self.statistics.count("parsed")
+
+        return self.filter_tree(alpino_ds, filename)
+
+    def filter_tree(self, alpino_ds: ET._Element, filename: str, clear: bool=True) -> list[tuple]:
+        """Filter a single parsed Alpino sentence and return the specified information
+
+        Args:
+            alpino_ds (ET._Element): the <alpino_ds> element of the sentence
+            filename (str): the filename of the file the Alpino sentence came from
+            clear (bool): whether the tree can be cleared afterwards, this should be False if the tree is shared with other queries
+
+        Returns:
+            list[tuple]: list of corpus hits in the given sentence with the given syntactic structure
+        """
         total_hits = []
 
-        # Parse the XML from string
-        alpino_ds = ET.fromstring(xml)
-        
         # Extract the full sentence from the tree
         sentence_element = alpino_ds.find('sentence')
         sentence = sentence_element.text
@@ -170,7 +673,15 @@ class CaseStudy:
             sentence_id = sentence_element.get("sentid")
 
         # Let's find different subordinate clauses
-        for element in alpino_ds.xpath(self.xpath):
+        # The general query is compiled once per worker process
+        with self.statistics.timer("xpath"):
+            elements = XPathCache.compiled(self.xpath)(alpino_ds)
+
+        if len(elements) > 0:
+            self.statistics.count("xpath_matched")
+            self.statistics.count("xpath_elements", len(elements))
+
+        for element in elements:
             # If the xpath matches, it means that the syntactic structure is the one we're looking for
             
             # DEBUG print the words of this node
@@ -179,22 +690,105 @@ class CaseStudy:
             if self.secondary_processing is not None:
                 # Secondary processing is set by children of the CaseStudy type
                 # This method will run processing to find lexical elements in the syntactic structure
-                secondary_data = self.secondary_processing(element, filename, sentence_id)
+                with self.statistics.timer("secondary"):
+                    secondary_data = self.secondary_processing(element, filename, sentence_id)
                 # print(secondary_data)
 
+                self.statistics.count("secondary_calls")
+
                 if secondary_data is None:
-                    with open("errors.txt", "at") as writer:
-                        writer.write(f"{filename},{sentence_id}\n")
+                    # Failed sentences are written to errors.txt at the end of the run
+                    self.statistics.count("secondary_none")
+                    self.statistics.errors.append((filename, sentence_id))
                     continue
 
                 if type(secondary_data) == tuple:
                     # With the lexical elements obtained, add them to our list of hits
-                    total_hits.append((sentence, filename, sentence_id, secondary_data))
+                    total_hits.append(self.record(sentence, filename, sentence_id, secondary_data))
                 elif type(secondary_data) == list:
                     for secondary_data_tuple in secondary_data:
-                        total_hits.append((sentence, filename, sentence_id, secondary_data_tuple))
+                        total_hits.append(self.record(sentence, filename, sentence_id, secondary_data_tuple))
 
-            # Performance/memory improvement
-            element.clear()
+        # Performance/memory improvement
+        # The tree is only cleared once all matches are processed, clearing a matched clause would detach the clauses nested in it
+        if clear:
+            alpino_ds.clear()
 
-        return total_hits
+        # Nested matches can produce the same hit more than once
+        return self.unique(total_hits)
+
+    def record(self, sentence: str, filename: str, sentence_id: str, data: tuple) -> tuple:
+        """Turn the result of secondary processing into a hit, with one value for every column of the schema
+
+        All hits of a sentence are passed the same sentence string, so they share it.
+
+        Args:
+            sentence (str): the sentence text
+            filename (str): the filename of the file the sentence came from
+            sentence_id (str): the sentence id
+            data (tuple): the result of secondary processing for a single hit
+
+        Returns:
+            tuple: the hit, implemented by the individual case studies
+        """
+
+        return sentence, filename, sentence_id, data
+
+    def to_row(self, hit: tuple) -> dict:
+        """Turn a single corpus hit into a dictionary (= one output row)
+
+        Args:
+            hit (tuple): the corpus hit
+
+        Returns:
+            dict: the output row
+        """
+
+        return self.SCHEMA.row(hit)
+
+    def duplicate_key(self, hit: tuple) -> tuple | None:
+        """Get the key which identifies duplicate hits, based on DUPLICATE_COLUMNS
+
+        Args:
+            hit (tuple): the corpus hit
+
+        Returns:
+            tuple | None: the key, or None if hits are never duplicates
+        """
+
+        if self.DUPLICATE_COLUMNS is None:
+            return None
+
+        return self.SCHEMA.values(hit, self.DUPLICATE_COLUMNS)
+
+    def unique(self, hits: list[tuple]) -> list[tuple]:
+        """Remove duplicate hits within a single sentence, based on duplicate_key
+
+        Duplicates are removed in the worker processes, so they are never sent back to the main process.
+
+        Args:
+            hits (list[tuple]): the corpus hits of a single sentence
+
+        Returns:
+            list[tuple]: the corpus hits without duplicates, the first of every group of duplicates is kept
+        """
+
+        # A single hit cannot have duplicates
+        if len(hits) < 2:
+            return hits
+
+        seen = set()
+        unique_hits = []
+        for hit in hits:
+            key = self.duplicate_key(hit)
+            if key is not None:
+                if key in seen:
+                    continue
+
+                seen.add(key)
+
+            unique_hits.append(hit)
+
+        self.statistics.count("duplicates", len(hits) - len(unique_hits))
+
+        return unique_hits
@@ -0,0 +1,213 @@
+from array import array
+from lxml import etree as ET
+from tqdm.auto import tqdm
+from .CorpusFile import CorpusFile
+
+import json
+import numpy as np
+import os
+
+class ColumnarCorpus:
+    # Node attributes which are stored as integer codes, code 0 means that the attribute is missing
+    ATTRIBUTES = [ "cat", "pos", "pt", "rel", "wvorm", "buiging", "lemma", "word" ]
+    # Node attributes which are stored as plain integers, -1 means that the attribute is missing
+    NUMBERS = [ "begin", "end", "id" ]
+
+    def __init__(self, columnar_directory: str) -> None:
+        """Columnar corpus object which gives memory-mapped access to a corpus converted by ColumnarCorpus.convert
+
+        Every node attribute is a NumPy array with one value per node, in document order.
+        Nodes point to their parent through the "parent" array (-1 for the top node of a sentence),
+        and "sentence_nodes" holds the index of the first node of every sentence.
+
+        Args:
+            columnar_directory (str): the directory of the converted corpus
+
+        Raises:
+            FileNotFoundError: if the directory does not contain a converted corpus
+        """
+
+        meta_path = os.path.join(columnar_directory, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(meta_path)
+
+        self.columnar_directory = columnar_directory
+
+        with open(meta_path, "rt") as reader:
+            self.meta = json.loads(reader.read())
+
+        # Code -> string for every coded attribute
+        self.vocabularies = self.meta["vocabularies"]
+        self.files = self.meta["files"]
+
+        # All columns are memory-mapped, so only the parts a query touches are read from disk
+        self.columns = {}
+        for name, (dtype, length) in self.meta["columns"].items():
+            path = os.path.join(columnar_directory, f"{name}.bin")
+            if length == 0:
+                self.columns[name] = np.zeros(0, dtype=dtype)
+            else:
+                self.columns[name] = np.memmap(path, dtype=dtype, mode="r", shape=(length,))
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def code(self, attribute: str, value: str) -> int:
+        """Get the integer code of an attribute value
+
+        Args:
+            attribute (str): the attribute name
+            value (str): the attribute value
+
+        Returns:
+            int: the code, or -1 if the value does not occur in the corpus (so comparisons never match)
+        """
+
+        if not hasattr(self, "lookups"):
+            self.lookups = { name: { value: code for code, value in enumerate(vocabulary) } for name, vocabulary in self.vocabularies.items() }
+
+        return self.lookups[attribute].get(value, -1)
+
+    def string(self, name: str, index: int) -> str:
+        """Get a string which is stored per sentence (the sentence text or the sentence id)
+
+        Args:
+            name (str): "sentence" or "sentid"
+            index (int): the sentence index
+
+        Returns:
+            str: the string, or None for a missing sentence id
+        """
+
+        offsets = self.columns[f"{name}_offsets"]
+        data = self.columns[f"{name}_data"]
+
+        start, end = offsets[index], offsets[index + 1]
+        if name == "sentid" and start == end:
+            return None
+
+        return bytes(data[start:end]).decode("utf-8")
+
+    @classmethod
+    def convert(cls, corpus_directory: str, columnar_directory: str) -> "ColumnarCorpus":
+        """Convert an Alpino corpus into the columnar format, this only has to happen once per corpus
+
+        Columns are written to disk incrementally, so the conversion does not need to keep the corpus in memory.
+
+        Args:
+            corpus_directory (str): the directory where the Alpino-compatible corpus is stored
+            columnar_directory (str): the output directory, it is created if it does not exist
+
+        Raises:
+            Exception: if corpus directory contains no XML files
+
+        Returns:
+            ColumnarCorpus: the converted corpus
+        """
+
+        files = CorpusFile.find(corpus_directory)
+
+        if len(files) == 0:
+            raise Exception("Corpus directory contains no XML files")
+
+        os.makedirs(columnar_directory, exist_ok=True)
+
+        # Column name -> (typecode, dtype)
+        layout = { "parent": ("q", "int64"), "node_sentence": ("i", "int32"),
+                   "sentence_nodes": ("q", "int64"), "sentence_file": ("i", "int32"),
+                   "sentence_offsets": ("q", "int64"), "sentence_data": ("B", "uint8"),
+                   "sentid_offsets": ("q", "int64"), "sentid_data": ("B", "uint8") }
+        for attribute in cls.ATTRIBUTES + cls.NUMBERS:
+            layout[attribute] = ("i", "int32")
+
+        writers = { name: open(os.path.join(columnar_directory, f"{name}.bin"), "wb") for name in layout }
+        lengths = { name: 0 for name in layout }
+
+        vocabularies = { attribute: { "": 0 } for attribute in cls.ATTRIBUTES }
+        file_names = []
+
+        node_count = 0
+        sentence_count = 0
+        sentence_bytes = 0
+        sentid_bytes = 0
+
+        def write(columns: dict) -> None:
+            # Flush the buffered values of every column to disk
+            for name, values in columns.items():
+                array(layout[name][0], values).tofile(writers[name])
+                lengths[name] += len(values)
+
+        # Offsets start at zero
+        write({ "sentence_offsets": [0], "sentid_offsets": [0] })
+
+        for corpus_file in tqdm(files, desc='Converting'):
+            for filename, splitter in corpus_file.splitters():
+                file_names.append(filename)
+                file_code = len(file_names) - 1
+
+                columns = { name: [] for name in layout }
+
+                for start, end in splitter.spans():
+                    alpino_ds = ET.fromstring(splitter.xml(start, end))
+
+                    columns["sentence_nodes"].append(node_count)
+                    columns["sentence_file"].append(file_code)
+
+                    sentence_element = alpino_ds.find("sentence")
+                    sentence = sentence_element.text.encode("utf-8") if sentence_element is not None and sentence_element.text is not None else b""
+                    sentid = sentence_element.get("sentid", "").encode("utf-8") if sentence_element is not None else b""
+
+                    columns["sentence_data"].extend(sentence)
+                    sentence_bytes += len(sentence)
+                    columns["sentence_offsets"].append(sentence_bytes)
+                    columns["sentid_data"].extend(sentid)
+                    sentid_bytes += len(sentid)
+                    columns["sentid_offsets"].append(sentid_bytes)
+
+                    # Walk the tree in document order, keeping track of the parent of every node
+                    stack = [ (child, -1) for child in reversed(alpino_ds.findall("node")) ]
+                    while len(stack) > 0:
+                        element, parent = stack.pop()
+                        index = node_count
+                        node_count += 1
+
+                        columns["parent"].append(parent)
+                        columns["node_sentence"].append(sentence_count)
+
+                        for attribute in cls.ATTRIBUTES:
+                            value = element.get(attribute)
+                            if value is None:
+                                columns[attribute].append(0)
+                                continue
+
+                            vocabulary = vocabularies[attribute]
+                            if value not in vocabulary:
+                                vocabulary[value] = len(vocabulary)
+                            columns[attribute].append(vocabulary[value])
+
+                        for attribute in cls.NUMBERS:
+                            value = element.get(attribute)
+                            columns[attribute].append(int(value) if value is not None and value.isdigit() else -1)
+
+                        stack.extend((child, index) for child in reversed(element.findall("node")))
+
+                    sentence_count += 1
+
+                write(columns)
+
+        # Closing index for the node ranges of the sentences
+        write({ "sentence_nodes": [node_count] })
+
+        for writer in writers.values():
+            writer.close()
+
+        meta = { "columns": { name: (layout[name][1], lengths[name]) for name in layout },
+                 "vocabularies": { attribute: list(vocabulary.keys()) for attribute, vocabulary in vocabularies.items() },
+                 "files": file_names,
+                 "nodes": node_count,
+                 "sentences": sentence_count }
+
+        with open(os.path.join(columnar_directory, "meta.json"), "wt") as writer:
+            writer.write(json.dumps(meta))
+
+        return cls(columnar_directory)
@@ -0,0 +1,259 @@
+from .ColumnarCorpus import ColumnarCorpus
+
+import numpy as np
+
+class ColumnarQuery:
+    def __init__(self, corpus: ColumnarCorpus, closed_class_items: dict=None) -> None:
+        """Query object which runs the case studies as vectorised operations over a columnar corpus
+
+        This is an alternative backend to CaseStudy: instead of evaluating xpath queries tree by tree,
+        every query is a handful of NumPy operations over the node columns of the whole corpus.
+        Hits are (sentence, filename, sentence id, data) tuples, which the record method of the corresponding case study turns into its own hits.
+
+        Args:
+            corpus (ColumnarCorpus): the converted corpus
+            closed_class_items (dict): a dictionary specifying the lexical items that should definitely be part of the sentence in order for a match to occur
+        """
+
+        self.corpus = corpus
+        self.closed_class_items = closed_class_items
+
+        parent = np.asarray(corpus["parent"])
+
+        # Ancestors of every node, -1 if the node does not have that many ancestors
+        self.parent = parent
+        self.grandparent = self.lift(parent)
+        self.great_grandparent = self.lift(self.grandparent)
+
+        # The sentence of the previous hit, so hits of the same sentence share its text
+        self.last_sentence = (None, None, None)
+
+    def lift(self, ancestors: np.ndarray) -> np.ndarray:
+        # Go up one level in the tree
+        return np.where(ancestors >= 0, self.parent[np.maximum(ancestors, 0)], -1)
+
+    def equals(self, attribute: str, *values: str) -> np.ndarray:
+        """Get a mask of all nodes for which an attribute has any of the given values
+
+        Args:
+            attribute (str): the attribute name
+            *values (str): the attribute values
+
+        Returns:
+            np.ndarray: boolean mask over all nodes
+        """
+
+        codes = [ self.corpus.code(attribute, value) for value in values ]
+        return np.isin(self.corpus[attribute], codes)
+
+    def prefilter(self) -> np.ndarray:
+        """Get a mask of all sentences which contain any of the closed class items
+
+        Closed class items are compared with the words of the sentence, ignoring case.
+
+        Returns:
+            np.ndarray: boolean mask over all sentences
+        """
+
+        accepted = np.ones(self.corpus.meta["sentences"], dtype=bool)
+
+        # Without closed class items, every sentence is considered
+        if self.closed_class_items is None:
+            return accepted
+
+        keywords = { keyword.lower() for keywords in self.closed_class_items.values() for keyword in keywords }
+        codes = [ code for code, word in enumerate(self.corpus.vocabularies["word"]) if word.lower() in keywords ]
+
+        accepted[:] = False
+        accepted[self.corpus["node_sentence"][np.isin(self.corpus["word"], codes)]] = True
+
+        return accepted
+
+    def first_per_group(self, nodes: np.ndarray, groups: np.ndarray, group_count: int) -> np.ndarray:
+        """Get the first node (in document order) of every group
+
+        Args:
+            nodes (np.ndarray): node indices
+            groups (np.ndarray): the group of every node
+            group_count (int): the number of groups
+
+        Returns:
+            np.ndarray: the first node of every group, -1 for groups without nodes
+        """
+
+        first = np.full(group_count, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, groups, nodes)
+
+        return np.where(first == np.iinfo(np.int64).max, -1, first)
+
+    def hit(self, sentence: int, data: tuple) -> tuple:
+        # The arguments of CaseStudy.record
+        if self.last_sentence[0] != sentence:
+            self.last_sentence = (sentence, self.corpus.string("sentence", sentence), self.corpus.string("sentid", sentence))
+
+        _, text, sentence_id = self.last_sentence
+        filename = self.corpus.files[self.corpus["sentence_file"][sentence]]
+
+        return text, filename, sentence_id, data
+
+    def strings(self, attribute: str, node: int) -> str | None:
+        code = self.corpus[attribute][node]
+        return self.corpus.vocabularies[attribute][code] if code != 0 else None
+
+    def participles(self) -> list[tuple]:
+        """Find all participles, with the same semantics as the Participles case study
+
+        Returns:
+            list[tuple]: list of (sentence, filename, sentence id, (participle, participle lemma)) tuples
+        """
+
+        sentence_count = self.corpus.meta["sentences"]
+        node_sentence = self.corpus["node_sentence"]
+
+        # The first past participle of every sentence
+        candidates = np.flatnonzero(self.equals("wvorm", "vd") & self.equals("pos", "verb") & self.prefilter()[node_sentence])
+        first = self.first_per_group(candidates, node_sentence[candidates], sentence_count)
+
+        # One hit for every top node in a sentence with a past participle
+        tops = np.flatnonzero(self.equals("cat", "top"))
+        tops = tops[first[node_sentence[tops]] >= 0]
+
+        hits = []
+        for top in tops:
+            sentence = node_sentence[top]
+            participle = first[sentence]
+            hits.append(self.hit(sentence, (self.strings("word", participle), self.strings("lemma", participle))))
+
+        return hits
+
+    def adjectives(self) -> list[tuple]:
+        """Find all adjectives without inflection, with the same semantics as the Adjectives case study
+
+        Returns:
+            list[tuple]: list of (sentence, filename, sentence id, (adjective, adjective lemma)) tuples
+        """
+
+        sentence_count = self.corpus.meta["sentences"]
+        node_sentence = self.corpus["node_sentence"]
+
+        adjectives = np.flatnonzero(self.equals("buiging", "zonder") & self.equals("pos", "adj") & self.prefilter()[node_sentence])
+
+        # Every adjective in the sentence is a hit for every top node in the sentence
+        tops = np.bincount(node_sentence[self.equals("cat", "top")], minlength=sentence_count)
+        adjectives = np.repeat(adjectives, tops[node_sentence[adjectives]])
+
+        return [ self.hit(node_sentence[adjective], (self.strings("word", adjective), self.strings("lemma", adjective)))
+                 for adjective in adjectives ]
+
+    def rood_groen(self, order: str="red_green") -> list[tuple]:
+        """Find perfective verb clusters, with the same semantics as the RoodGroen case study
+
+        The xpath queries of RoodGroen.secondary_processing reduce to simple structural relations:
+        the participle is a great-grandchild of the clause, the auxiliary is a grandchild of the clause,
+        and the parent of the auxiliary is the grandparent of the participle.
+
+        Args:
+            order (str): only "red_green" is supported
+
+        Raises:
+            Exception: if an order other than "red_green" is specified
+
+        Returns:
+            list[tuple]: list of (sentence, filename, sentence id, (participle, auxiliary, participle lemma, auxiliary lemma,
+                         participle index, auxiliary index, clause start index, clause end index, order)) tuples
+        """
+
+        if order != "red_green":
+            raise Exception("Unrecognised order. The columnar backend only supports 'red_green' as the requested order.")
+
+        node_count = self.corpus.meta["nodes"]
+        node_sentence = self.corpus["node_sentence"]
+        begin = np.asarray(self.corpus["begin"]).astype(np.int64)
+
+        not_smain = ~self.equals("cat", "smain")
+        is_participle = self.equals("rel", "hd") & self.equals("wvorm", "vd")
+        is_auxiliary = self.equals("rel", "hd") & self.equals("pt", "ww")
+
+        # Nodes without a begin attribute never take part in a comparison
+        is_participle &= begin >= 0
+        is_auxiliary &= begin >= 0
+
+        # Clauses matched by the general xpath, the participle satisfies both descendant conditions
+        clauses = self.equals("cat", "cp", "rel", "inf") & self.prefilter()[node_sentence]
+
+        # Smallest and largest begin of the auxiliaries directly below every node
+        auxiliaries = np.flatnonzero(is_auxiliary & (self.parent >= 0))
+        auxiliary_min = np.full(node_count, np.iinfo(np.int64).max, dtype=np.int64)
+        auxiliary_max = np.full(node_count, -1, dtype=np.int64)
+        np.minimum.at(auxiliary_min, self.parent[auxiliaries], begin[auxiliaries])
+        np.maximum.at(auxiliary_max, self.parent[auxiliaries], begin[auxiliaries])
+
+        # Smallest and largest begin of the participles two levels below every node
+        participles = np.flatnonzero(is_participle & (self.grandparent >= 0))
+        participle_min = np.full(node_count, np.iinfo(np.int64).max, dtype=np.int64)
+        participle_max = np.full(node_count, -1, dtype=np.int64)
+        np.minimum.at(participle_min, self.grandparent[participles], begin[participles])
+        np.maximum.at(participle_max, self.grandparent[participles], begin[participles])
+
+        # Candidate participles and auxiliaries of every clause, for both orders
+        participle_candidates = np.flatnonzero(is_participle & (self.great_grandparent >= 0))
+        participle_candidates = participle_candidates[clauses[self.great_grandparent[participle_candidates]]]
+        participle_head = self.grandparent[participle_candidates]
+        participle_candidates = participle_candidates[not_smain[participle_head]]
+        participle_head = self.grandparent[participle_candidates]
+
+        auxiliary_candidates = np.flatnonzero(is_auxiliary & (self.grandparent >= 0))
+        auxiliary_candidates = auxiliary_candidates[clauses[self.grandparent[auxiliary_candidates]]]
+        auxiliary_head = self.parent[auxiliary_candidates]
+        auxiliary_candidates = auxiliary_candidates[not_smain[auxiliary_head]]
+        auxiliary_head = self.parent[auxiliary_candidates]
+
+        participle_begin = begin[participle_candidates]
+        auxiliary_begin = begin[auxiliary_candidates]
+
+        # xpath comparisons with a node set are true if the comparison holds for any node in the set
+        conditions = { "red": (participle_begin > auxiliary_min[participle_head], auxiliary_begin < participle_max[auxiliary_head]),
+                       "green": (participle_begin < auxiliary_max[participle_head], auxiliary_begin > participle_min[auxiliary_head]) }
+
+        # The first candidate of every clause, for every order
+        found = {}
+        for candidate_order, (participle_condition, auxiliary_condition) in conditions.items():
+            selected_participles = participle_candidates[participle_condition]
+            selected_auxiliaries = auxiliary_candidates[auxiliary_condition]
+
+            found[candidate_order] = (self.first_per_group(selected_participles, self.great_grandparent[selected_participles], node_count),
+                                      self.first_per_group(selected_auxiliaries, self.grandparent[selected_auxiliaries], node_count))
+
+        hits = []
+        # Nested clauses make the same participle and auxiliary show up more than once in a sentence (see RoodGroen.duplicate_key)
+        seen = set()
+        for clause in np.flatnonzero(clauses):
+            for candidate_order in [ "red", "green" ]:
+                participle = found[candidate_order][0][clause]
+                auxiliary = found[candidate_order][1][clause]
+
+                if participle < 0 or auxiliary < 0:
+                    continue
+
+                # Same cluster checks as RoodGroen.secondary_processing
+                distance = begin[participle] - begin[auxiliary]
+                if abs(distance) > 2:
+                    continue
+
+                if (distance > 0 and candidate_order == "green") or (distance < 0 and candidate_order == "red"):
+                    continue
+
+                key = (int(node_sentence[clause]), int(begin[participle]), int(begin[auxiliary]))
+                if key in seen:
+                    break
+
+                seen.add(key)
+
+                data = (self.strings("word", participle), self.strings("word", auxiliary),
+                        self.strings("lemma", participle), self.strings("lemma", auxiliary),
+                        int(begin[participle]), int(begin[auxiliary]),
+                        int(self.corpus["begin"][clause]), int(self.corpus["end"][clause]), candidate_order)
+                hits.append(self.hit(node_sentence[clause], data))
+                break
+
+        return hits
@@ -4,8 +4,8 @@ class Constants:
                       "red_green": """//node[(@cat="cp" or @cat="rel" or @cat="inf") and .//node[(@pt="ww" or @rel="hd")] and .//node[@rel="hd" and @wvorm="vd"]]""",
                       "participles": """//node[@cat="top" and descendant::node[@wvorm="vd" and @pos="verb"]]""",
                       "adjectives": """//node[@cat="top" and descendant::node[@buiging="zonder" and @pos="adj"]]"""}
-    SPECIFIC_XPATHS = {"participle": """.//node[@rel="hd" and @wvorm="vd" and @begin $SIGN$ ../../node[@rel="hd" and @pt="ww"]/@begin and not(../../@cat="smain") and ../../../../node[@id="$ID$"]]""",
-                       "auxiliary": """.//node[@rel="hd" and @pt="ww" and @begin $SIGN$ ../node/node[@rel="hd" and @wvorm="vd"]/@begin and not(../@cat="smain") and ../../../node[@id="$ID$"]]""",
+    SPECIFIC_XPATHS = {"participle": """.//node[@rel="hd" and @wvorm="vd" and @begin $SIGN$ ../../node[@rel="hd" and @pt="ww"]/@begin and not(../../@cat="smain") and ../../../../node[@id=$id]]""",
+                       "auxiliary": """.//node[@rel="hd" and @pt="ww" and @begin $SIGN$ ../node/node[@rel="hd" and @wvorm="vd"]/@begin and not(../@cat="smain") and ../../../node[@id=$id]]""",
                        "participles": """//node[@wvorm="vd" and @pos="verb"]""",
                        "adjectives": """//node[@buiging="zonder" and @pos="adj"]"""}
     OPERATORS = {"participle": {"red": ">", "green": "<"},
@@ -0,0 +1,260 @@
+from pathlib import Path
+from typing import Iterator
+from .SentenceSplitter import SentenceSplitter
+
+import bz2
+import gzip
+import os
+import tarfile
+import zipfile
+
+class CorpusFile:
+    # File name endings of single (possibly compressed) Alpino XML files
+    COMPRESSED_EXTENSIONS = { ".xml": None, ".xml.gz": gzip, ".xml.bz2": bz2 }
+    # File name endings of archives containing Alpino XML files
+    TAR_EXTENSIONS = [ ".tar", ".tar.gz", ".tgz", ".tar.bz2" ]
+    ZIP_EXTENSIONS = [ ".zip" ]
+
+    def __init__(self, path: Path, member: str=None, member_size: int=None, byte_range: tuple[int, int]=None) -> None:
+        """Corpus file object which represents a single unit of work: a plain, compressed or archived Alpino XML file
+
+        Args:
+            path (Path): the path of the file on disk
+            member (str): for zip archives, the name of the XML file inside the archive
+            member_size (int): for zip archives, the compressed size of the XML file inside the archive
+            byte_range (tuple[int, int]): for plain XML files, the (start, end) byte range of the file this unit covers (see CorpusFile.split)
+        """
+
+        self.path = Path(path)
+        self.member = member
+        self.member_size = member_size
+        self.byte_range = byte_range
+        # The size of a whole file on disk, it is only looked up once (see CorpusFile.size)
+        self.file_size = None
+
+    @classmethod
+    def find(cls, corpus_directory: str) -> list["CorpusFile"]:
+        """Recursively find all Alpino XML files, compressed XML files and archives in a directory
+
+        Zip archives allow random access, so every XML file inside them is a separate corpus file.
+        Tar archives have to be read from start to finish, so each archive is a single corpus file.
+
+        Args:
+            corpus_directory (str): the directory where the Alpino-compatible corpus is stored
+
+        Returns:
+            list[CorpusFile]: the corpus files
+        """
+
+        files = []
+        for path in sorted(Path(corpus_directory).rglob("*")):
+            if not path.is_file():
+                continue
+
+            name = path.name.lower()
+            if cls.has_extension(name, cls.COMPRESSED_EXTENSIONS) or cls.has_extension(name, cls.TAR_EXTENSIONS):
+                files.append(cls(path))
+            elif cls.has_extension(name, cls.ZIP_EXTENSIONS):
+                with zipfile.ZipFile(path) as archive:
+                    files.extend([ cls(path, info.filename, info.compress_size) for info in archive.infolist()
+                                   if info.filename.lower().endswith(".xml") ])
+
+        return files
+
+    @staticmethod
+    def has_extension(name: str, extensions: list[str]) -> bool:
+        return any(name.endswith(extension) for extension in extensions)
+
+    @staticmethod
+    def stem(name: str) -> str:
+        """Get the name of an XML file without its directory and extensions, e.g. "WR-P-E-A-0000000001.xml.gz" becomes "WR-P-E-A-0000000001"
+
+        Args:
+            name (str): the file name or path
+
+        Returns:
+            str: the file name without extensions
+        """
+
+        name = os.path.basename(name)
+        for extension in CorpusFile.COMPRESSED_EXTENSIONS:
+            if name.lower().endswith(extension):
+                return name[:-len(extension)]
+
+        return Path(name).stem
+
+    def splitters(self, contents: list[tuple[str, bytes, int]]=None) -> Iterator[tuple[str, SentenceSplitter]]:
+        """Open the corpus file and get a sentence splitter for every XML file in it
+
+        Plain XML files are memory-mapped, compressed files and archive members are decompressed in memory.
+
+        Args:
+            contents (list[tuple[str, bytes, int]]): the contents of the corpus file, if it was already read into memory (see CorpusFile.load)
+
+        Yields:
+            tuple[str, SentenceSplitter]: the name of the XML file (see CorpusFile.stem) and its sentence splitter
+        """
+
+        name = self.path.name.lower()
+
+        if contents is not None:
+            for xml_name, buffer, offset in contents:
+                splitter = SentenceSplitter(buffer, offset)
+                try:
+                    yield xml_name, splitter
+                finally:
+                    splitter.close()
+        elif self.member is not None:
+            with zipfile.ZipFile(self.path) as archive:
+                yield from self.buffer_splitter(self.member, archive.read(self.member))
+        elif name.endswith(".xml"):
+            with SentenceSplitter.open(self.path) as splitter:
+                yield self.stem(self.path.name), splitter
+        elif self.has_extension(name, self.TAR_EXTENSIONS):
+            # Archive members are read in order, without extracting them to disk
+            with tarfile.open(self.path, "r:*") as archive:
+                for member in archive:
+                    if not member.isfile() or not member.name.lower().endswith(".xml"):
+                        continue
+
+                    yield from self.buffer_splitter(member.name, archive.extractfile(member).read())
+        else:
+            module = self.COMPRESSED_EXTENSIONS[".xml.gz" if name.endswith(".gz") else ".xml.bz2"]
+            with module.open(self.path, "rb") as reader:
+                yield from self.buffer_splitter(self.path.name, reader.read())
+
+    def load(self, spans: list[tuple[int, int]]=None) -> list[tuple[str, bytes, int]]:
+        """Read the corpus file into memory, so it can be read ahead of processing it (see Prefetcher)
+
+        Of plain XML files, only the part which a task covers is read (see CorpusFile.extent).
+        Compressed files and archives are decompressed as well.
+
+        Args:
+            spans (list[tuple[int, int]]): the sentence spans which will be checked, if not the whole file
+
+        Returns:
+            list[tuple[str, bytes, int]]: the name (see CorpusFile.stem), the contents and the offset of the contents in the file of every XML file
+        """
+
+        if self.member is None and self.path.name.lower().endswith(".xml"):
+            start, end = self.extent(spans)
+            with self.path.open("rb") as reader:
+                reader.seek(start)
+                return [ (self.stem(self.path.name), reader.read(end - start), start) ]
+
+        # Decompressed buffers stay valid after their splitter is closed
+        return [ (name, splitter.buffer, 0) for name, splitter in self.splitters() ]
+
+    def extent(self, spans: list[tuple[int, int]]=None) -> tuple[int, int]:
+        """Get the part of the file on disk which a task covers
+
+        Args:
+            spans (list[tuple[int, int]]): the sentence spans which will be checked, if not the whole file
+
+        Returns:
+            tuple[int, int]: the start and end offset, for compressed files and archives, 0 and the (compressed) size
+        """
+
+        if self.member is not None or not self.path.name.lower().endswith(".xml"):
+            return 0, self.size()
+
+        if spans is not None:
+            if len(spans) == 0:
+                return 0, 0
+
+            return min(start for start, _ in spans), max(end for _, end in spans)
+
+        if self.byte_range is not None:
+            return self.byte_range
+
+        return 0, self.size()
+
+    def split(self, range_size: int) -> list["CorpusFile"]:
+        """Split a large plain XML file into byte ranges, so its sentences can be processed by several workers at the same time
+
+        Compressed files and archives cannot be read from the middle, so they are never split.
+
+        Args:
+            range_size (int): files larger than this number of bytes are split into ranges of about this size
+
+        Returns:
+            list[CorpusFile]: a corpus file for every range, or only this corpus file if it is not split
+        """
+
+        if self.member is not None or self.byte_range is not None or not self.path.name.lower().endswith(".xml"):
+            return [ self ]
+
+        if self.size() <= range_size:
+            return [ self ]
+
+        # Ranges start at the start of a sentence, so no sentence is cut in two
+        with SentenceSplitter.open(self.path) as splitter:
+            boundaries = splitter.boundaries(range_size)
+
+        return [ CorpusFile(self.path, byte_range=(start, end)) for start, end in zip(boundaries, boundaries[1:]) ]
+
+    def buffer_splitter(self, name: str, buffer: bytes) -> Iterator[tuple[str, SentenceSplitter]]:
+        splitter = SentenceSplitter(buffer)
+        try:
+            yield self.stem(name), splitter
+        finally:
+            splitter.close()
+
+    def stat(self) -> os.stat_result:
+        """Get the status of the file on disk (for archive members, this is the status of the archive)
+
+        Returns:
+            os.stat_result: the file status
+        """
+
+        return self.path.stat()
+
+    def relative_name(self, corpus_directory: str) -> str:
+        """Get the name which identifies this corpus file within its corpus, e.g. "WR-P-E-A/part1.zip::WR-P-E-A-0000000001.xml"
+
+        Args:
+            corpus_directory (str): the directory where the corpus is stored
+
+        Returns:
+            str: the path relative to the corpus directory (with forward slashes), followed by the archive member if there is one
+                (byte ranges have the name of the whole file, so samples and shards do not depend on how files are split)
+        """
+
+        name = Path(os.path.relpath(self.path, corpus_directory)).as_posix()
+        if self.member is not None:
+            name = f"{name}::{self.member}"
+
+        return name
+
+    def size(self) -> int:
+        """Get the number of bytes this corpus file takes up on disk, used to show progress
+
+        Returns:
+            int: the size in bytes (for archive members, the compressed size of the member, for byte ranges, the size of the range)
+        """
+
+        if self.member_size is not None:
+            return self.member_size
+
+        if self.byte_range is not None:
+            return self.byte_range[1] - self.byte_range[0]
+
+        # Corpus files which are reused (e.g. by the query server) do not have to be looked up again for every query
+        if self.file_size is None:
+            self.file_size = self.stat().st_size
+
+        return self.file_size
+
+    def __str__(self) -> str:
+        name = str(self.path)
+        if self.member is not None:
+            name = f"{name}::{self.member}"
+
+        # Byte ranges are separate units of work, e.g. in the result cache
+        if self.byte_range is not None:
+            name = f"{name}@{self.byte_range[0]}-{self.byte_range[1]}"
+
+        return name
+
+    def __repr__(self) -> str:
+        return f"CorpusFile({str(self)!r})"
@@ -0,0 +1,291 @@
+from pathlib import Path
+from tqdm.auto import tqdm
+from typing import Iterator
+from .CorpusFile import CorpusFile
+from .XPathConstraints import XPathConstraints
+from xml.sax.saxutils import unescape
+
+import itertools
+import json
+import os.path
+import re
+import sqlite3
+
+class CorpusIndex:
+    SCHEMA = """
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT, member TEXT, member_size INTEGER, size INTEGER, mtime_ns INTEGER, UNIQUE (path, member));
+        CREATE TABLE sentences (id INTEGER PRIMARY KEY, file_id INTEGER, offset INTEGER, length INTEGER, sentid TEXT, sentence TEXT);
+        CREATE VIRTUAL TABLE sentences_fts USING fts5(sentence, content='sentences', content_rowid='id', tokenize='unicode61 remove_diacritics 0');
+        CREATE TABLE terms (id INTEGER PRIMARY KEY, attribute TEXT, value TEXT, UNIQUE (attribute, value));
+        CREATE TABLE postings (term_id INTEGER, sentence_id INTEGER, PRIMARY KEY (term_id, sentence_id)) WITHOUT ROWID;
+    """
+
+    # Increase this number whenever the layout of the index changes, so indexes built by older versions are not used
+    VERSION = 2
+
+    # Node attributes which are recorded in the inverted index by default
+    ATTRIBUTES = [ "cat", "pos", "pt", "rel", "wvorm", "buiging", "lemma" ]
+
+    def __init__(self, index_path: str) -> None:
+        """Corpus index object which gives access to a sentence offset index built by CorpusIndex.build
+
+        The index records, for every <alpino_ds> element in the corpus, the file it is in, its byte offset and length,
+        its sentence id and its raw sentence text. Keyword prefilters can then be run against the index, and only the
+        candidate sentences have to be read from the corpus.
+
+        In addition, an inverted index maps node attribute values (e.g. wvorm=vd or pos=adj) to the sentences containing them,
+        so the attribute constraints of an xpath query can be checked before any XML is read.
+
+        Args:
+            index_path (str): the path of the index file
+
+        Raises:
+            FileNotFoundError: if the index does not exist
+            Exception: if the index was built by an older version
+        """
+
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(index_path)
+
+        self.index_path = index_path
+        self.connection = sqlite3.connect(index_path)
+
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or int(row[0]) != self.VERSION:
+            self.connection.close()
+            raise Exception(f"The corpus index {index_path} was built by an older version. Rebuild it with BuildIndex.py.")
+
+        # The node attributes which are in the inverted index
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'attributes'").fetchone()
+        self.attributes = json.loads(row[0])
+
+    @classmethod
+    def build(cls, corpus_directory: str, index_path: str, attributes: list[str]=None) -> "CorpusIndex":
+        """Build a sentence offset index for the given corpus, this only has to happen once per corpus
+
+        Args:
+            corpus_directory (str): the directory where the Alpino-compatible corpus is stored
+            index_path (str): the path of the index file, an existing index is overwritten
+            attributes (list[str]): the node attributes to record in the inverted index, defaults to CorpusIndex.ATTRIBUTES
+
+        Raises:
+            Exception: if corpus directory contains no XML files
+
+        Returns:
+            CorpusIndex: the newly built index
+        """
+
+        # Recursively find all Alpino XML files, including compressed files and archives
+        files = CorpusFile.find(corpus_directory)
+
+        if len(files) == 0:
+            raise Exception("Corpus directory contains no XML files")
+
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+        if attributes is None:
+            attributes = cls.ATTRIBUTES
+
+        # Attribute values are read straight from the raw XML, parsing every sentence would make indexing much slower
+        # Any whitespace may precede an attribute, and its value may be quoted with single or double quotes
+        attribute_pattern = re.compile(rb'(?<=\s)(' + b"|".join(attribute.encode("utf-8") for attribute in attributes) +
+                                       rb')\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+        connection = sqlite3.connect(index_path)
+        connection.executescript(cls.SCHEMA)
+        connection.execute("INSERT INTO meta VALUES ('attributes', ?)", (json.dumps(attributes),))
+        connection.execute("INSERT INTO meta VALUES ('version', ?)", (str(cls.VERSION),))
+
+        # Term ids of all (attribute, value) pairs seen so far
+        terms = {}
+        sentence_id = 0
+
+        for file_id, file in enumerate(tqdm(files, desc='Indexing'), start=1):
+            # The size and modification time show whether the file changed after it was indexed (see CorpusIndex.check)
+            stat = file.stat()
+            connection.execute("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                               (file_id, Path(os.path.relpath(file.path, corpus_directory)).as_posix(), file.member, file.member_size,
+                                stat.st_size, stat.st_mtime_ns))
+
+            rows = []
+            postings = []
+            for _, splitter in file.splitters():
+                for start, end in splitter.spans():
+                    sentence_id += 1
+                    sentence = splitter.sentence(start, end)
+                    rows.append((sentence_id, file_id, start, end - start, splitter.sentence_id(start, end), sentence))
+
+                    # Every distinct attribute value in the sentence gets one posting
+                    sentence_terms = set(attribute_pattern.findall(splitter.buffer, start, end))
+                    for attribute, double_quoted, single_quoted in sentence_terms:
+                        value = double_quoted or single_quoted
+                        term = (attribute.decode("utf-8"), unescape(value.decode("utf-8"), { "&quot;": '"', "&apos;": "'" }))
+                        if term not in terms:
+                            terms[term] = len(terms) + 1
+                            connection.execute("INSERT INTO terms VALUES (?, ?, ?)", (terms[term], *term))
+
+                        postings.append((terms[term], sentence_id))
+
+            connection.executemany("INSERT INTO sentences VALUES (?, ?, ?, ?, ?, ?)", rows)
+            connection.executemany("INSERT OR IGNORE INTO postings VALUES (?, ?)", postings)
+
+        # Fill the full text index from the sentences table
+        connection.execute("INSERT INTO sentences_fts (sentences_fts) VALUES ('rebuild')")
+        connection.execute("CREATE INDEX sentences_file ON sentences (file_id, offset)")
+        connection.commit()
+        connection.close()
+
+        return cls(index_path)
+
+    def file_count(self) -> int:
+        """Get the number of files in the index
+
+        Returns:
+            int: the number of indexed files
+        """
+
+        return self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def check(self, corpus_directory: str) -> None:
+        """Check that the corpus still consists of exactly the indexed files, and that none of them changed since the index was built
+
+        The byte spans of a file which changed no longer point at its sentences, so the index would silently give wrong hits.
+        Files which were added after indexing would silently be skipped.
+
+        Args:
+            corpus_directory (str): the directory where the indexed corpus is stored
+
+        Raises:
+            Exception: if a file was added to the corpus, or an indexed file was changed or removed
+        """
+
+        stale = []
+        for path, size, mtime_ns in self.connection.execute("SELECT DISTINCT path, size, mtime_ns FROM files ORDER BY path"):
+            try:
+                stat = os.stat(Path(corpus_directory) / path)
+            except FileNotFoundError:
+                stale.append(path)
+                continue
+
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                stale.append(path)
+
+        # The corpus files (and zip members) are compared with the indexed ones, in both directions
+        indexed = set(self.connection.execute("SELECT path, member FROM files").fetchall())
+        found = set((Path(os.path.relpath(file.path, corpus_directory)).as_posix(), file.member) for file in CorpusFile.find(corpus_directory))
+
+        added = sorted(found - indexed, key=lambda file: (file[0], file[1] or ""))
+        removed = sorted(indexed - found, key=lambda file: (file[0], file[1] or ""))
+        stale.extend(path if member is None else f"{path}::{member}" for path, member in added + removed)
+        # A removed file is found both ways
+        stale = list(dict.fromkeys(stale))
+
+        if len(stale) > 0:
+            raise Exception(f"The corpus index {self.index_path} is out of date: {len(stale)} files were added, changed or removed since it was built "
+                            f"(e.g. {stale[0]}). Rebuild it with BuildIndex.py.")
+
+    def candidates(self, corpus_directory: str, keywords: list[str]=None, constraints: XPathConstraints=None) -> Iterator[tuple[CorpusFile, list[tuple[int, int]]]]:
+        """Find the sentences which contain at least one of the given keywords and satisfy the attribute constraints, grouped by file
+
+        Args:
+            corpus_directory (str): the directory where the indexed corpus is stored
+            keywords (list[str]): the keywords to look for (case insensitive, whole words only), if None, all sentences are candidates
+            constraints (XPathConstraints): the attribute constraints of the query, if None, all sentences are candidates
+
+        Yields:
+            tuple[CorpusFile, list[tuple[int, int]]]: a corpus file and the (start, end) byte spans of its candidate sentences
+                (None for tar archives, which are always processed as a whole)
+        """
+
+        # No keywords at all means that no sentence can pass the prefilter
+        if keywords is not None and len(keywords) == 0:
+            return
+
+        conditions = []
+        parameters = []
+
+        if keywords is not None:
+            conditions.append("sentences.id IN (SELECT rowid FROM sentences_fts WHERE sentences_fts MATCH ?)")
+            parameters.append(self.match_expression(keywords))
+
+        # Only constraints on attributes which are in the inverted index can be used
+        expression = None
+        if constraints is not None:
+            expression = constraints.restrict(self.attributes)
+
+        if expression is not None:
+            constraint_query, constraint_parameters = self.constraint_query(expression)
+            conditions.append(f"sentences.id IN ({constraint_query})")
+            parameters.extend(constraint_parameters)
+
+        where = ""
+        if len(conditions) > 0:
+            where = "WHERE " + " AND ".join(conditions)
+
+        rows = self.connection.execute(f"""
+            SELECT files.id, files.path, files.member, files.member_size, sentences.offset, sentences.length
+            FROM sentences JOIN files ON files.id = sentences.file_id
+            {where}
+            ORDER BY sentences.file_id, sentences.offset""", parameters)
+
+        for (_, path, member, member_size), group in itertools.groupby(rows, key=lambda row: row[:4]):
+            file = CorpusFile(Path(corpus_directory) / path, member, member_size)
+            spans = [ (offset, offset + length) for _, _, _, _, offset, length in group ]
+
+            # A tar archive contains several XML files, an offset alone does not say which one a sentence is in
+            if CorpusFile.has_extension(path.lower(), CorpusFile.TAR_EXTENSIONS):
+                spans = None
+
+            yield file, spans
+
+    @classmethod
+    def constraint_query(cls, expression: tuple) -> tuple[str, list]:
+        """Turn an attribute constraint expression into a query which intersects and merges the posting lists
+
+        Args:
+            expression (tuple): the constraint expression (see XPathConstraints)
+
+        Returns:
+            tuple[str, list]: the SQL query returning the ids of the matching sentences, and its parameters
+        """
+
+        kind = expression[0]
+        if kind == "attribute":
+            return """SELECT sentence_id FROM postings
+                      WHERE term_id = (SELECT id FROM terms WHERE attribute = ? AND value = ?)""", [ expression[1], expression[2] ]
+
+        # "and" intersects the posting lists, "or" merges them
+        operator = " INTERSECT " if kind == "and" else " UNION "
+
+        queries = []
+        parameters = []
+        for term in expression[1]:
+            query, term_parameters = cls.constraint_query(term)
+            queries.append(f"SELECT sentence_id FROM ({query})")
+            parameters.extend(term_parameters)
+
+        return operator.join(queries), parameters
+
+    @staticmethod
+    def match_expression(keywords: list[str]) -> str:
+        """Turn a list of keywords into a full text search expression which matches any of them
+
+        Args:
+            keywords (list[str]): the keywords (or multi-word expressions)
+
+        Returns:
+            str: the FTS5 match expression
+        """
+
+        # Every keyword is a quoted phrase, so multi-word keywords and special characters are safe
+        phrases = [ '"' + keyword.replace('"', '""') + '"' for keyword in keywords ]
+
+        return " OR ".join(phrases)
+
+    def close(self) -> None:
+        """Close the connection to the index
+        """
+
+        self.connection.close()
@@ -0,0 +1,92 @@
+from operator import itemgetter
+
+import pandas as pd
+
+class HitSchema:
+    # Column types: sentence text, strings with few distinct values (e.g. lemmas), other strings, integers and arbitrary Python objects
+    # Missing values are allowed in every column
+    TYPES = { "text": "string", "category": "category", "string": "string", "int": "Int64", "object": object }
+
+    def __init__(self, columns: dict[str, str]) -> None:
+        """Hit schema object which declares the output columns of a case study and their types
+
+        A hit is a flat tuple with one value for every column, in the order of the schema. Tuples have no per-object dictionary,
+        so this is the most compact record Python offers, and they are pickled cheaply when they are sent back by the worker processes.
+        All hits of a sentence refer to the same sentence string, so the sentence text is stored only once per sentence.
+
+        Args:
+            columns (dict[str, str]): column name -> column type (see HitSchema.TYPES), in output order
+
+        Raises:
+            ValueError: if a column type is unknown
+        """
+
+        for name, column_type in columns.items():
+            if column_type not in self.TYPES:
+                raise ValueError(f"Unrecognised type '{column_type}' for column '{name}'. Specify one of {', '.join(self.TYPES)}.")
+
+        self.columns = columns
+        self.names = list(columns)
+        # Column name -> position in a hit
+        self.positions = { name: position for position, name in enumerate(self.names) }
+
+    def values(self, hit: tuple, names: list[str]) -> tuple:
+        """Get the values of the given columns from a hit
+
+        Args:
+            hit (tuple): the hit
+            names (list[str]): the column names
+
+        Returns:
+            tuple: the values of the columns
+        """
+
+        return tuple(hit[self.positions[name]] for name in names)
+
+    def row(self, hit: tuple) -> dict:
+        return dict(zip(self.names, hit))
+
+    def dataframe(self, hits: list[tuple]) -> pd.DataFrame:
+        """Build a data frame from a list of hits, column by column
+
+        Args:
+            hits (list[tuple]): the hits
+
+        Returns:
+            pd.DataFrame: one row per hit, with the declared column types
+        """
+
+        # Transpose the hits into columns without creating a dictionary for every row
+        columns = [ list(map(itemgetter(position), hits)) for position in range(len(self.names)) ]
+
+        return pd.DataFrame({ name: self.column(values, self.columns[name]) for name, values in zip(self.names, columns) })
+
+    def column(self, values: list, column_type: str) -> pd.Series:
+        # Fill a column with the declared type directly, without an intermediate column of Python objects
+        if column_type == "category":
+            return pd.Series(pd.Categorical(values))
+
+        return pd.Series(pd.array(values, dtype=self.TYPES[column_type]))
+
+    def convert(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Give the columns of a data frame (e.g. read from an output file) the declared types
+
+        Args:
+            df (pd.DataFrame): the data frame, columns which are not part of the schema are left alone
+
+        Returns:
+            pd.DataFrame: the data frame with typed columns
+        """
+
+        for name, column_type in self.columns.items():
+            if name not in df.columns or self.TYPES[column_type] is object:
+                continue
+
+            if column_type == "int":
+                # Values read from text files have to be parsed first, empty values are missing
+                values = df[name]
+                df[name] = pd.to_numeric(values.where(values != "")).astype(self.TYPES[column_type])
+            else:
+                df[name] = df[name].astype(self.TYPES[column_type])
+
+        return df
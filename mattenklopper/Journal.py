@@ -0,0 +1,133 @@
+from pathlib import Path
+from typing import Iterator
+from .CorpusFile import CorpusFile
+from .ResultCache import ResultCache
+
+import os
+import pickle
+
+class Journal:
+    def __init__(self, journal_path: str, query_key: str) -> None:
+        """Journal object which records every finished corpus file together with its hits, so an interrupted run can be resumed
+
+        The journal is an append-only file of pickled records. The first record identifies the query, every other record
+        contains the key of a finished file (see ResultCache.key) and its hits. Records are flushed as soon as a file is finished,
+        so they survive the process being killed. A record which was cut off halfway is dropped when the journal is opened again.
+
+        Args:
+            journal_path (str): the path of the journal file, it is created if it does not exist
+            query_key (str): a key which identifies the query (see CaseStudy.get_query_key)
+
+        Raises:
+            Exception: if the journal was written for a different query
+        """
+
+        self.journal_path = journal_path
+        self.query_key = query_key
+
+        # File key -> offset of its record in the journal
+        self.offsets = {}
+
+        # Offset after the last complete record, anything behind it was cut off
+        end = self.load()
+
+        if end > 0:
+            self.writer = open(journal_path, "r+b")
+            self.writer.seek(end)
+            self.writer.truncate()
+        else:
+            self.writer = open(journal_path, "wb")
+            self.append({ "query_key": query_key })
+
+    def load(self) -> int:
+        # Find the finished files in an existing journal
+        if not os.path.exists(self.journal_path):
+            return 0
+
+        end = 0
+        with open(self.journal_path, "rb") as reader:
+            try:
+                header = pickle.load(reader)
+            except (EOFError, pickle.UnpicklingError):
+                return 0
+
+            if not isinstance(header, dict) or header.get("query_key") != self.query_key:
+                raise Exception(f"The journal {self.journal_path} belongs to a different query. Remove it or choose another journal path.")
+
+            end = reader.tell()
+
+            while True:
+                offset = reader.tell()
+                try:
+                    key, _ = pickle.load(reader)
+                except (EOFError, pickle.UnpicklingError, ValueError):
+                    break
+
+                self.offsets[key] = offset
+                end = reader.tell()
+
+        return end
+
+    def key(self, pfin: Path | CorpusFile, spans: list[tuple[int, int]]=None) -> str:
+        """Compute the key of a corpus file in the journal, which changes whenever the file or the query changes
+
+        Args:
+            pfin (Path | CorpusFile): the corpus file
+            spans (list[tuple[int, int]]): the sentence spans which are checked, if not the whole file
+
+        Returns:
+            str: the journal key
+        """
+
+        if not isinstance(pfin, CorpusFile):
+            pfin = CorpusFile(pfin)
+
+        return ResultCache.key(pfin, self.query_key, spans)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def replay(self, keys: list[str]) -> Iterator[list[tuple]]:
+        """Read the hits of finished corpus files from the journal
+
+        Args:
+            keys (list[str]): the journal keys of the files
+
+        Yields:
+            list[tuple]: the hits of every file, in the order of the keys
+        """
+
+        with open(self.journal_path, "rb") as reader:
+            for key in keys:
+                reader.seek(self.offsets[key])
+                _, hits = pickle.load(reader)
+
+                yield hits
+
+    def add(self, key: str, hits: list[tuple]) -> None:
+        """Record a finished corpus file and its hits
+
+        Args:
+            key (str): the journal key of the file
+            hits (list[tuple]): the hits of the file (can be empty)
+        """
+
+        self.offsets[key] = self.writer.tell()
+        self.append((key, hits))
+
+    def append(self, record: object) -> None:
+        pickle.dump(record, self.writer)
+
+        # Flushed records survive the process being killed
+        self.writer.flush()
+
+    def close(self) -> None:
+        if self.writer.closed:
+            return
+
+        # Make sure the journal also survives the machine going down
+        os.fsync(self.writer.fileno())
+        self.writer.close()
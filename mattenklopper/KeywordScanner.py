@@ -0,0 +1,81 @@
+from typing import Iterator
+from .SentenceSplitter import SentenceSplitter
+
+import re
+
+class KeywordScanner:
+    # Characters which may not surround a keyword, the same word boundaries flashtext uses
+    WORD_CHARACTERS = b"A-Za-z0-9_"
+
+    def __init__(self, keywords: list[str]) -> None:
+        """Keyword scanner object which finds the sentences containing any of the closed class items in a whole file at once
+
+        All keywords are combined into a single regular expression, which only matches inside the text of a <sentence> element.
+        A file is then scanned in one pass by the regex engine, and only the candidate <alpino_ds> elements reach Python code.
+        Keywords are matched case-insensitively and as whole words, like the flashtext prefilter.
+
+        Args:
+            keywords (list[str]): the closed class items
+        """
+
+        # Bytes patterns only ignore the case of ASCII letters, so other cased letters are added in both forms
+        variants = set()
+        for keyword in keywords:
+            for variant in [ keyword, keyword.lower(), keyword.upper(), keyword.capitalize() ]:
+                variants.add(re.escape(variant.encode("utf-8")))
+
+        # Longer keywords first, so they are preferred over their prefixes
+        alternation = b"|".join(sorted(variants, key=lambda variant: (-len(variant), variant)))
+        boundary = self.WORD_CHARACTERS
+
+        # An empty alternation never matches, so files are skipped entirely if there are no keywords
+        if len(variants) == 0:
+            alternation = b"(?!)"
+
+        # <sentence ...> followed by text (XML text cannot contain "<") and a keyword surrounded by word boundaries
+        self.pattern = re.compile(SentenceSplitter.SENTENCE_OPEN_TAG + b"[^>]*>[^<]*?" +
+                                  b"(?<![" + boundary + b"])(?:" + alternation + b")(?![" + boundary + b"])",
+                                  re.IGNORECASE)
+
+    def spans(self, splitter: SentenceSplitter, start: int=None, end: int=None) -> Iterator[tuple[int, int]]:
+        """Find the byte spans of all <alpino_ds> elements whose sentence contains any of the keywords
+
+        Args:
+            splitter (SentenceSplitter): the splitter of the file to scan
+            start (int): the byte offset (in the file) to start scanning from, defaults to the start of the buffer
+            end (int): the byte offset (in the file) to stop scanning at, defaults to the end of the buffer
+
+        Yields:
+            tuple[int, int]: start and end offset of a single candidate <alpino_ds> element
+        """
+
+        buffer = splitter.buffer
+        search = self.pattern.search
+
+        # The buffer may only hold part of the file (see SentenceSplitter)
+        offset = splitter.offset
+        start = 0 if start is None else start - offset
+        end = len(buffer) if end is None else end - offset
+
+        while True:
+            match = search(buffer, start, end)
+            if match is None:
+                return
+
+            # The <alpino_ds> element around the matched sentence
+            sentence_start = match.start()
+            span_start = buffer.rfind(SentenceSplitter.OPEN_TAG, start, sentence_start)
+            close = buffer.find(SentenceSplitter.CLOSE_TAG, sentence_start, end)
+
+            # Truncated sentence at the end of the buffer
+            if close == -1:
+                return
+
+            stop = close + len(SentenceSplitter.CLOSE_TAG)
+
+            # A <sentence> element outside of an <alpino_ds> element is not a sentence
+            if span_start != -1:
+                yield span_start + offset, stop + offset
+
+            # Other matches in the same element do not matter
+            start = stop
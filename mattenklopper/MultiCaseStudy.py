@@ -0,0 +1,140 @@
+from .CaseStudy import CaseStudy
+from .KeywordScanner import KeywordScanner
+from .Sampler import Sampler
+from .SentenceSplitter import SentenceSplitter
+from lxml import etree as ET
+from typing import Iterator
+
+import json
+
+class MultiCaseStudy(CaseStudy):
+    def __init__(self, corpus_directory: str, workers: int=None, chunk_size: int=16, index_path: str=None,
+                 cache_directory: str=None, cache_size: int=None, stats_path: str=None, max_hits: int=None, sampler: Sampler=None,
+                 shard: set[str]=None, journal_path: str=None, split_size: int=32 * 1024 * 1024,
+                 read_ahead: int=None, read_ahead_size: int=256 * 1024 * 1024) -> None:
+        """Case study object which runs several case studies in a single pass over the corpus
+
+        Every sentence is read and parsed only once. Each registered case study then runs its own prefilters,
+        general xpath and secondary processing on the shared tree.
+
+        Args:
+            corpus_directory (str): the directory where the Alpino-compatible corpus is stored, all XML files in here will be processed
+            workers (int): the number of worker processes, defaults to the number of CPUs
+            chunk_size (int): the number of files which are handed to a worker process at once
+            index_path (str): path to a sentence offset index of the corpus (see CorpusIndex.build), if given, only candidate sentences are read
+            cache_directory (str): directory for the result cache, if given, files which have not changed since the previous run with the same queries are not processed again
+            cache_size (int): maximum size of the result cache in bytes, if None, the cache is never trimmed
+            stats_path (str): path of the JSON statistics report which is written at the end of every run, if None, no report is written
+            max_hits (int): stop as soon as this many hits (of all case studies together) were found, if None, the whole corpus is processed
+            sampler (Sampler): if given, only a reproducible random sample of the corpus files or sentences is processed
+            shard (set[str]): names of the corpus files to process (see Shards), if None, all files are processed
+            journal_path (str): path to a journal of finished files and their hits, if given, a run which was interrupted resumes where it stopped
+            split_size (int): plain XML files larger than this number of bytes are split into sentence-aligned ranges which are processed in parallel, if None, files are never split
+            read_ahead (int): the number of files every worker process reads ahead while it processes the current file (see Prefetcher), if None, files are not read ahead
+            read_ahead_size (int): the maximum number of bytes every worker process reads ahead
+        """
+
+        # The closed class items belong to the individual case studies
+        super().__init__(corpus_directory, None, workers, chunk_size, index_path, cache_directory, cache_size, stats_path,
+                         max_hits, sampler, shard, journal_path, split_size, read_ahead, read_ahead_size)
+
+        # Registered case studies, by name
+        self.case_studies = {}
+        # General xpaths of the registered case studies, by name
+        self.queries = {}
+
+    def register(self, name: str, case_study: CaseStudy, *args) -> None:
+        """Register a case study which should be run in the single pass
+
+        Args:
+            name (str): the name of the case study, hits are labelled with this name
+            case_study (CaseStudy): the case study object
+            *args: the arguments the case study's filter method would take (e.g. the order for RoodGroen)
+
+        Raises:
+            Exception: if a case study with the same name was already registered
+        """
+
+        if name in self.case_studies:
+            raise Exception(f"A case study called '{name}' was already registered")
+
+        xpath = case_study.query(*args)
+        case_study.prepare(xpath)
+
+        self.case_studies[name] = case_study
+        self.queries[name] = xpath
+
+    def filter(self, stream: bool=False) -> list[tuple] | Iterator[tuple]:
+        """Apply the filtering operation for all registered case studies
+
+        Args:
+            stream (bool): if True, return a generator which yields hits as they are found
+
+        Raises:
+            Exception: if no case studies were registered
+
+        Returns:
+            list[tuple] | Iterator[tuple]: list (or generator) of (case study name, hit) tuples
+        """
+
+        if len(self.case_studies) == 0:
+            raise Exception("No case studies registered. Use register() to add case studies.")
+
+        # The combined query is never run itself
+        # A sentence can only match if it matches any of the registered queries, which gives the shared prefilter
+        combined_xpath = " | ".join(self.queries.values())
+
+        # Likewise, a sentence without any of the closed class items of the case studies can be skipped
+        keywords = self.keywords()
+        self.keyword_scanner = KeywordScanner(keywords) if keywords is not None else None
+
+        return super().filter(combined_xpath, stream)
+
+    def keywords(self) -> list[str] | None:
+        keywords = []
+        for case_study in self.case_studies.values():
+            case_study_keywords = case_study.keywords()
+
+            # If one case study considers every sentence, the combined query has to as well
+            if case_study_keywords is None:
+                return None
+
+            keywords.extend(case_study_keywords)
+
+        return keywords
+
+    def get_query_key(self) -> str:
+        return json.dumps([ type(self).__name__, { name: case_study.get_query_key() for name, case_study in self.case_studies.items() },
+                            self.sentence_sample_key() ])
+
+    def filter_sentence(self, splitter: SentenceSplitter, start: int, end: int, filename: str) -> list[tuple]:
+        # Every case study runs its own prefilters, so sentences nobody is interested in are never parsed
+        with self.statistics.timer("prefilter"):
+            interested = [ (name, case_study) for name, case_study in self.case_studies.items()
+                           if case_study.accepts(splitter, start, end) ]
+
+        if len(interested) == 0:
+            return []
+
+        self.statistics.count("prefilter_passed")
+
+        # Parse the sentence only once for all case studies
+        with self.statistics.timer("parse"):
+            alpino_ds = ET.fromstring(splitter.xml(start, end))
+
+        self.statistics.count("parsed")
+
+        total_hits = []
+        for name, case_study in interested:
+            # The registered case studies count towards the statistics of this run
+            case_study.statistics = self.statistics
+
+            # The tree is shared, so it cannot be cleared
+            for hit in case_study.filter_tree(alpino_ds, filename, clear=False):
+                total_hits.append((name, hit))
+
+        return total_hits
+
+    def to_row(self, hit: tuple) -> dict:
+        name, hit = hit
+        return self.case_studies[name].to_row(hit)
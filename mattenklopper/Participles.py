@@ -1,25 +1,45 @@
 from .CaseStudy import CaseStudy
 from .Constants import Constants
+from .HitSchema import HitSchema
+from .XPathCache import XPathCache
 from lxml import etree as ET
+from typing import Iterator
 
 class Participles(CaseStudy):
-    def filter(self) -> list[tuple]:
+    # Output columns and their types
+    SCHEMA = HitSchema({ "sentence": "text", "participle": "string", "participle_lemma": "category", "file": "category", "sentence_id": "string" })
+
+    def filter(self, stream: bool=False) -> list[tuple] | Iterator[tuple]:
         """Apply the filtering operation for participles search
 
+        Args:
+            stream (bool): if True, return a generator which yields hits as they are found
+
+        Returns:
+            list[tuple] | Iterator[tuple]: list (or generator) of hits, with the columns of Participles.SCHEMA
+        """
+
+        return super().filter(self.query(), stream)
+
+    def query(self) -> str:
+        """Get the general xpath for the participles search, without running it
+
         Returns:
-            list[tuple]: list of tuples containing: (sentence, (participle, participle lemma), filename)
+            str: the general xpath
         """
 
         # We use the general XPATH to look for sentences with a past participle
         general_xpath = Constants.GENERAL_XPATHS["participles"]
 
-        return super().filter(general_xpath)
+        return general_xpath
 
-    def secondary_processing(self, element : ET) -> tuple:
+    def secondary_processing(self, element : ET, filename : str = "??.xml", sentence_id : str="??") -> tuple:
         """Apply secondary processing for the participles search
 
         Args:
             element (ET): the element containing the matched sentence
+            filename (str): the name of the parsed file
+            sentence_id (str): the name of this sentence
 
         Returns:
             tuple: a tuple containing the participle and participle lemma
@@ -27,9 +47,16 @@ class Participles(CaseStudy):
 
         # The following two xpaths are used to find the specific participles and auxiliaries
         # The query is the same for both orders, only the operators are different
-        participle_xpath = Constants.SPECIFIC_XPATHS["participles"]
+        participle_xpath = XPathCache.compiled(Constants.SPECIFIC_XPATHS["participles"])
 
-        participle = element.xpath(participle_xpath)[0].get('word')
-        participle_lemma = element.xpath(participle_xpath)[0].get('lemma')
+        # Only evaluate the query once, both attributes come from the same node
+        participle_match = participle_xpath(element)[0]
+        participle = participle_match.get('word')
+        participle_lemma = participle_match.get('lemma')
 
         return participle, participle_lemma
+
+    def record(self, sentence: str, filename: str, sentence_id: str, data: tuple) -> tuple:
+        participle, participle_lemma = data
+
+        return sentence, participle, participle_lemma, filename, sentence_id
@@ -0,0 +1,75 @@
+from collections import deque
+from typing import Iterator
+from .CorpusFile import CorpusFile
+
+import concurrent.futures
+
+class Prefetcher:
+    def __init__(self, window: int=None, byte_budget: int=256 * 1024 * 1024) -> None:
+        """Prefetcher object which reads the next corpus files of a worker in background threads while the current file is being processed
+
+        On network filesystems, a worker which reads its files one by one waits for every file before it can parse it.
+        The prefetcher keeps up to window files in flight, so reading overlaps with parsing and XPath evaluation.
+        Reading (and decompressing) releases the global interpreter lock, so the threads do not slow down the worker itself.
+        Files are read ahead within the chunk of files a worker received (see Scheduler.chunks).
+
+        Args:
+            window (int): the maximum number of files which are read ahead, if None, files are not read ahead
+            byte_budget (int): the maximum number of bytes which are read ahead (measured on disk), a single file can be larger
+        """
+
+        self.window = window
+        self.byte_budget = byte_budget
+
+    def prefetch(self, tasks: list[tuple[CorpusFile, list]]) -> Iterator[tuple[int, CorpusFile, list, concurrent.futures.Future | None]]:
+        """Read the given files ahead, in order
+
+        Args:
+            tasks (list[tuple[CorpusFile, list]]): the files to process, with the sentence spans to check (None for all sentences)
+
+        Yields:
+            tuple[int, CorpusFile, list, concurrent.futures.Future | None]: the position of the task, the file, its spans and a future
+                with the contents of the file (see CorpusFile.load), or None if files are not read ahead
+        """
+
+        if self.window is None:
+            for position, (file, spans) in enumerate(tasks):
+                yield position, file, spans, None
+
+            return
+
+        tasks = deque(enumerate(tasks))
+        # (position, file, spans, future, size) of the files in flight, in order
+        pending = deque()
+        pending_bytes = 0
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.window) as executor:
+            try:
+                while len(tasks) > 0 or len(pending) > 0:
+                    # Top up the window, the next file is always read, even if it is larger than the budget on its own
+                    while len(tasks) > 0 and len(pending) < self.window:
+                        position, (file, spans) = tasks[0]
+                        size = self.size(file, spans)
+
+                        if len(pending) > 0 and pending_bytes + size > self.byte_budget:
+                            break
+
+                        tasks.popleft()
+                        pending.append((position, file, spans, executor.submit(file.load, spans), size))
+                        pending_bytes += size
+
+                    position, file, spans, future, size = pending.popleft()
+                    yield position, file, spans, future
+
+                    # The contents are released once the caller is done with them
+                    pending_bytes -= size
+            finally:
+                # Files which have not started yet are not read at all if the caller stops early
+                for _, _, _, future, _ in pending:
+                    future.cancel()
+
+    @staticmethod
+    def size(file: CorpusFile, spans: list[tuple[int, int]]) -> int:
+        start, end = file.extent(spans)
+
+        return end - start
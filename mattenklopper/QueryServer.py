@@ -0,0 +1,272 @@
+from functools import partial
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Iterator
+from .Adjectives import Adjectives
+from .CaseStudy import CaseStudy
+from .CorpusFile import CorpusFile
+from .Participles import Participles
+from .RoodGroen import RoodGroen
+from .Sampler import Sampler
+from .Scheduler import Scheduler
+from .XPathCache import XPathCache
+from .XPathQuery import XPathQuery
+
+import json
+import os.path
+import time
+
+class QueryServer:
+    # Case studies which can be queried by name: the case study class, whether it uses the closed class items and its default arguments
+    CASE_STUDIES = { "rood_groen": (RoodGroen, True, [ "red_green" ]),
+                     "participles": (Participles, False, []),
+                     "adjectives": (Adjectives, False, []) }
+
+    def __init__(self, corpus_directory: str, closed_class_items: dict=None, workers: int=None, chunk_size: int=16, index_path: str=None,
+                 split_size: int=32 * 1024 * 1024, read_ahead: int=None, read_ahead_size: int=256 * 1024 * 1024) -> None:
+        """Query server object which keeps the worker processes, the corpus file list and the compiled queries in memory between queries
+
+        A script has to import its dependencies, start a pool of worker processes and crawl the corpus before every query.
+        The query server does all of this once, so an interactive query only costs the work of the query itself.
+        The worker processes build the case study of every query themselves and keep it (see Scheduler.filter_query_chunk),
+        so the same query only pays for its keyword processor and its compiled xpaths once.
+
+        Args:
+            corpus_directory (str): the directory where the Alpino-compatible corpus is stored
+            closed_class_items (dict): the closed class items of the RoodGroen case study, if None, it considers every sentence
+            workers (int): the number of worker processes, defaults to the number of CPUs
+            chunk_size (int): the number of files which are handed to a worker process at once
+            index_path (str): path to a sentence offset index of the corpus (see CorpusIndex.build), if given, only candidate sentences are read
+            split_size (int): plain XML files larger than this number of bytes are split into ranges (see CaseStudy), if None, files are never split
+            read_ahead (int): the number of files every worker process reads ahead (see Prefetcher), if None, files are not read ahead
+            read_ahead_size (int): the maximum number of bytes every worker process reads ahead
+
+        Raises:
+            Exception: if corpus directory contains no XML files
+        """
+
+        if not os.path.exists(corpus_directory):
+            raise FileNotFoundError(corpus_directory)
+
+        if index_path is not None and not os.path.exists(index_path):
+            raise FileNotFoundError(index_path)
+
+        # Everything the worker processes need to build the case study of a query
+        self.settings = { "corpus_directory": corpus_directory, "closed_class_items": closed_class_items, "index_path": index_path,
+                          "split_size": split_size, "read_ahead": read_ahead, "read_ahead_size": read_ahead_size }
+
+        # The worker processes are started once and shared by all queries
+        self.scheduler = Scheduler(workers, chunk_size, split_size, partial(QueryServer.build, self.settings))
+
+        # The corpus is only crawled and split once, restart the server when files are added or changed
+        self.tasks = None
+        self.corpus_size = None
+        if index_path is None:
+            files = CorpusFile.find(corpus_directory)
+
+            if len(files) == 0:
+                raise Exception("Corpus directory contains no XML files")
+
+            self.tasks = [ (file_range, None) for file in files for file_range in (file.split(split_size) if split_size is not None else [ file ]) ]
+
+            # The sizes are kept by the corpus files, so progress and chunking do not look up every file again for every query
+            self.corpus_size = sum(Scheduler.weight(file, spans) for file, spans in self.tasks)
+
+    @classmethod
+    def parse(cls, request: dict) -> str:
+        """Check a query request and turn it into the query which is sent to the worker processes
+
+        A request names a case study (with the arguments of its filter method, e.g. the order for RoodGroen) or gives a raw xpath,
+        and can ask for a random sample of the corpus (see Sampler).
+
+        Args:
+            request (dict): the request, e.g. { "study": "rood_groen", "args": [ "red" ] } or { "xpath": "//node[@cat='ppart']" }
+
+        Raises:
+            ValueError: if the request is invalid
+
+        Returns:
+            str: the query, the same request always gives the same query
+        """
+
+        if not isinstance(request, dict):
+            raise ValueError("The request should be a JSON object")
+
+        study = request.get("study")
+        xpath = request.get("xpath")
+
+        if (study is None) == (xpath is None):
+            raise ValueError("Specify either a case study or an xpath")
+
+        if study is not None and study not in cls.CASE_STUDIES:
+            raise ValueError(f"Unrecognised case study '{study}'. Specify one of {', '.join(cls.CASE_STUDIES)}.")
+
+        args = request.get("args")
+        if study is not None and args is None:
+            args = cls.CASE_STUDIES[study][2]
+
+        if args is not None and not isinstance(args, list):
+            raise ValueError("The arguments of a case study should be a list")
+
+        sample = request.get("sample")
+        sample_unit = request.get("sample_unit", "file")
+        seed = request.get("seed", 0)
+
+        # Check the sample here, so the worker processes never receive an invalid one
+        if sample is not None:
+            Sampler(sample, sample_unit, seed)
+
+        return json.dumps({ "study": study, "args": args, "xpath": xpath, "sample": sample, "sample_unit": sample_unit, "seed": seed },
+                          sort_keys=True)
+
+    @classmethod
+    def build(cls, settings: dict, query: str) -> CaseStudy:
+        """Build and prepare the case study of a query, both in the server and in the worker processes
+
+        Args:
+            settings (dict): the settings of the server
+            query (str): the query (see QueryServer.parse)
+
+        Returns:
+            CaseStudy: the case study, with its xpath set
+        """
+
+        query = json.loads(query)
+
+        if query["study"] is None:
+            case_study_class = XPathQuery
+            closed_class_items = None
+            args = [ query["xpath"] ]
+        else:
+            case_study_class, uses_closed_class_items, _ = cls.CASE_STUDIES[query["study"]]
+            closed_class_items = settings["closed_class_items"] if uses_closed_class_items else None
+            args = query["args"]
+
+        sampler = None
+        if query["sample"] is not None:
+            sampler = Sampler(query["sample"], query["sample_unit"], query["seed"])
+
+        case_study = case_study_class(settings["corpus_directory"], closed_class_items, index_path=settings["index_path"], sampler=sampler,
+                                      split_size=settings["split_size"], read_ahead=settings["read_ahead"],
+                                      read_ahead_size=settings["read_ahead_size"])
+        case_study.prepare(case_study.query(*args))
+
+        return case_study
+
+    def query(self, request: dict) -> tuple[CaseStudy, Iterator[tuple]]:
+        """Start a query on the warm worker processes
+
+        Args:
+            request (dict): the request (see QueryServer.parse), "max_hits" stops the query as soon as this many hits were found
+
+        Raises:
+            ValueError: if the request is invalid
+
+        Returns:
+            tuple[CaseStudy, Iterator[tuple]]: the case study of the query and a generator of its hits, closing it cancels the query
+        """
+
+        query = self.parse(request)
+
+        case_study = self.build(self.settings, query)
+
+        # An invalid xpath is reported to the client, instead of failing in every worker process
+        XPathCache.compiled(case_study.xpath)
+
+        max_hits = request.get("max_hits")
+        if max_hits is not None and (not isinstance(max_hits, int) or max_hits < 1):
+            raise ValueError("The maximum number of hits should be at least 1")
+
+        case_study.max_hits = max_hits
+
+        # The case study runs on the shared worker processes, which build their own copy of it from the query
+        case_study.scheduler = self.scheduler
+        case_study.warm_query = query
+
+        if self.tasks is None:
+            return case_study, case_study.filter_index()
+
+        return case_study, case_study.filter_tasks(self.tasks)
+
+    def serve(self, host: str="127.0.0.1", port: int=8000) -> None:
+        """Answer queries over HTTP until the server is interrupted
+
+        Queries are answered one at a time, every query gets all worker processes.
+
+        Args:
+            host (str): the address to listen on, only local clients can connect by default
+            port (int): the port to listen on
+        """
+
+        http_server = HTTPServer((host, port), QueryHandler)
+        http_server.query_server = self
+
+        # Start the worker processes right away, so the first query does not wait for them
+        self.scheduler.executor(None).submit(int).result()
+
+        if self.tasks is not None:
+            print(f"[Server] {len(self.tasks)} files and file ranges, {self.corpus_size / 1024 / 1024:.1f} MB")
+
+        print(f"[Server] Listening on http://{host}:{http_server.server_port}")
+
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            http_server.server_close()
+            self.scheduler.close()
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Request handler of the query server
+
+    POST /query with a JSON request (see QueryServer.parse) streams the hits back as newline-delimited JSON, one object per hit.
+    GET /studies lists the case studies which can be queried by name.
+    """
+
+    def do_GET(self) -> None:
+        if self.path != "/studies":
+            self.send_json(404, { "error": f"Unknown path {self.path}" })
+            return
+
+        self.send_json(200, list(QueryServer.CASE_STUDIES))
+
+    def do_POST(self) -> None:
+        if self.path != "/query":
+            self.send_json(404, { "error": f"Unknown path {self.path}" })
+            return
+
+        t1 = time.perf_counter()
+
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            case_study, hits = self.server.query_server.query(request)
+        except Exception as error:
+            self.send_json(400, { "error": f"{type(error).__name__}: {error}" })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        # Hits are written as soon as the worker processes find them
+        count = 0
+        try:
+            for hit in hits:
+                self.wfile.write((json.dumps(case_study.to_row(hit), ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                count += 1
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away, the work which has not started yet is cancelled
+            print("[Server] Client disconnected")
+        finally:
+            hits.close()
+
+        print(f"[Server] {count} hits for {json.dumps(request)} in {time.perf_counter() - t1} seconds")
+
+    def send_json(self, status: int, body: object) -> None:
+        body = json.dumps(body).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
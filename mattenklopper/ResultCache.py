@@ -0,0 +1,111 @@
+from pathlib import Path
+from .CorpusFile import CorpusFile
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+class ResultCache:
+    def __init__(self, cache_directory: str, max_size: int=None) -> None:
+        """Result cache object which stores the hits of every corpus file on disk, so unchanged files are not processed again
+
+        Entries are keyed by the file (path, size and modification time) and the query. The least recently used entries
+        are removed when the cache grows beyond its maximum size. Worker processes read and write the cache directly;
+        every entry is a separate file which is written atomically, so no locking is needed.
+
+        Args:
+            cache_directory (str): the directory where cache entries are stored, it is created if it does not exist
+            max_size (int): the maximum size of the cache in bytes, if None, the cache is never trimmed
+        """
+
+        self.cache_directory = cache_directory
+        self.max_size = max_size
+
+        os.makedirs(cache_directory, exist_ok=True)
+
+    @staticmethod
+    def key(pfin: CorpusFile, query_key: str, spans: list[tuple[int, int]]=None) -> str:
+        """Compute the cache key of a corpus file for a given query
+
+        Args:
+            pfin (CorpusFile): the corpus file
+            query_key (str): a key which identifies the query (see CaseStudy.query_key)
+            spans (list[tuple[int, int]]): the sentence spans which are checked, if not the whole file
+
+        Returns:
+            str: the cache key
+        """
+
+        stat = pfin.stat()
+        identity = f"{os.path.abspath(str(pfin))}\0{stat.st_size}\0{stat.st_mtime_ns}\0{query_key}\0{spans}"
+
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        # Spread entries over subdirectories, so no single directory gets too large
+        return os.path.join(self.cache_directory, key[:2], f"{key}.pickle")
+
+    def get(self, key: str) -> list[tuple] | None:
+        """Get the cached hits for the given key
+
+        Args:
+            key (str): the cache key
+
+        Returns:
+            list[tuple] | None: the cached hits, or None if the key is not in the cache
+        """
+
+        path = self.path(key)
+
+        try:
+            with open(path, "rb") as reader:
+                hits = pickle.load(reader)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # Mark the entry as recently used
+        os.utime(path)
+
+        return hits
+
+    def put(self, key: str, hits: list[tuple]) -> None:
+        """Store the hits for the given key
+
+        Args:
+            key (str): the cache key
+            hits (list[tuple]): the hits to store (can be empty)
+        """
+
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first, so other processes never see a half-written entry
+        with tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(path), delete=False) as writer:
+            pickle.dump(hits, writer)
+
+        os.replace(writer.name, path)
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache is smaller than its maximum size
+        """
+
+        if self.max_size is None:
+            return
+
+        entries = []
+        total_size = 0
+        for path in Path(self.cache_directory).glob("*/*.pickle"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        # Oldest entries first
+        entries.sort()
+
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+
+            path.unlink(missing_ok=True)
+            total_size -= size
@@ -1,20 +1,47 @@
 from .CaseStudy import CaseStudy
 from .Constants import Constants
+from .HitSchema import HitSchema
+from .XPathCache import XPathCache
 from tqdm.auto import tqdm
 from lxml import etree as ET
+from typing import Iterator
 
 class RoodGroen(CaseStudy):
-    def filter(self, order: str) -> list[tuple]:
+    # Output columns and their types
+    SCHEMA = HitSchema({ "sentence": "text", "participle": "string", "auxiliary": "string",
+                         "participle_lemma": "category", "auxiliary_lemma": "category",
+                         "participle_index": "int", "auxiliary_index": "int", "clause_start_index": "int", "clause_end_index": "int",
+                         "file": "category", "sentence_id": "string", "order": "category" })
+    # Nested clauses make the same participle and auxiliary show up more than once in a sentence
+    DUPLICATE_COLUMNS = [ "sentence_id", "participle_index", "auxiliary_index" ]
+
+    def filter(self, order: str, stream: bool=False) -> list[tuple] | Iterator[tuple]:
         """Apply the filtering operation for the RoodGroen case study
 
         Args:
             order (str): either "red" or "green"
+            stream (bool): if True, return a generator which yields hits as they are found
 
         Raises:
             Exception: if order other than "red" or "green" is specified
 
         Returns:
-            list[tuple]: list of tuples containing: (sentence, (participle, auxiliary, participle lemma, auxiliary lemma), filename)
+            list[tuple] | Iterator[tuple]: list (or generator) of hits, with the columns of RoodGroen.SCHEMA
+        """
+
+        return super().filter(self.query(order), stream)
+
+    def query(self, order: str) -> str:
+        """Get the general xpath for the RoodGroen case study, without running it
+
+        Args:
+            order (str): either "red", "green" or "red_green"
+
+        Raises:
+            Exception: if order other than "red", "green" or "red_green" is specified
+
+        Returns:
+            str: the general xpath
         """
 
         if order not in ["red", "green", "red_green"]:
@@ -27,7 +54,7 @@ class RoodGroen(CaseStudy):
 
         self.order = order
 
-        return super().filter(general_xpath)
+        return general_xpath
 
     def secondary_processing(self, element : ET, filename : str = "??.xml", sentence_id : str="??") -> tuple:
         """Apply secondary processing for the RoodGroen case study
@@ -48,28 +75,20 @@ class RoodGroen(CaseStudy):
         for order in ["red", "green"]:
             # The following two xpaths are used to find the specific participles and auxiliaries
             # The query is the same for both orders, only the operators are different
-            participle_xpath = Constants.SPECIFIC_XPATHS["participle"].replace(
-                "$SIGN$", Constants.OPERATORS["participle"][order]).replace(
-                    "$ID$", root_element_id
-                )
-            auxiliary_xpath = Constants.SPECIFIC_XPATHS["auxiliary"].replace(
-                "$SIGN$", Constants.OPERATORS["auxiliary"][order]).replace(
-                    "$ID$", root_element_id
-                )
-
-            # print(participle_xpath)
-            # print(auxiliary_xpath)
+            # Both are compiled once per process, the clause id is passed as an xpath variable
+            participle_xpath = XPathCache.specific("participle", order)
+            auxiliary_xpath = XPathCache.specific("auxiliary", order)
 
             try:
-                participle_xpath = element.xpath(participle_xpath)[0]
-                auxiliary_xpath = element.xpath(auxiliary_xpath)[0]
+                participle_match = participle_xpath(element, id=root_element_id)[0]
+                auxiliary_match = auxiliary_xpath(element, id=root_element_id)[0]
 
-                participle = participle_xpath.get('word')
-                participle_lemma = participle_xpath.get('lemma')
-                auxiliary = auxiliary_xpath.get('word')
-                auxiliary_lemma = auxiliary_xpath.get('lemma')
-                participle_index = int(participle_xpath.get("begin"))
-                auxiliary_index = int(auxiliary_xpath.get("begin"))
+                participle = participle_match.get('word')
+                participle_lemma = participle_match.get('lemma')
+                auxiliary = auxiliary_match.get('word')
+                auxiliary_lemma = auxiliary_match.get('lemma')
+                participle_index = int(participle_match.get("begin"))
+                auxiliary_index = int(auxiliary_match.get("begin"))
 
                 # To make sure we're dealing with a cluster (xpath is difficult)
                 # I check whether the distance in the sentence between participle and auxiliary is not too large
@@ -88,4 +107,10 @@ class RoodGroen(CaseStudy):
 
             return participle, auxiliary, participle_lemma, auxiliary_lemma, participle_index, auxiliary_index, clause_start_index, clause_end_index, order
 
-        return None
\ No newline at end of file
+        return None
+
+    def record(self, sentence: str, filename: str, sentence_id: str, data: tuple) -> tuple:
+        participle, auxiliary, participle_lemma, auxiliary_lemma, participle_index, auxiliary_index, clause_start_index, clause_end_index, order = data
+
+        return (sentence, participle, auxiliary, participle_lemma, auxiliary_lemma, participle_index, auxiliary_index,
+                clause_start_index, clause_end_index, filename, sentence_id, order)
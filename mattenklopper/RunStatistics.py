@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+import heapq
+import json
+import time
+
+class RunStatistics:
+    # The stages of a query which are timed separately
+    STAGES = [ "prefilter", "parse", "xpath", "secondary" ]
+
+    def __init__(self, slowest_count: int=10) -> None:
+        """Run statistics object which collects counters and timers for every stage of a query
+
+        Every worker process collects its own statistics, which are merged in the main process.
+
+        Args:
+            slowest_count (int): the number of slowest files which are kept
+        """
+
+        self.slowest_count = slowest_count
+
+        # Counter name -> count
+        self.counters = {}
+        # Stage name -> seconds, summed over all worker processes
+        self.timers = { stage: 0.0 for stage in self.STAGES }
+        # (seconds, file, sentences, bytes) tuples of the slowest files
+        self.slowest_files = []
+        # (filename, sentence id) of all sentences for which secondary processing failed
+        self.errors = []
+        # (file, error message) of all files which could not be processed
+        self.failures = []
+
+    def count(self, name: str, increment: int=1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + increment
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Add the time spent in the body of the with statement to a stage
+
+        Args:
+            stage (str): the stage name
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[stage] = self.timers.get(stage, 0.0) + time.perf_counter() - start
+
+    def add_file(self, file: str, seconds: float, sentences: int, byte_count: int) -> None:
+        """Record a processed file, only the slowest files are kept
+
+        Args:
+            file (str): the file name
+            seconds (float): the time spent on the file
+            sentences (int): the number of sentences in the file, including those skipped by the keyword scanner or the sampler
+            byte_count (int): the size of the (decompressed) XML in bytes
+        """
+
+        self.count("files")
+        self.count("sentences", sentences)
+        self.count("bytes", byte_count)
+        self.timers["files"] = self.timers.get("files", 0.0) + seconds
+
+        entry = (seconds, file, sentences, byte_count)
+        if len(self.slowest_files) < self.slowest_count:
+            heapq.heappush(self.slowest_files, entry)
+        else:
+            heapq.heappushpop(self.slowest_files, entry)
+
+    def add_failure(self, file: str, error: BaseException) -> None:
+        """Record a file which could not be processed, the rest of the run continues without it
+
+        Args:
+            file (str): the file name
+            error (BaseException): the exception which was raised
+        """
+
+        self.count("failed_files")
+        self.failures.append((file, f"{type(error).__name__}: {error}"))
+
+    def merge(self, other: "RunStatistics") -> None:
+        """Add the statistics of another run (e.g. a worker process) to these statistics
+
+        Args:
+            other (RunStatistics): the statistics to add
+        """
+
+        for name, count in other.counters.items():
+            self.count(name, count)
+
+        for stage, seconds in other.timers.items():
+            self.timers[stage] = self.timers.get(stage, 0.0) + seconds
+
+        self.slowest_files = heapq.nlargest(self.slowest_count, self.slowest_files + other.slowest_files)
+        heapq.heapify(self.slowest_files)
+
+        self.errors.extend(other.errors)
+        self.failures.extend(other.failures)
+
+    @staticmethod
+    def rate(numerator: int, denominator: int) -> float | None:
+        return numerator / denominator if denominator > 0 else None
+
+    def prefilter_pass_rate(self) -> float | None:
+        """Get the share of sentences which passed the prefilters (the keyword scanner included)
+
+        A sentence sample only leaves out candidates of the keyword scanner, the sentences it rejected are never sampled.
+        The pass rate among the sampled candidates is therefore scaled by the share of sentences the scanner let through.
+
+        Returns:
+            float | None: the pass rate, or None if there were no sentences
+        """
+
+        counters = self.counters
+        sentences = counters.get("sentences", 0)
+        candidates = sentences - counters.get("scanner_rejected", 0)
+
+        candidate_rate = self.rate(counters.get("prefilter_passed", 0), candidates - counters.get("sampled_out", 0))
+        if candidate_rate is None:
+            return None
+
+        return candidate_rate * candidates / sentences
+
+    def report(self, wall_seconds: float=None) -> dict:
+        """Summarise the statistics
+
+        Args:
+            wall_seconds (float): the wall clock time of the run, used for the throughput
+
+        Returns:
+            dict: the report
+        """
+
+        counters = self.counters
+        sentences = counters.get("sentences", 0)
+        byte_count = counters.get("bytes", 0)
+
+        # Reading and splitting is everything that was spent on a file outside the other stages
+        stages = { stage: self.timers.get(stage, 0.0) for stage in self.STAGES }
+        stages = { "read": max(self.timers.get("files", 0.0) - sum(stages.values()), 0.0), **stages }
+
+        report = { "files": counters.get("files", 0),
+                   "cached_files": counters.get("cached_files", 0),
+                   "resumed_files": counters.get("resumed_files", 0),
+                   "failed_files": [ { "file": file, "error": error } for file, error in self.failures ],
+                   "sentences": sentences,
+                   "bytes": byte_count,
+                   "hits": counters.get("hits", 0),
+                   "errors": len(self.errors),
+                   "scanner_rejected": counters.get("scanner_rejected", 0),
+                   "prefilter_pass_rate": self.prefilter_pass_rate(),
+                   "xpath_match_rate": self.rate(counters.get("xpath_matched", 0), counters.get("parsed", 0)),
+                   "secondary_none_rate": self.rate(counters.get("secondary_none", 0), counters.get("secondary_calls", 0)),
+                   "stage_seconds": stages,
+                   "counters": dict(sorted(counters.items())),
+                   "slowest_files": [ { "file": file, "seconds": seconds, "sentences": file_sentences, "bytes": file_bytes }
+                                      for seconds, file, file_sentences, file_bytes in sorted(self.slowest_files, reverse=True) ] }
+
+        if wall_seconds is not None:
+            report["wall_seconds"] = wall_seconds
+            report["sentences_per_second"] = self.rate(sentences, wall_seconds)
+            report["mb_per_second"] = self.rate(byte_count / 1024 / 1024, wall_seconds)
+
+        return report
+
+    def write(self, stats_path: str, wall_seconds: float=None) -> None:
+        """Write the report to a JSON file
+
+        Args:
+            stats_path (str): the path of the JSON file
+            wall_seconds (float): the wall clock time of the run
+        """
+
+        with open(stats_path, "wt") as writer:
+            writer.write(json.dumps(self.report(wall_seconds), indent=4))
+
+    def write_errors(self, errors_path: str="errors.txt") -> None:
+        """Append the sentences for which secondary processing failed to the errors file, in one go
+
+        Args:
+            errors_path (str): the path of the errors file
+        """
+
+        if len(self.errors) == 0:
+            return
+
+        with open(errors_path, "at") as writer:
+            writer.writelines(f"{filename},{sentence_id}\n" for filename, sentence_id in self.errors)
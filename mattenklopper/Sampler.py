@@ -0,0 +1,56 @@
+import hashlib
+
+class Sampler:
+    # The units which can be sampled
+    UNITS = [ "file", "sentence" ]
+
+    def __init__(self, fraction: float, unit: str="file", seed: int=0) -> None:
+        """Sampler object which selects a reproducible random fraction of the corpus files or sentences
+
+        Whether a file or sentence is selected only depends on the seed and on the file name (and offset) of the unit,
+        not on the order in which they are processed. The same seed therefore always gives the same sample,
+        regardless of the number of workers, and adding files to the corpus does not change the sample of the other files.
+
+        Args:
+            fraction (float): the fraction of units to select, between 0 and 1
+            unit (str): either "file" or "sentence"
+            seed (int): the random seed
+
+        Raises:
+            ValueError: if the fraction or the unit is invalid
+        """
+
+        if not 0 <= fraction <= 1:
+            raise ValueError("The sample fraction should be between 0 and 1")
+
+        if unit not in self.UNITS:
+            raise ValueError(f"Unrecognised sample unit. Specify either {' or '.join(self.UNITS)}.")
+
+        self.fraction = fraction
+        self.unit = unit
+        self.seed = seed
+
+    def keep(self, *key) -> bool:
+        """Check whether a unit is part of the sample
+
+        Args:
+            *key: the values which identify the unit (e.g. the file name and the offset of a sentence)
+
+        Returns:
+            bool: True if the unit is selected
+        """
+
+        identity = "\0".join(str(part) for part in (self.seed, *key)).encode("utf-8")
+        digest = hashlib.blake2b(identity, digest_size=8).digest()
+
+        # Map the hash to a number between 0 and 1
+        return int.from_bytes(digest, "big") / 2 ** 64 < self.fraction
+
+    def samples_files(self) -> bool:
+        return self.unit == "file"
+
+    def samples_sentences(self) -> bool:
+        return self.unit == "sentence"
+
+    def __repr__(self) -> str:
+        return f"Sampler({self.fraction!r}, {self.unit!r}, {self.seed!r})"
@@ -0,0 +1,303 @@
+from .CorpusFile import CorpusFile
+from .Prefetcher import Prefetcher
+from .RunStatistics import RunStatistics
+from concurrent.futures.process import BrokenProcessPool
+from tqdm.auto import tqdm
+from typing import Callable, Iterable, Iterator
+
+import concurrent.futures
+import itertools
+import os
+
+# The case study object of this worker process, set once by initialise_worker
+worker_case_study = None
+# Builds the case study of a query in a warm worker process, set once by initialise_warm_worker
+worker_builder = None
+# Case studies which a warm worker process built so far, by query
+worker_case_studies = {}
+# The maximum number of case studies a warm worker process keeps
+WARM_CASE_STUDIES = 32
+
+def initialise_worker(case_study) -> None:
+    """Set up a worker process: the case study (including its keyword processor) is only transferred once per worker
+
+    Args:
+        case_study (CaseStudy): the case study which this worker will run
+    """
+
+    global worker_case_study
+    worker_case_study = case_study
+
+def initialise_warm_worker(builder: Callable) -> None:
+    """Set up a warm worker process, which is kept alive between runs and builds the case study of every query itself
+
+    Args:
+        builder (Callable): a picklable function which builds and prepares the case study of a query (see QueryServer.build)
+    """
+
+    global worker_builder
+    worker_builder = builder
+
+def filter_query_chunk(query: str, tasks: list[tuple[CorpusFile, list]]) -> tuple[list[tuple[int, list[tuple]]], RunStatistics]:
+    """Filter a chunk of Alpino XML files with the case study of the given query, in a warm worker process
+
+    The case study (with its keyword processor and compiled xpaths) is only built the first time the worker sees the query.
+
+    Args:
+        query (str): the query, as understood by the builder of the worker
+        tasks (list[tuple[CorpusFile, list]]): the Alpino XML files to process, with the sentence spans to check (None for all sentences)
+
+    Returns:
+        tuple[list[tuple[int, list[tuple]]], RunStatistics]: see filter_chunk
+    """
+
+    global worker_case_study
+
+    if query not in worker_case_studies:
+        # Forget the oldest query
+        if len(worker_case_studies) >= WARM_CASE_STUDIES:
+            del worker_case_studies[next(iter(worker_case_studies))]
+
+        worker_case_studies[query] = worker_builder(query)
+
+    worker_case_study = worker_case_studies[query]
+
+    return filter_chunk(tasks)
+
+def filter_chunk(tasks: list[tuple[CorpusFile, list]]) -> tuple[list[tuple[int, list[tuple]]], RunStatistics]:
+    """Filter a chunk of Alpino XML files with the case study of this worker process
+
+    A file which raises an exception is recorded as a failure in the statistics, the other files of the chunk are still processed.
+    If the case study reads files ahead, the next files of the chunk are read while the current file is being processed.
+
+    Args:
+        tasks (list[tuple[CorpusFile, list]]): the Alpino XML files to process, with the sentence spans to check (None for all sentences)
+
+    Returns:
+        tuple[list[tuple[int, list[tuple]]], RunStatistics]: the position in the chunk and the corpus hits of every finished file, and the statistics of this chunk
+    """
+
+    # Every chunk has its own statistics, the main process merges them
+    worker_case_study.statistics = RunStatistics()
+
+    prefetcher = Prefetcher(worker_case_study.read_ahead, worker_case_study.read_ahead_size)
+
+    results = []
+    for position, file, spans, contents in prefetcher.prefetch(tasks):
+        try:
+            hits = worker_case_study.filter_file(file, spans, contents)
+        except Exception as error:
+            worker_case_study.statistics.add_failure(str(file), error)
+            continue
+
+        results.append((position, hits))
+
+    return results, worker_case_study.statistics
+
+class Scheduler:
+    def __init__(self, workers: int=None, chunk_size: int=16, chunk_bytes: int=None, builder: Callable=None) -> None:
+        """Scheduler object which distributes corpus files over a pool of worker processes
+
+        Args:
+            workers (int): the number of worker processes, defaults to the number of CPUs
+            chunk_size (int): the maximum number of files which are handed to a worker at once
+            chunk_bytes (int): the maximum number of bytes which are handed to a worker at once (a single file can be larger), if None, only the number of files is limited
+            builder (Callable): if given, the worker processes are started once and kept warm between runs (see QueryServer),
+                they build the case study of every query themselves with this function instead of receiving it when they start
+        """
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        if workers < 1:
+            raise ValueError("The number of workers should be at least 1")
+
+        if chunk_size < 1:
+            raise ValueError("The chunk size should be at least 1")
+
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.chunk_bytes = chunk_bytes
+
+        # Warm worker processes, started by the first run
+        self.builder = builder
+        self.pool = None
+
+    def chunks(self, tasks: Iterable[tuple[CorpusFile, list]]) -> Iterator[list[tuple[CorpusFile, list]]]:
+        """Split the tasks into chunks of at most chunk_size files and (if set) chunk_bytes bytes
+
+        Limiting the bytes of a chunk keeps the byte ranges of a large file (see CorpusFile.split) in separate chunks,
+        so they are processed by different workers.
+
+        Args:
+            tasks (Iterable[tuple[CorpusFile, list]]): the files to split, with their sentence spans
+
+        Yields:
+            list[tuple[CorpusFile, list]]: a chunk of files
+        """
+
+        if self.chunk_bytes is None:
+            tasks = iter(tasks)
+            while True:
+                chunk = list(itertools.islice(tasks, self.chunk_size))
+                if len(chunk) == 0:
+                    return
+
+                yield chunk
+
+        chunk = []
+        chunk_weight = 0
+        for file, spans in tasks:
+            weight = self.weight(file, spans)
+
+            # The task does not fit in the current chunk anymore
+            if len(chunk) > 0 and chunk_weight + weight > self.chunk_bytes:
+                yield chunk
+
+                chunk = []
+                chunk_weight = 0
+
+            chunk.append((file, spans))
+            chunk_weight += weight
+
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+
+                chunk = []
+                chunk_weight = 0
+
+        if len(chunk) > 0:
+            yield chunk
+
+    @staticmethod
+    def weight(file: CorpusFile, spans: list[tuple[int, int]]) -> int:
+        # The number of bytes a task covers, used to show progress
+        if spans is None:
+            return file.size()
+
+        return sum(end - start for start, end in spans)
+
+    def run(self, case_study, tasks: Iterable[tuple[CorpusFile, list]], total: int=None,
+            query: str=None) -> Iterator[tuple[CorpusFile, list, list[tuple]]]:
+        """Run a case study over the given files and yield the hits of every file as soon as the workers finish it
+
+        Only a bounded number of chunks is processed at the same time, so results never pile up in memory
+        when the consumer (e.g. a sink writing to disk) is slower than the workers.
+        The statistics of every chunk are merged into the statistics of the case study.
+        Files which fail are recorded in the statistics and are not yielded. If a worker process dies (e.g. because it ran out of memory),
+        the chunks it took down with it are recorded as failures as well, and the pool is restarted for the remaining chunks.
+        Closing the generator cancels the chunks which have not started yet.
+
+        Args:
+            case_study (CaseStudy): the case study to run, its xpath should already be set
+            tasks (Iterable[tuple[CorpusFile, list]]): the Alpino XML files to process, with the sentence spans to check (None for all sentences)
+            total (int): the number of bytes to process, if known in advance
+            query (str): for warm worker processes, the query from which they build their own copy of the case study
+
+        Yields:
+            tuple[CorpusFile, list, list[tuple]]: a finished file, its sentence spans and its corpus hits
+        """
+
+        # Register a tqdm progress bar, progress is measured in bytes because file sizes vary a lot
+        progress_bar = tqdm(total=total, desc='Query progress', unit='B', unit_scale=True, unit_divisor=1024)
+
+        executor = self.executor(case_study)
+
+        try:
+            # Limit the number of chunks in flight, so finished results are consumed before new ones are produced
+            max_pending = 2 * self.workers
+            chunks = self.chunks(tasks)
+            # Future -> the chunk it processes
+            pending = {}
+
+            while True:
+                # Top up the pool with new chunks
+                for chunk in chunks:
+                    if self.builder is None:
+                        future = executor.submit(filter_chunk, chunk)
+                    else:
+                        future = executor.submit(filter_query_chunk, query, chunk)
+
+                    pending[future] = chunk
+                    if len(pending) >= max_pending:
+                        break
+
+                if len(pending) == 0:
+                    break
+
+                # Wait for at least one chunk to finish
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+                # Loop over future results as they become available
+                broken = False
+                for future in done:
+                    chunk = pending.pop(future)
+
+                    try:
+                        results, statistics = future.result()
+                    except Exception as error:
+                        # The whole chunk is lost, e.g. because its worker process was killed
+                        results = []
+                        statistics = RunStatistics()
+                        for file, _ in chunk:
+                            statistics.add_failure(str(file), error)
+
+                        broken = broken or isinstance(error, BrokenProcessPool)
+
+                    case_study.statistics.merge(statistics)
+
+                    progress_bar.update(n=sum(self.weight(file, spans) for file, spans in chunk))  # Increments counter
+                    progress_bar.set_postfix(sentences=case_study.statistics.counters.get("sentences", 0))
+
+                    # Files without hits are yielded as well, so the caller knows they are finished
+                    for position, hits in results:
+                        file, spans = chunk[position]
+                        yield file, spans, hits
+
+                # A dead worker process breaks the whole pool, the chunks which were still pending are lost as well
+                if broken:
+                    for chunk in pending.values():
+                        for file, _ in chunk:
+                            case_study.statistics.add_failure(str(file), BrokenProcessPool("A worker process terminated abruptly"))
+
+                        progress_bar.update(n=sum(self.weight(file, spans) for file, spans in chunk))
+
+                    pending = {}
+
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    self.pool = None
+                    executor = self.executor(case_study)
+        finally:
+            # If the consumer stops early (e.g. because enough hits were found), chunks which have not started are cancelled
+            if self.builder is None:
+                # Chunks which are already running are finished, so the worker processes shut down cleanly
+                executor.shutdown(wait=True, cancel_futures=True)
+            else:
+                # Warm worker processes stay alive for the next run, chunks which are already running finish in the background
+                for future in pending:
+                    future.cancel()
+
+            progress_bar.close()
+
+    def executor(self, case_study) -> concurrent.futures.ProcessPoolExecutor:
+        # Start a processing pool, every worker receives the case study exactly once
+        if self.builder is None:
+            return concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                          initializer=initialise_worker,
+                                                          initargs=(case_study,))
+
+        # Warm worker processes only receive the builder, they are started once
+        if self.pool is None:
+            self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers,
+                                                               initializer=initialise_warm_worker,
+                                                               initargs=(self.builder,))
+
+        return self.pool
+
+    def close(self) -> None:
+        """Stop the warm worker processes, if there are any
+        """
+
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
@@ -0,0 +1,217 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import mmap
+import re
+
+class SentenceSplitter:
+    # Tags which delimit a single Alpino sentence
+    OPEN_TAG = b"<alpino_ds"
+    CLOSE_TAG = b"</alpino_ds>"
+    SENTENCE_OPEN_TAG = b"<sentence"
+    SENTENCE_CLOSE_TAG = b"</sentence>"
+    # Used to count sentences without finding their spans in Python (mmap objects have no count method)
+    OPEN_TAG_PATTERN = re.compile(re.escape(OPEN_TAG))
+
+    def __init__(self, buffer: bytes | mmap.mmap, offset: int=0) -> None:
+        """Sentence splitter object which finds the <alpino_ds> elements in a raw byte buffer
+
+        The buffer is never decoded: sentences are located with byte searches and only the bytes of a single element are handed to lxml.
+        All offsets are offsets in the file, also if the buffer only holds part of it, so spans from an index or from another splitter
+        of the same file can be used as they are.
+
+        Args:
+            buffer (bytes | mmap.mmap): the contents of an Alpino XML file
+            offset (int): the offset of the buffer in the file, if only part of the file was read (see CorpusFile.load)
+        """
+
+        self.buffer = buffer
+        self.offset = offset
+
+    @classmethod
+    @contextmanager
+    def open(cls, pfin: Path) -> Iterator["SentenceSplitter"]:
+        """Memory-map an Alpino XML file and return a sentence splitter for its contents
+
+        Args:
+            pfin (Path): a Path object pointing to the Alpino XML file
+
+        Yields:
+            SentenceSplitter: the sentence splitter for the file
+        """
+
+        with pfin.open("rb") as reader:
+            try:
+                buffer = mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be memory-mapped
+                buffer = b""
+
+            splitter = cls(buffer)
+            try:
+                yield splitter
+            finally:
+                splitter.close()
+
+    def extent(self) -> tuple[int, int]:
+        """Get the part of the file which the buffer holds
+
+        Returns:
+            tuple[int, int]: the start and end offset of the buffer in the file
+        """
+
+        return self.offset, self.offset + len(self.buffer)
+
+    def spans(self, start: int=None, end: int=None) -> Iterator[tuple[int, int]]:
+        """Find the byte spans of all <alpino_ds> elements
+
+        Args:
+            start (int): the byte offset to start searching from, defaults to the start of the buffer
+            end (int): the byte offset to stop searching at, defaults to the end of the buffer
+
+        Yields:
+            tuple[int, int]: start and end offset of a single <alpino_ds> element
+        """
+
+        find = self.buffer.find
+        offset = self.offset
+
+        start = 0 if start is None else start - offset
+        end = len(self.buffer) if end is None else end - offset
+
+        while True:
+            start = find(self.OPEN_TAG, start, end)
+            if start == -1:
+                return
+
+            close = find(self.CLOSE_TAG, start, end)
+            # Truncated sentence at the end of the buffer
+            if close == -1:
+                return
+
+            stop = close + len(self.CLOSE_TAG)
+            yield start + offset, stop + offset
+
+            start = stop
+
+    def count(self, start: int=None, end: int=None) -> int:
+        """Count the <alpino_ds> elements, in a single pass of the regex engine
+
+        Args:
+            start (int): the byte offset to start counting from, defaults to the start of the buffer
+            end (int): the byte offset to stop counting at, defaults to the end of the buffer
+
+        Returns:
+            int: the number of <alpino_ds> elements which start between the offsets
+        """
+
+        start = 0 if start is None else start - self.offset
+        end = len(self.buffer) if end is None else end - self.offset
+
+        return len(self.OPEN_TAG_PATTERN.findall(self.buffer, start, end))
+
+    def boundaries(self, range_size: int) -> list[int]:
+        """Split the buffer into byte ranges of about the given size, which only start at the start of an <alpino_ds> element
+
+        Every sentence therefore lies entirely within a single range.
+
+        Args:
+            range_size (int): the minimum size of a range in bytes (except for the last range)
+
+        Returns:
+            list[int]: the offsets of the range boundaries, starting with the start of the buffer and ending with its end
+        """
+
+        size = len(self.buffer)
+        boundaries = [ 0 ]
+
+        position = range_size
+        while position < size:
+            # The next range starts at the first sentence after the nominal boundary
+            start = self.buffer.find(self.OPEN_TAG, position)
+            if start == -1:
+                break
+
+            boundaries.append(start)
+            position = start + range_size
+
+        boundaries.append(size)
+
+        return [ boundary + self.offset for boundary in boundaries ]
+
+    def sentence(self, start: int, end: int) -> str | None:
+        """Get the text of the <sentence> element inside the given <alpino_ds> span, without parsing the XML
+
+        Args:
+            start (int): start offset of the <alpino_ds> element
+            end (int): end offset of the <alpino_ds> element
+
+        Returns:
+            str | None: the raw sentence text (XML entities are not resolved), or None if the span has no sentence element
+        """
+
+        find = self.buffer.find
+        start -= self.offset
+        end -= self.offset
+
+        tag_start = find(self.SENTENCE_OPEN_TAG, start, end)
+        if tag_start == -1:
+            return None
+
+        text_start = find(b">", tag_start, end) + 1
+        text_end = find(self.SENTENCE_CLOSE_TAG, text_start, end)
+        if text_end == -1:
+            return None
+
+        return self.buffer[text_start:text_end].decode("utf-8")
+
+    def sentence_id(self, start: int, end: int) -> str | None:
+        """Get the sentid attribute of the <sentence> element inside the given <alpino_ds> span, without parsing the XML
+
+        Args:
+            start (int): start offset of the <alpino_ds> element
+            end (int): end offset of the <alpino_ds> element
+
+        Returns:
+            str | None: the sentence id, or None if the sentence has no sentid attribute
+        """
+
+        find = self.buffer.find
+        start -= self.offset
+        end -= self.offset
+
+        tag_start = find(self.SENTENCE_OPEN_TAG, start, end)
+        if tag_start == -1:
+            return None
+
+        tag_end = find(b">", tag_start, end)
+        attribute_start = find(b'sentid="', tag_start, tag_end)
+        if attribute_start == -1:
+            return None
+
+        attribute_start += len(b'sentid="')
+        attribute_end = find(b'"', attribute_start, tag_end)
+
+        return self.buffer[attribute_start:attribute_end].decode("utf-8")
+
+    def xml(self, start: int, end: int) -> bytes:
+        """Get the raw XML of a single <alpino_ds> element
+
+        Args:
+            start (int): start offset of the <alpino_ds> element
+            end (int): end offset of the <alpino_ds> element
+
+        Returns:
+            bytes: the bytes of the element, which can be passed to lxml directly
+        """
+
+        # Only a single sentence is copied, older lxml versions (such as the pinned 4.9.2) cannot parse a memoryview
+        return self.buffer[start - self.offset:end - self.offset]
+
+    def close(self) -> None:
+        """Unmap the file
+        """
+
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
@@ -0,0 +1,189 @@
+from .CorpusFile import CorpusFile
+from .HitSchema import HitSchema
+from .Sinks import SINKS
+
+import json
+import pandas as pd
+
+class Shards:
+    def __init__(self, shards: list[list[str]], sizes: list[int]=None) -> None:
+        """Shards object which splits the files of a corpus over several runs, e.g. on different machines
+
+        Files are identified by their name relative to the corpus directory (see CorpusFile.relative_name),
+        so every machine can have the corpus stored in a different location.
+
+        Args:
+            shards (list[list[str]]): the file names of every shard
+            sizes (list[int]): the total size of every shard in bytes
+        """
+
+        self.shards = shards
+        self.sizes = sizes
+
+    @classmethod
+    def create(cls, corpus_directory: str, shard_count: int) -> "Shards":
+        """Split the files of a corpus into shards of roughly equal size
+
+        The split is stable: the same files always give the same shards, regardless of the order in which they are found.
+
+        Args:
+            corpus_directory (str): the directory where the Alpino-compatible corpus is stored
+            shard_count (int): the number of shards
+
+        Raises:
+            ValueError: if the number of shards is smaller than 1
+            Exception: if corpus directory contains no XML files
+
+        Returns:
+            Shards: the shards
+        """
+
+        if shard_count < 1:
+            raise ValueError("The number of shards should be at least 1")
+
+        files = CorpusFile.find(corpus_directory)
+
+        if len(files) == 0:
+            raise Exception("Corpus directory contains no XML files")
+
+        # Largest files first, every file goes to the shard which is smallest so far (ties are broken by name and shard number)
+        files = sorted(((file.size(), file.relative_name(corpus_directory)) for file in files), key=lambda file: (-file[0], file[1]))
+
+        shards = [ [] for _ in range(shard_count) ]
+        sizes = [ 0 ] * shard_count
+        for size, name in files:
+            shard = min(range(shard_count), key=lambda index: (sizes[index], index))
+            shards[shard].append(name)
+            sizes[shard] += size
+
+        return cls([ sorted(shard) for shard in shards ], sizes)
+
+    @classmethod
+    def load(cls, manifest_path: str) -> "Shards":
+        with open(manifest_path, "rt") as reader:
+            manifest = json.loads(reader.read())
+
+        return cls(manifest["shards"], manifest.get("sizes"))
+
+    def save(self, manifest_path: str) -> None:
+        """Write the shards to a manifest file, which can be copied to every machine
+
+        Args:
+            manifest_path (str): the path of the manifest file
+        """
+
+        with open(manifest_path, "wt") as writer:
+            writer.write(json.dumps({ "shards": self.shards, "sizes": self.sizes }, indent=4))
+
+    @staticmethod
+    def parse(shard: str) -> tuple[int, int]:
+        """Parse a shard specification such as "2/8" (the second of eight shards)
+
+        Args:
+            shard (str): the shard specification, shards are numbered from 1
+
+        Raises:
+            ValueError: if the specification is invalid
+
+        Returns:
+            tuple[int, int]: the (zero-based) shard index and the number of shards
+        """
+
+        try:
+            number, shard_count = [ int(part) for part in shard.split("/") ]
+        except ValueError:
+            raise ValueError(f"Invalid shard '{shard}'. Specify the shard as i/N, e.g. 2/8.")
+
+        if not 1 <= number <= shard_count:
+            raise ValueError(f"Invalid shard '{shard}'. The shard number should be between 1 and the number of shards.")
+
+        return number - 1, shard_count
+
+    @classmethod
+    def select(cls, corpus_directory: str, shard: str | None, manifest_path: str=None) -> set[str] | None:
+        """Get the names of the files in a shard, for use as the shard argument of a case study
+
+        Args:
+            corpus_directory (str): the directory where the Alpino-compatible corpus is stored
+            shard (str | None): the shard specification (e.g. "2/8"), if None, the whole corpus is used
+            manifest_path (str): path to a manifest file, if None, the shards are computed from the corpus directory
+
+        Raises:
+            ValueError: if the manifest has a different number of shards
+
+        Returns:
+            set[str] | None: the file names of the shard, or None for the whole corpus
+        """
+
+        if shard is None:
+            return None
+
+        index, shard_count = cls.parse(shard)
+
+        if manifest_path is not None:
+            shards = cls.load(manifest_path)
+            if len(shards.shards) != shard_count:
+                raise ValueError(f"The manifest contains {len(shards.shards)} shards, not {shard_count}")
+        else:
+            shards = cls.create(corpus_directory, shard_count)
+
+        return set(shards.shards[index])
+
+    @staticmethod
+    def merge(input_paths: list[str], output_path: str, output_format: str="csv", schema: HitSchema=None,
+              duplicate_columns: list[str]=None, batch_size: int=10000) -> int:
+        """Merge the outputs of several shards into a single output file, in a deterministic order
+
+        Rows are sorted by file and sentence id, and then by all other columns, so the merged output never depends
+        on the order in which the workers finished. Integer columns are sorted by their value, all other columns as text.
+        All shards are read into memory at once, so the merged output has to fit in memory.
+
+        Args:
+            input_paths (list[str]): the output files of the shards, CSV or Parquet (files ending in .parquet)
+            output_path (str): the path of the merged output file
+            output_format (str): the format of the merged output file (see Sinks.SINKS)
+            schema (HitSchema): the schema of the case study (see CaseStudy.SCHEMA), used to give the merged columns their types, if None, all columns are kept as they are read
+            duplicate_columns (list[str]): the columns which identify duplicate hits (see CaseStudy.DUPLICATE_COLUMNS), if None, duplicates are kept
+            batch_size (int): the number of rows which are written at once
+
+        Returns:
+            int: the number of rows in the merged output
+        """
+
+        frames = []
+        for input_path in input_paths:
+            if input_path.lower().endswith(".parquet"):
+                frames.append(pd.read_parquet(input_path))
+            else:
+                # Shards without hits have an empty output file
+                try:
+                    frames.append(pd.read_csv(input_path, keep_default_na=False, dtype=str))
+                except pd.errors.EmptyDataError:
+                    continue
+
+        if len(frames) == 0:
+            df = pd.DataFrame()
+        else:
+            df = pd.concat(frames, ignore_index=True)
+
+        if schema is None:
+            schema = HitSchema({ column: "object" for column in df.columns })
+
+        # Shards read from CSV files only contain strings, so the integer columns are parsed before sorting
+        df = schema.convert(df)
+
+        if len(df) > 0:
+            # The same key columns come first, the others follow in their original order
+            sort_columns = [ column for column in [ "file", "sentence_id" ] if column in df.columns ]
+            sort_columns += [ column for column in df.columns if column not in sort_columns ]
+
+            # Missing integers come last
+            df = df.sort_values(sort_columns, key=lambda column: column if schema.columns.get(column.name) == "int" else column.astype(str),
+                                kind="stable").reset_index(drop=True)
+
+            # Keep the first of every group of duplicates, in the sorted order
+            if duplicate_columns is not None:
+                df = df.drop_duplicates(subset=duplicate_columns, keep="first").reset_index(drop=True)
+
+        with SINKS[output_format](output_path, schema, batch_size) as sink:
+            return sink.write_frame(df)
@@ -0,0 +1,176 @@
+from typing import Iterable
+from .HitSchema import HitSchema
+
+import pandas as pd
+
+class Sink:
+    def __init__(self, output_path: str, schema: HitSchema, batch_size: int=10000) -> None:
+        """Sink object which writes corpus hits to disk in batches, so they never all have to be kept in memory
+
+        Every batch is turned into a data frame column by column, with the column types of the case study's schema.
+
+        Args:
+            output_path (str): the path of the output file
+            schema (HitSchema): the schema of the corpus hits (see CaseStudy.SCHEMA)
+            batch_size (int): the number of rows which are kept in memory before they are written to disk
+        """
+
+        self.output_path = output_path
+        self.schema = schema
+        self.batch_size = batch_size
+
+        # Hits which have not been written to disk yet
+        self.batch = []
+        # Number of rows written so far
+        self.count = 0
+
+    def write(self, hit: tuple) -> None:
+        """Add a single corpus hit to the sink
+
+        Args:
+            hit (tuple): the corpus hit to write
+        """
+
+        self.batch.append(hit)
+        self.count += 1
+
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def write_all(self, hits: Iterable[tuple]) -> int:
+        """Write all corpus hits from an iterable (e.g. a streaming filter) to the sink
+
+        Args:
+            hits (Iterable[tuple]): the corpus hits to write
+
+        Returns:
+            int: the total number of rows written to this sink so far
+        """
+
+        for hit in hits:
+            self.write(hit)
+
+        return self.count
+
+    def flush(self) -> None:
+        """Write all buffered rows to disk
+        """
+
+        if len(self.batch) == 0:
+            return
+
+        self.write_batch(self.schema.dataframe(self.batch))
+        self.batch = []
+
+    def write_frame(self, df: pd.DataFrame) -> int:
+        """Write a data frame of rows (e.g. read from other output files) to the sink, batch by batch
+
+        Args:
+            df (pd.DataFrame): the rows to write, with the columns of the schema
+
+        Returns:
+            int: the total number of rows written to this sink so far
+        """
+
+        self.flush()
+
+        for start in range(0, len(df), self.batch_size):
+            self.write_batch(df.iloc[start:start + self.batch_size])
+
+        self.count += len(df)
+
+        return self.count
+
+    def write_batch(self, df: pd.DataFrame) -> None:
+        """Write a single batch of rows to disk, implemented by the different output formats
+
+        Args:
+            df (pd.DataFrame): the batch to write
+        """
+
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        """Write the remaining rows and close the output file
+        """
+
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+class CsvSink(Sink):
+    def __init__(self, output_path: str, schema: HitSchema, batch_size: int=10000) -> None:
+        """Sink which writes corpus hits to a CSV file, batch by batch
+
+        Args:
+            output_path (str): the path of the CSV file
+            schema (HitSchema): the schema of the corpus hits (see CaseStudy.SCHEMA)
+            batch_size (int): the number of rows which are kept in memory before they are written to disk
+        """
+
+        super().__init__(output_path, schema, batch_size)
+
+        # Truncate the output file, so batches can be appended to it
+        open(self.output_path, "wt").close()
+        self.header_written = False
+
+    def write_batch(self, df: pd.DataFrame) -> None:
+        # Only the first batch gets a header
+        df.to_csv(self.output_path, mode="a", header=not self.header_written, index=False)
+        self.header_written = True
+
+class ParquetSink(Sink):
+    def __init__(self, output_path: str, schema: HitSchema, batch_size: int=10000) -> None:
+        """Sink which writes corpus hits to a Parquet file, one row group per batch
+
+        Args:
+            output_path (str): the path of the Parquet file
+            schema (HitSchema): the schema of the corpus hits (see CaseStudy.SCHEMA)
+            batch_size (int): the number of rows which are kept in memory before they are written to disk
+
+        Raises:
+            ImportError: if pyarrow is not installed
+        """
+
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Writing Parquet files requires pyarrow. Install it using `pip install pyarrow`.")
+
+        super().__init__(output_path, schema, batch_size)
+
+        self.pyarrow = pyarrow
+        # Column name -> Arrow type of every declared column, so a batch in which a column is empty gets the same types as the others
+        # Categorical columns are stored dictionary-encoded, later batches may have more categories than the first one
+        arrow_types = { "text": pyarrow.string(), "string": pyarrow.string(), "int": pyarrow.int64(),
+                        "category": pyarrow.dictionary(pyarrow.int32(), pyarrow.string()) }
+        self.arrow_types = { name: arrow_types[column_type] for name, column_type in schema.columns.items() if column_type in arrow_types }
+        # The writer is created when the first batch arrives, because the types of undeclared and object columns are taken from it
+        self.writer = None
+
+    def write_batch(self, df: pd.DataFrame) -> None:
+        if self.writer is None:
+            inferred = self.pyarrow.Schema.from_pandas(df, preserve_index=False)
+            schema = self.pyarrow.schema([ field.with_type(self.arrow_types[field.name]) if field.name in self.arrow_types else field
+                                           for field in inferred ], metadata=inferred.metadata)
+
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.output_path, schema)
+
+        # All row groups should follow the schema of the first batch
+        table = self.pyarrow.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        super().close()
+
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+SINKS = { "csv": CsvSink, "parquet": ParquetSink }
@@ -0,0 +1,160 @@
+from lxml import etree as ET
+from pathlib import Path
+from xml.sax.saxutils import quoteattr
+
+import random
+
+class SyntheticCorpus:
+    # Auxiliaries (word, lemma) which take part in the red and green word order, all of them are closed class items
+    AUXILIARIES = [ ("heeft", "hebben"), ("hebben", "hebben"), ("had", "hebben"),
+                    ("is", "zijn"), ("was", "zijn"), ("wordt", "worden"), ("werd", "worden") ]
+    # Past participles (word, lemma)
+    PARTICIPLES = [ ("gewerkt", "werken"), ("gezien", "zien"), ("gekomen", "komen"), ("gemaakt", "maken"), ("gegeven", "geven") ]
+    # Adjectives (word without inflection, word with inflection, lemma)
+    ADJECTIVES = [ ("groot", "grote", "groot"), ("klein", "kleine", "klein"), ("mooi", "mooie", "mooi"), ("oud", "oude", "oud") ]
+    # Nouns (word, lemma)
+    NOUNS = [ ("huis", "huis"), ("boek", "boek"), ("stad", "stad"), ("tafel", "tafel"), ("fiets", "fiets") ]
+    # Main clause verbs (word, lemma), these are never closed class items
+    VERBS = [ ("zegt", "zeggen"), ("denkt", "denken"), ("weet", "weten"), ("hoopt", "hopen") ]
+
+    def __init__(self, sentence_length: int=12, hit_density: float=0.3, seed: int=1) -> None:
+        """Synthetic corpus object which generates random Alpino-formatted sentences, so performance can be measured without a real corpus
+
+        Every sentence is a main clause with a subject, a finite verb and a number of modifiers (adjectives and nouns).
+        A fraction of the sentences also contain a subordinate clause with a perfective verb cluster in the red or green order.
+
+        Args:
+            sentence_length (int): the (approximate) number of words in a sentence, at least 6
+            hit_density (float): the fraction of sentences with a perfective verb cluster
+            seed (int): the random seed, the same seed always generates the same corpus
+        """
+
+        if sentence_length < 6:
+            raise ValueError("The sentence length should be at least 6")
+
+        if not 0 <= hit_density <= 1:
+            raise ValueError("The hit density should be between 0 and 1")
+
+        self.sentence_length = sentence_length
+        self.hit_density = hit_density
+        self.random = random.Random(seed)
+
+    def node(self, node_id: int, begin: int, end: int, **attributes: str) -> str:
+        attributes = { "begin": begin, "end": end, "id": node_id, **attributes }
+        return "<node " + " ".join(f"{name}={quoteattr(str(value))}" for name, value in attributes.items()) + "/>"
+
+    def sentence(self, sentence_id: str) -> str:
+        """Generate a single <alpino_ds> element
+
+        Args:
+            sentence_id (str): the sentence id
+
+        Returns:
+            str: the XML of the sentence, indented like the output of Alpino (one node per line)
+        """
+
+        words = []
+        nodes = []
+        node_id = 3
+
+        def leaf(**attributes: str) -> str:
+            # Add a word to the sentence, its position is the next free position
+            nonlocal node_id
+            begin = len(words)
+            words.append(attributes["word"])
+            node_id += 1
+            return self.node(node_id, begin, begin + 1, **attributes)
+
+        noun, noun_lemma = self.random.choice(self.NOUNS)
+        nodes.append(leaf(lemma=noun_lemma, pos="noun", pt="n", rel="su", word=noun))
+        verb, verb_lemma = self.random.choice(self.VERBS)
+        nodes.append(leaf(lemma=verb_lemma, pos="verb", pt="ww", rel="hd", word=verb, wvorm="pv"))
+
+        has_cluster = self.random.random() < self.hit_density
+        modifier_count = self.sentence_length - len(words) - (5 if has_cluster else 0)
+
+        for _ in range(max(modifier_count, 0)):
+            if self.random.random() < 0.4:
+                word, inflected, lemma = self.random.choice(self.ADJECTIVES)
+                if self.random.random() < 0.5:
+                    nodes.append(leaf(buiging="zonder", lemma=lemma, pos="adj", pt="adj", rel="mod", word=word))
+                else:
+                    nodes.append(leaf(buiging="met-e", lemma=lemma, pos="adj", pt="adj", rel="mod", word=inflected))
+            else:
+                word, lemma = self.random.choice(self.NOUNS)
+                nodes.append(leaf(lemma=lemma, pos="noun", pt="n", rel="obj1", word=word))
+
+        if has_cluster:
+            nodes.append(self.cluster(words, node_id))
+
+        length = len(words)
+        top = f'<node begin="0" cat="top" end="{length}" id="0" rel="top">' + \
+              f'<node begin="0" cat="smain" end="{length}" id="1" rel="--">' + "".join(nodes) + "</node></node>"
+        sentence = " ".join(words)
+
+        xml = f'<alpino_ds version="1.3">{top}<sentence sentid={quoteattr(sentence_id)}>{sentence}</sentence></alpino_ds>'
+
+        # Real treebanks put every node on its own line, the splitter and the prefilters have to deal with the whitespace
+        return ET.tostring(ET.fromstring(xml), encoding="unicode", pretty_print=True)
+
+    def cluster(self, words: list[str], node_id: int) -> str:
+        """Generate a subordinate clause with a perfective verb cluster (e.g. "dat hij heeft gewerkt"), the words are added to the sentence
+
+        Args:
+            words (list[str]): the words of the sentence so far
+            node_id (int): the last node id which is in use
+
+        Returns:
+            str: the XML of the clause
+        """
+
+        auxiliary, auxiliary_lemma = self.random.choice(self.AUXILIARIES)
+        participle, participle_lemma = self.random.choice(self.PARTICIPLES)
+
+        start = len(words)
+        red = self.random.random() < 0.5
+
+        # dat hij heeft gewerkt (red) or dat hij gewerkt heeft (green)
+        auxiliary_begin, participle_begin = (start + 2, start + 3) if red else (start + 3, start + 2)
+        words.extend([ "dat", "hij", auxiliary, participle ] if red else [ "dat", "hij", participle, auxiliary ])
+        end = len(words)
+
+        complementiser = self.node(node_id + 2, start, start + 1, lemma="dat", pos="comp", pt="vg", rel="cmp", word="dat")
+        subject = self.node(node_id + 4, start + 1, start + 2, index="1", lemma="hij", pos="pron", pt="vnw", rel="su", word="hij")
+        auxiliary = self.node(node_id + 5, auxiliary_begin, auxiliary_begin + 1, lemma=auxiliary_lemma, pos="verb", pt="ww", rel="hd", word=auxiliary, wvorm="pv")
+        empty_subject = f'<node begin="{start + 1}" end="{start + 2}" id="{node_id + 7}" index="1" rel="su"/>'
+        participle = self.node(node_id + 8, participle_begin, participle_begin + 1, lemma=participle_lemma, pos="verb", pt="ww", rel="hd", word=participle, wvorm="vd")
+
+        participle_phrase = f'<node begin="{start + 1}" cat="ppart" end="{end}" id="{node_id + 6}" rel="vc">{empty_subject}{participle}</node>'
+        body = f'<node begin="{start + 1}" cat="ssub" end="{end}" id="{node_id + 3}" rel="body">{subject}{auxiliary}{participle_phrase}</node>'
+
+        return f'<node begin="{start}" cat="cp" end="{end}" id="{node_id + 1}" rel="vc">{complementiser}{body}</node>'
+
+    def generate(self, corpus_directory: str, file_count: int=10, sentences_per_file: int=1000) -> list[Path]:
+        """Write a synthetic corpus to disk, as Alpino treebank files
+
+        Args:
+            corpus_directory (str): the output directory, it is created if it does not exist
+            file_count (int): the number of files
+            sentences_per_file (int): the number of sentences in every file
+
+        Returns:
+            list[Path]: the paths of the generated files
+        """
+
+        directory = Path(corpus_directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        paths = []
+        for file_index in range(file_count):
+            path = directory / f"synthetic-{file_index:05d}.xml"
+
+            with open(path, "wt", encoding="utf-8") as writer:
+                writer.write('<?xml version="1.0" encoding="UTF-8"?>\n<treebank>\n')
+                for sentence_index in range(sentences_per_file):
+                    writer.write(self.sentence(f"synthetic-{file_index:05d}-{sentence_index}"))
+                writer.write("</treebank>\n")
+
+            paths.append(path)
+
+        return paths
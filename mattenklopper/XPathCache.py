@@ -0,0 +1,47 @@
+from functools import lru_cache
+from lxml import etree as ET
+from .Constants import Constants
+
+class XPathCache:
+    """Per-process cache of compiled xpath queries
+
+    Compiled queries cannot be pickled, so every worker process fills its own cache the first time a query is used.
+    After that, lxml does not have to parse and compile the query string again for every element.
+    """
+
+    # The query server compiles the xpaths of its clients, so only the most recently used queries are kept
+    MAX_SIZE = 256
+
+    @staticmethod
+    @lru_cache(maxsize=MAX_SIZE)
+    def compiled(query: str) -> ET.XPath:
+        """Get the compiled version of an xpath query
+
+        Args:
+            query (str): the xpath query
+
+        Returns:
+            ET.XPath: the compiled query, call it with an element (and xpath variables as keyword arguments) to evaluate it
+        """
+
+        return ET.XPath(query)
+
+    @staticmethod
+    @lru_cache(maxsize=MAX_SIZE)
+    def specific(name: str, order: str) -> ET.XPath:
+        """Get the compiled version of a specific xpath from the Constants, with the comparison operator for the given order filled in
+
+        XPath variables cannot stand in for an operator, so there is one compiled query per operator.
+        The clause id is passed as the $id variable when the query is evaluated.
+
+        Args:
+            name (str): the name of the specific xpath, e.g. "participle" or "auxiliary"
+            order (str): either "red" or "green"
+
+        Returns:
+            ET.XPath: the compiled query
+        """
+
+        query = Constants.SPECIFIC_XPATHS[name].replace("$SIGN$", Constants.OPERATORS[name][order])
+
+        return XPathCache.compiled(query)
@@ -0,0 +1,320 @@
+from xml.sax.saxutils import escape
+
+import re
+
+class XPathConstraints:
+    # Tokens of the xpath subset used in GrETEL-style queries
+    TOKEN_PATTERN = re.compile(r"""\s*(?:
+        (?P<string>"[^"]*"|'[^']*')|
+        (?P<number>\d+(?:\.\d+)?)|
+        (?P<variable>\$[A-Za-z_][\w.-]*)|
+        (?P<name>[A-Za-z_][\w.-]*)|
+        (?P<operator>//|::|!=|<=|>=|\.\.|[\[\]()@=<>|/,*.+-])
+    )""", re.VERBOSE)
+
+    def __init__(self, xpath: str) -> None:
+        """Constraints object which reads the attribute values a sentence must contain out of an xpath query
+
+        Only attribute comparisons of the form @attribute="value" are used. They are combined with "and" and "or" the way they
+        appear in the query, and anything the reader cannot interpret (functions like not(), numeric comparisons, variables)
+        is treated as "no constraint". The result is a necessary condition: a sentence which does not satisfy it can never match the query.
+
+        Args:
+            xpath (str): the xpath query
+        """
+
+        self.xpath = xpath
+        self.tokens = self.tokenise(xpath)
+        self.position = 0
+
+        # Nested tuples: ("and", (...)), ("or", (...)), ("attribute", name, value), or None if there is no constraint
+        self.expression = self.parse_expression()
+
+        # Compiled byte patterns used to check constraints against raw XML
+        self.needles = {}
+
+    @classmethod
+    def tokenise(cls, xpath: str) -> list[tuple[str, str]]:
+        """Split an xpath query into tokens
+
+        Args:
+            xpath (str): the xpath query
+
+        Raises:
+            ValueError: if the query contains characters which are not part of the supported xpath subset
+
+        Returns:
+            list[tuple[str, str]]: list of (token type, token) tuples
+        """
+
+        tokens = []
+        position = 0
+        xpath = xpath.strip()
+
+        while position < len(xpath):
+            match = cls.TOKEN_PATTERN.match(xpath, position)
+            if match is None or match.end() == position:
+                raise ValueError(f"Cannot read xpath query at position {position}: {xpath}")
+
+            tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            position = match.end()
+
+        return tokens
+
+    def peek(self) -> str | None:
+        if self.position >= len(self.tokens):
+            return None
+
+        return self.tokens[self.position][1]
+
+    def parse_expression(self):
+        """Parse an "or" expression, until the end of the enclosing predicate or group
+        """
+
+        alternatives = [ self.parse_conjunction() ]
+        while self.peek() == "or":
+            self.position += 1
+            alternatives.append(self.parse_conjunction())
+
+        return self.disjunction(alternatives)
+
+    def parse_conjunction(self):
+        """Parse an "and" expression
+        """
+
+        terms = [ self.parse_term() ]
+        while self.peek() == "and":
+            self.position += 1
+            terms.append(self.parse_term())
+
+        return self.conjunction(terms)
+
+    def parse_term(self):
+        """Parse a single comparison or path, the constraints inside its predicates are all required
+        """
+
+        # A union (|) means that either of its paths can satisfy the term
+        alternatives = []
+        required = []
+        tokens = []
+
+        while self.position < len(self.tokens):
+            token_type, token = self.tokens[self.position]
+
+            # End of this term
+            if token in ("]", ")", ","):
+                break
+            if token in ("and", "or") and len(tokens) > 0 and token_type == "name":
+                break
+
+            self.position += 1
+
+            if token == "[":
+                # Every node along a path must satisfy its predicate
+                required.append(self.parse_expression())
+                self.expect("]")
+                tokens.append(("predicate", "[]"))
+            elif token == "(" and len(tokens) > 0 and tokens[-1][0] == "name":
+                # Function call: we cannot tell what a function does with its arguments (e.g. not()), so skip them
+                self.skip_group()
+                tokens.append(("function", "()"))
+            elif token == "(":
+                # Grouping parentheses
+                required.append(self.parse_expression())
+                self.expect(")")
+                tokens.append(("group", "()"))
+            elif token == "|":
+                alternatives.append(self.conjunction(required + [ self.attribute_constraint(tokens) ]))
+                required = []
+                tokens = []
+            else:
+                tokens.append((token_type, token))
+
+        alternatives.append(self.conjunction(required + [ self.attribute_constraint(tokens) ]))
+
+        return self.disjunction(alternatives)
+
+    def expect(self, token: str) -> None:
+        if self.peek() != token:
+            raise ValueError(f"Expected '{token}' in xpath query: {self.xpath}")
+
+        self.position += 1
+
+    def skip_group(self) -> None:
+        """Skip everything up to and including the closing parenthesis of the current group
+        """
+
+        depth = 1
+        while self.position < len(self.tokens):
+            token = self.tokens[self.position][1]
+            self.position += 1
+
+            if token in ("(", "["):
+                depth += 1
+            elif token in (")", "]"):
+                depth -= 1
+                if depth == 0:
+                    return
+
+        raise ValueError(f"Unbalanced parentheses in xpath query: {self.xpath}")
+
+    @staticmethod
+    def attribute_constraint(tokens: list[tuple[str, str]]):
+        """Turn a term of the form [path/]@attribute="value" into an attribute constraint
+
+        Args:
+            tokens (list[tuple[str, str]]): the tokens of the term, with predicates left out
+
+        Returns:
+            tuple | None: the attribute constraint, or None if the term is not an attribute comparison
+        """
+
+        if ("operator", "=") not in tokens:
+            return None
+
+        split = tokens.index(("operator", "="))
+        left = tokens[:split]
+        right = tokens[split + 1:]
+
+        # Literals can be on either side of the comparison
+        if len(left) == 1 and left[0][0] == "string":
+            left, right = right, left
+
+        if len(right) != 1 or right[0][0] != "string":
+            return None
+
+        if len(left) < 2 or left[-2] != ("operator", "@") or left[-1][0] != "name":
+            return None
+
+        return ("attribute", left[-1][1], right[0][1][1:-1])
+
+    @staticmethod
+    def flatten(kind: str, terms: list) -> list:
+        # Nested expressions of the same kind can be merged into their parent
+        flat = []
+        for term in terms:
+            if term is not None and term[0] == kind:
+                flat.extend(term[1])
+            else:
+                flat.append(term)
+
+        return flat
+
+    @classmethod
+    def conjunction(cls, terms: list):
+        # Terms without a constraint do not restrict a conjunction
+        terms = [ term for term in cls.flatten("and", terms) if term is not None ]
+        terms = list(dict.fromkeys(terms))
+
+        if len(terms) == 0:
+            return None
+        if len(terms) == 1:
+            return terms[0]
+
+        return ("and", tuple(terms))
+
+    @classmethod
+    def disjunction(cls, alternatives: list):
+        # If any alternative is unconstrained, the whole disjunction is
+        if len(alternatives) == 0 or None in alternatives:
+            return None
+
+        alternatives = tuple(dict.fromkeys(cls.flatten("or", alternatives)))
+        if len(alternatives) == 1:
+            return alternatives[0]
+
+        return ("or", alternatives)
+
+    def restrict(self, attributes: list[str]):
+        """Get the constraint expression using only the given attributes, e.g. the ones which are in an index
+
+        Args:
+            attributes (list[str]): the attributes which can be checked
+
+        Returns:
+            tuple | None: the constraint expression, or None if nothing can be checked
+        """
+
+        def restrict_expression(expression):
+            if expression is None:
+                return None
+
+            kind = expression[0]
+            if kind == "attribute":
+                return expression if expression[1] in attributes else None
+            elif kind == "and":
+                return self.conjunction([ restrict_expression(term) for term in expression[1] ])
+            elif kind == "or":
+                return self.disjunction([ restrict_expression(term) for term in expression[1] ])
+
+        return restrict_expression(self.expression)
+
+    def needle(self, name: str, value: str) -> re.Pattern:
+        """Get a pattern which finds an attribute with the given value in raw XML
+
+        The attribute may be preceded by any whitespace, may have whitespace around "=" and may be quoted with single or double quotes.
+        Only values written with character references (e.g. &#233; instead of é) are not recognised.
+
+        Args:
+            name (str): the attribute name
+            value (str): the attribute value
+
+        Returns:
+            re.Pattern: the compiled bytes pattern
+        """
+
+        key = (name, value)
+        if key not in self.needles:
+            # Quotes inside the value may or may not be written as entities
+            serialisations = set()
+            for entities in [ {}, { '"': "&quot;" }, { "'": "&apos;" }, { '"': "&quot;", "'": "&apos;" } ]:
+                escaped = escape(value, entities)
+                for quote in [ '"', "'" ]:
+                    if quote not in escaped:
+                        serialisations.add(re.escape(f"{quote}{escaped}{quote}".encode("utf-8")))
+
+            # The pattern starts with the attribute name, so the regex engine can search for it as a literal
+            self.needles[key] = re.compile(re.escape(name.encode("utf-8")) + rb"\s*=\s*(?:" + b"|".join(sorted(serialisations)) + rb")")
+
+        return self.needles[key]
+
+    @staticmethod
+    def found(pattern: re.Pattern, buffer: bytes, start: int, end: int) -> bool:
+        # The attribute name has to be preceded by whitespace, otherwise it is the end of another name (e.g. rel in frel)
+        match = pattern.search(buffer, start, end)
+        while match is not None:
+            if match.start() > start and buffer[match.start() - 1:match.start()].isspace():
+                return True
+
+            match = pattern.search(buffer, match.start() + 1, end)
+
+        return False
+
+    def matches(self, buffer: bytes, start: int=0, end: int=None) -> bool:
+        """Check whether the raw XML of a sentence satisfies the constraints, without parsing it
+
+        Args:
+            buffer (bytes): the buffer containing the sentence (bytes or mmap)
+            start (int): start offset of the <alpino_ds> element
+            end (int): end offset of the <alpino_ds> element
+
+        Returns:
+            bool: False if the sentence can never match the query
+        """
+
+        if end is None:
+            end = len(buffer)
+
+        def matches_expression(expression) -> bool:
+            if expression is None:
+                return True
+
+            kind = expression[0]
+            if kind == "attribute":
+                return self.found(self.needle(expression[1], expression[2]), buffer, start, end)
+            elif kind == "and":
+                return all(matches_expression(term) for term in expression[1])
+            elif kind == "or":
+                return any(matches_expression(term) for term in expression[1])
+
+        return matches_expression(self.expression)
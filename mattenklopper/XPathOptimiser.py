@@ -0,0 +1,440 @@
+from lxml import etree as ET
+from .XPathConstraints import XPathConstraints
+
+import warnings
+
+class XPathOptimiser:
+    """Rewrites GrETEL-style xpath queries into an efficient form which lxml can evaluate relative to a single sentence
+
+    All rewrites keep the meaning of the query: the rewritten query returns exactly the same nodes as the original.
+    Use check_equivalence to verify this on sample sentences.
+    """
+
+    # Queries whose absolute paths were already reported in this process
+    reported = set()
+    # Axes and node tests which select something other than elements
+    NON_ELEMENT_AXES = ("attribute", "namespace")
+    NON_ELEMENT_TESTS = ("text", "comment", "processing-instruction")
+    # Operators which turn a location path into a number, a string or a boolean
+    VALUE_OPERATORS = ("=", "!=", "<", ">", "<=", ">=", "+", "-", ",")
+
+    @staticmethod
+    def tokenise(xpath: str) -> list[tuple[str, str, int, int]]:
+        """Split an xpath query into tokens, keeping their position in the query
+
+        Args:
+            xpath (str): the xpath query
+
+        Raises:
+            ValueError: if the query contains characters which are not part of the supported xpath subset
+
+        Returns:
+            list[tuple[str, str, int, int]]: list of (token type, token, start, end) tuples
+        """
+
+        tokens = []
+        position = 0
+        while position < len(xpath.rstrip()):
+            match = XPathConstraints.TOKEN_PATTERN.match(xpath, position)
+            if match is None or match.end() == position:
+                raise ValueError(f"Cannot read xpath query at position {position}: {xpath}")
+
+            tokens.append((match.lastgroup, match.group(match.lastgroup), match.start(match.lastgroup), match.end()))
+            position = match.end()
+
+        return tokens
+
+    @classmethod
+    def normalise(cls, xpath: str) -> str:
+        """Normalise a GrETEL query so lxml can run it relative to a single <alpino_ds> element
+
+        Args:
+            xpath (str): the GrETEL query
+
+        Returns:
+            str: the normalised query
+        """
+
+        # Make xpath query relative, because we will be executing it on subnodes if low_memory_usage
+        # Every branch of a union is made relative, otherwise the other branches would still search the whole document
+        # Cf. https://stackoverflow.com/a/74798156/1150683
+        branches = [ branch.strip() for branch in cls.branches(xpath) ]
+        xpath = " | ".join(f".{branch}" if branch.startswith("/") else branch for branch in branches)
+
+        # Rewrite Gretel XML query to be lxml compatible
+        # Cf. https://stackoverflow.com/a/74797463/1150683
+        xpath = xpath.replace("number(@begin)", "@begin")
+
+        return xpath
+
+    @staticmethod
+    def branches(xpath: str) -> list[str]:
+        """Split a query on the top-level union operator
+
+        Args:
+            xpath (str): the xpath query
+
+        Returns:
+            list[str]: the branches of the union, or only the query itself if it is not a union
+        """
+
+        branches = [ "" ]
+        depth = 0
+        quote = None
+        for character in xpath:
+            if quote is not None:
+                # Inside a string literal, only the closing quote matters
+                if character == quote:
+                    quote = None
+            elif character in ("'", '"'):
+                quote = character
+            elif character in ("[", "("):
+                depth += 1
+            elif character in ("]", ")"):
+                depth -= 1
+            elif character == "|" and depth == 0:
+                branches.append("")
+                continue
+
+            branches[-1] += character
+
+        return branches
+
+    @classmethod
+    def optimise(cls, xpath: str) -> str:
+        """Normalise a GrETEL query and rewrite it into its efficient relative form
+
+        Absolute paths (//node[...]) inside a predicate do not depend on the node the predicate is evaluated for,
+        but lxml evaluates them again for every candidate node, which makes the query quadratic in the sentence length.
+        Such terms are hoisted into a guard on the context node, so they are evaluated only once per sentence:
+        .//node[A and //node[B]] becomes self::node()[//node[B]]//node[A].
+
+        Args:
+            xpath (str): the GrETEL query
+
+        Returns:
+            str: the optimised query
+        """
+
+        xpath = cls.normalise(xpath)
+
+        # Every query is prepared again for every run (and in every worker process of the query server), so it is only reported once
+        if xpath not in cls.reported:
+            cls.reported.add(xpath)
+
+            for path in cls.absolute_paths(xpath):
+                warnings.warn(f"Absolute path inside a predicate, it is evaluated against the whole sentence: {path}")
+
+        return cls.hoist(xpath)
+
+    @classmethod
+    def predicates(cls, tokens: list[tuple[str, str, int, int]]) -> list[tuple[int, int, int]]:
+        """Find all predicates in a list of tokens
+
+        Args:
+            tokens (list[tuple[str, str, int, int]]): the tokens of the query
+
+        Returns:
+            list[tuple[int, int, int]]: list of (index of "[", index of the matching "]", nesting depth) tuples
+        """
+
+        predicates = []
+        stack = []
+        for index, token in enumerate(tokens):
+            if token[1] == "[":
+                stack.append(index)
+            elif token[1] == "]":
+                opening = stack.pop()
+                predicates.append((opening, index, len(stack)))
+
+        return sorted(predicates)
+
+    @staticmethod
+    def split_terms(tokens: list[tuple[str, str, int, int]], operator: str) -> list[list[tuple[str, str, int, int]]]:
+        """Split a list of tokens on a top-level boolean operator
+
+        Args:
+            tokens (list[tuple[str, str, int, int]]): the tokens of an expression
+            operator (str): "and" or "or"
+
+        Returns:
+            list[list[tuple[str, str, int, int]]]: the tokens of every term
+        """
+
+        terms = [[]]
+        depth = 0
+        for token in tokens:
+            if token[1] in ("[", "("):
+                depth += 1
+            elif token[1] in ("]", ")"):
+                depth -= 1
+
+            # An operator name only acts as an operator after a complete operand
+            if depth == 0 and token[0] == "name" and token[1] == operator and len(terms[-1]) > 0:
+                terms.append([])
+            else:
+                terms[-1].append(token)
+
+        return terms
+
+    @staticmethod
+    def is_absolute_path(term: list[tuple[str, str, int, int]]) -> bool:
+        """Check whether a predicate term is a bare absolute location path (e.g. //node[@wvorm="vd"])
+
+        Args:
+            term (list[tuple[str, str, int, int]]): the tokens of the term
+
+        Returns:
+            bool: True if the term is an absolute path without any comparison at its top level
+        """
+
+        if len(term) == 0 or term[0][1] not in ("/", "//"):
+            return False
+
+        depth = 0
+        for token in term:
+            if token[1] in ("[", "("):
+                depth += 1
+            elif token[1] in ("]", ")"):
+                depth -= 1
+            elif depth == 0:
+                # Only steps are allowed at the top level, anything else could refer to the context node
+                if token[0] not in ("name", "operator") or token[1] in ("=", "!=", "<", ">", "<=", ">=", "|", "+", "-", ",", "and", "or"):
+                    return False
+                if token[0] == "name" and token[1] in ("and", "or", "div", "mod"):
+                    return False
+
+        return True
+
+    @classmethod
+    def absolute_paths(cls, xpath: str) -> list[str]:
+        """Find absolute paths (starting with / or //) inside predicates, which are evaluated against the whole sentence
+
+        Args:
+            xpath (str): the xpath query
+
+        Returns:
+            list[str]: the absolute paths, as they appear in the query
+        """
+
+        tokens = cls.tokenise(xpath)
+
+        paths = []
+        for opening, closing, _ in cls.predicates(tokens):
+            depth = 0
+            previous = tokens[opening]
+            for index in range(opening + 1, closing):
+                token = tokens[index]
+                if token[1] in ("[", "("):
+                    depth += 1
+                elif token[1] in ("]", ")"):
+                    depth -= 1
+
+                # A path starts at the beginning of an operand, i.e. after "[", "(", "," or an operator
+                starts_operand = previous[1] in ("[", "(", ",", "=", "!=", "<", ">", "<=", ">=", "|") or \
+                                 (previous[0] == "name" and previous[1] in ("and", "or"))
+                if depth == 0 and token[1] in ("/", "//") and starts_operand:
+                    # The path runs until the end of its term
+                    end = index
+                    term_depth = 0
+                    while end < closing:
+                        if tokens[end][1] in ("[", "("):
+                            term_depth += 1
+                        elif tokens[end][1] in ("]", ")"):
+                            term_depth -= 1
+                        elif term_depth == 0 and tokens[end][0] == "name" and tokens[end][1] in ("and", "or") and end > index:
+                            break
+                        end += 1
+
+                    paths.append(xpath[token[2]:tokens[end - 1][3]].strip())
+
+                previous = token
+
+        return paths
+
+    @classmethod
+    def hoist(cls, xpath: str) -> str:
+        """Move bare absolute paths out of the predicates of the last step of a relative query into a guard on the context node
+
+        Only "and"-joined terms of non-positional predicates are moved, so the rewritten query is equivalent to the original.
+
+        Args:
+            xpath (str): the normalised (relative) query
+
+        Returns:
+            str: the rewritten query, or the original query if nothing can be hoisted
+        """
+
+        tokens = cls.tokenise(xpath)
+
+        # Only single relative location paths can be rewritten
+        if len(tokens) < 2 or tokens[0][1] != "." or tokens[1][1] not in ("/", "//"):
+            return xpath
+
+        top_level = [ (opening, closing) for opening, closing, depth in cls.predicates(tokens) if depth == 0 ]
+        if len(top_level) == 0 or any(token[1] == "|" for token in cls.top_level_tokens(tokens)):
+            return xpath
+
+        # The predicates of the last step are the trailing top-level predicates
+        last_predicates = []
+        end = len(tokens)
+        for opening, closing in reversed(top_level):
+            if closing != end - 1:
+                break
+            last_predicates.insert(0, (opening, closing))
+            end = opening
+
+        hoisted = []
+        rewritten_predicates = []
+        for opening, closing in last_predicates:
+            inner = tokens[opening + 1:closing]
+            terms = cls.split_terms(inner, "and")
+
+            # Positional predicates depend on which terms they contain, leave them alone
+            positional = any(token[1] in ("position", "last") for token in inner) or \
+                         (len(inner) == 1 and inner[0][0] == "number") or \
+                         len(cls.split_terms(inner, "or")) > 1
+            if positional:
+                rewritten_predicates.append(xpath[tokens[opening][2]:tokens[closing][3]])
+                continue
+
+            kept = []
+            for term in terms:
+                if cls.is_absolute_path(term):
+                    hoisted.append(cls.text(xpath, term))
+                else:
+                    kept.append(cls.text(xpath, term))
+
+            if len(kept) > 0:
+                rewritten_predicates.append("[" + " and ".join(kept) + "]")
+
+        if len(hoisted) == 0:
+            return xpath
+
+        # Everything after the leading "." up to the predicates of the last step stays the same
+        steps = xpath[tokens[1][2]:tokens[end - 1][3]]
+        guard = " and ".join(hoisted)
+
+        return f"self::node()[{guard}]{steps}{''.join(rewritten_predicates)}"
+
+    @staticmethod
+    def top_level_tokens(tokens: list[tuple[str, str, int, int]]) -> list[tuple[str, str, int, int]]:
+        top_level = []
+        depth = 0
+        for token in tokens:
+            if token[1] in ("[", "("):
+                depth += 1
+            elif token[1] in ("]", ")"):
+                depth -= 1
+            elif depth == 0:
+                top_level.append(token)
+
+        return top_level
+
+    @classmethod
+    def selects_elements(cls, xpath: str) -> bool:
+        """Check whether a query can only return elements, without running it
+
+        Every branch of a union has to be a location path whose last step selects elements.
+        Queries which compute a value (count(...), comparisons, arithmetic) or which select attributes or text are rejected.
+
+        Args:
+            xpath (str): the xpath query
+
+        Returns:
+            bool: True if the query returns elements (or nothing)
+        """
+
+        for branch in cls.branches(xpath):
+            tokens = cls.tokenise(branch)
+
+            # Top-level tokens, function calls and parenthesised expressions become a single ("call", name) or ("group", text) token
+            top_level = []
+            depth = 0
+            for index, token in enumerate(tokens):
+                if token[1] in ("[", "("):
+                    if depth == 0 and token[1] == "(":
+                        if len(top_level) > 0 and top_level[-1][0] == "name" and top_level[-1][3] == token[2]:
+                            top_level[-1] = ("call", top_level[-1][1], top_level[-1][2], token[3])
+                        else:
+                            top_level.append(("group", "", token[3], token[3]))
+                    depth += 1
+                elif token[1] in ("]", ")"):
+                    depth -= 1
+                    if depth == 0 and token[1] == ")" and top_level[-1][0] == "group":
+                        top_level[-1] = ("group", branch[top_level[-1][2]:token[2]], top_level[-1][2], token[3])
+                elif depth == 0:
+                    top_level.append(token)
+
+            for position, token in enumerate(top_level):
+                if token[0] in ("string", "number", "variable") or token[1] in cls.VALUE_OPERATORS:
+                    return False
+
+                # "and", "or", "div" and "mod" are only names directly after a step separator
+                if token[0] == "name" and token[1] in ("and", "or", "div", "mod") and position > 0 and \
+                   top_level[position - 1][1] not in ("/", "//", "::", "@"):
+                    return False
+
+            # The last step decides what the query returns
+            separators = [ position for position, token in enumerate(top_level) if token[1] in ("/", "//") ]
+            step = top_level[separators[-1] + 1:] if len(separators) > 0 else top_level
+
+            # "/" on its own selects the document
+            if len(step) == 0 or step[0][1] == "@":
+                return False
+
+            if len(step) > 1 and step[1][1] == "::":
+                if step[0][1] in cls.NON_ELEMENT_AXES:
+                    return False
+
+                step = step[2:]
+
+            # node() also selects text and comments, the other node tests never select elements
+            # The parentheses of a node test may follow after whitespace, which makes them a group of their own
+            if len(step) > 0 and (step[0][1] == "node" or step[0][1] in cls.NON_ELEMENT_TESTS) and \
+               (step[0][0] == "call" or len(step) > 1 and step[1][0] == "group"):
+                return False
+
+            if len(step) == 1 and step[0][0] == "call":
+                # Function calls compute a value
+                return False
+
+            if len(step) == 1 and step[0][0] == "group" and not cls.selects_elements(step[0][1]):
+                return False
+
+        return True
+
+    @staticmethod
+    def text(xpath: str, tokens: list[tuple[str, str, int, int]]) -> str:
+        # The original text of a list of consecutive tokens
+        return xpath[tokens[0][2]:tokens[-1][3]].strip()
+
+    @staticmethod
+    def check_equivalence(original: str, rewritten: str, sentences: list[bytes]) -> list[int]:
+        """Check whether two xpath queries return the same nodes on sample sentences
+
+        Args:
+            original (str): the original (normalised) query
+            rewritten (str): the rewritten query
+            sentences (list[bytes]): the raw XML of sample <alpino_ds> elements
+
+        Returns:
+            list[int]: the positions of the sentences on which the queries do not return the same nodes
+        """
+
+        original_xpath = ET.XPath(original)
+        rewritten_xpath = ET.XPath(rewritten)
+
+        differences = []
+        for position, sentence in enumerate(sentences):
+            alpino_ds = ET.fromstring(sentence)
+            tree = alpino_ds.getroottree()
+
+            # Nodes are compared by their location in the tree
+            original_nodes = [ tree.getpath(node) for node in original_xpath(alpino_ds) ]
+            rewritten_nodes = [ tree.getpath(node) for node in rewritten_xpath(alpino_ds) ]
+
+            if original_nodes != rewritten_nodes:
+                differences.append(position)
+
+        return differences
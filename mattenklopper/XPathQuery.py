@@ -0,0 +1,74 @@
+from .CaseStudy import CaseStudy
+from .HitSchema import HitSchema
+from .XPathOptimiser import XPathOptimiser
+from lxml import etree as ET
+from typing import Iterator
+
+class XPathQuery(CaseStudy):
+    # Output columns and their types
+    SCHEMA = HitSchema({ "sentence": "text", "words": "string", "cat": "category", "rel": "category", "begin": "int", "end": "int",
+                         "file": "category", "sentence_id": "string" })
+
+    def filter(self, xpath: str, stream: bool=False) -> list[tuple] | Iterator[tuple]:
+        """Apply an arbitrary xpath (e.g. copied from GrETEL) and return every matched node
+
+        Args:
+            xpath (str): the xpath string which matches the desired syntactic phenomena
+            stream (bool): if True, return a generator which yields hits as they are found
+
+        Returns:
+            list[tuple] | Iterator[tuple]: list (or generator) of hits, with the columns of XPathQuery.SCHEMA
+        """
+
+        return super().filter(self.query(xpath), stream)
+
+    def query(self, xpath: str) -> str:
+        """Get the general xpath, which is the given xpath itself
+
+        Args:
+            xpath (str): the xpath string
+
+        Raises:
+            ValueError: if the xpath does not return elements (e.g. //node/@word or count(//node))
+
+        Returns:
+            str: the general xpath
+        """
+
+        # Every hit describes a node, attribute values and numbers cannot be described
+        if not XPathOptimiser.selects_elements(xpath):
+            raise ValueError(f"The xpath should return elements: {xpath}")
+
+        return xpath
+
+    def secondary_processing(self, element : ET, filename : str = "??.xml", sentence_id : str="??") -> tuple | None:
+        """Describe the matched node
+
+        Args:
+            element (ET): the matched node
+            filename (str): the name of the parsed file
+            sentence_id (str): the name of this sentence
+
+        Returns:
+            tuple | None: the words covered by the node, its category, its relation and its begin and end index,
+                or None if the xpath did not match an element (e.g. an attribute value)
+        """
+
+        if not isinstance(element, ET._Element):
+            return None
+
+        # The words of the leaves below the node, in sentence order
+        leaves = [ node for node in element.iter("node") if node.get("word") is not None ]
+        leaves.sort(key=lambda node: int(node.get("begin")))
+        words = " ".join(node.get("word") for node in leaves)
+
+        begin = element.get("begin")
+        end = element.get("end")
+
+        return words, element.get("cat", element.get("pos")), element.get("rel"), \
+               int(begin) if begin is not None else None, int(end) if end is not None else None
+
+    def record(self, sentence: str, filename: str, sentence_id: str, data: tuple) -> tuple:
+        words, cat, rel, begin, end = data
+
+        return sentence, words, cat, rel, begin, end, filename, sentence_id
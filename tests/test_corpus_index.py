@@ -0,0 +1,32 @@
+from mattenklopper.CorpusIndex import CorpusIndex
+from mattenklopper.SyntheticCorpus import SyntheticCorpus
+
+import pytest
+import shutil
+
+@pytest.fixture
+def corpus_directory(tmp_path):
+    directory = tmp_path / "corpus"
+    SyntheticCorpus().generate(str(directory), file_count=2, sentences_per_file=20)
+
+    return directory
+
+def test_unchanged_corpus_is_accepted(corpus_directory, tmp_path):
+    index = CorpusIndex.build(str(corpus_directory), str(tmp_path / "corpus.index"))
+
+    index.check(str(corpus_directory))
+
+@pytest.mark.parametrize("change", [ "added", "removed", "changed" ])
+def test_changed_corpus_is_refused(corpus_directory, tmp_path, change):
+    index = CorpusIndex.build(str(corpus_directory), str(tmp_path / "corpus.index"))
+    path = corpus_directory / "synthetic-00000.xml"
+
+    if change == "added":
+        shutil.copy(path, corpus_directory / "added.xml")
+    elif change == "removed":
+        path.unlink()
+    else:
+        path.write_bytes(path.read_bytes() + b"\n")
+
+    with pytest.raises(Exception, match="out of date"):
+        index.check(str(corpus_directory))
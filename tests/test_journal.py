@@ -0,0 +1,73 @@
+from mattenklopper.Journal import Journal
+from mattenklopper.RoodGroen import RoodGroen
+from mattenklopper.SyntheticCorpus import SyntheticCorpus
+
+import json
+import os
+import pytest
+
+with open("data/RoodGroen/closed_items.json", "rt") as reader:
+    CLOSED_CLASS_ITEMS = json.loads(reader.read())
+
+@pytest.fixture
+def corpus_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    directory = tmp_path / "corpus"
+    SyntheticCorpus(hit_density=0.5).generate(str(directory), file_count=4, sentences_per_file=30)
+
+    return directory
+
+def run(corpus_directory, journal_path: str=None, shard: set[str]=None) -> tuple[list[tuple], int]:
+    case_study = RoodGroen(str(corpus_directory), CLOSED_CLASS_ITEMS, workers=1, journal_path=journal_path, shard=shard)
+    hits = sorted(case_study.filter("red_green"))
+
+    return hits, case_study.statistics.counters.get("resumed_files", 0)
+
+def test_interrupted_run_is_resumed(corpus_directory, tmp_path):
+    journal_path = str(tmp_path / "run.journal")
+    hits, _ = run(corpus_directory)
+
+    # The interrupted run only finished half of the files
+    partial_hits, _ = run(corpus_directory, journal_path, { "synthetic-00000.xml", "synthetic-00001.xml" })
+    assert 0 < len(partial_hits) < len(hits)
+
+    assert run(corpus_directory, journal_path) == (hits, 2)
+    assert run(corpus_directory, journal_path) == (hits, 4)
+
+def test_changed_files_are_processed_again(corpus_directory, tmp_path):
+    journal_path = str(tmp_path / "run.journal")
+    run(corpus_directory, journal_path)
+
+    path = corpus_directory / "synthetic-00000.xml"
+    path.write_bytes(path.read_bytes() + b"\n")
+
+    assert run(corpus_directory, journal_path) == (run(corpus_directory)[0], 3)
+
+def test_cut_off_record_is_dropped(tmp_path):
+    journal_path = str(tmp_path / "run.journal")
+
+    journal = Journal(journal_path, "query")
+    journal.add("first", [ ("hit", 1) ])
+    journal.add("second", [ ("hit", 2) ])
+    journal.close()
+
+    # The process was killed while the last record was written
+    os.truncate(journal_path, os.path.getsize(journal_path) - 3)
+
+    journal = Journal(journal_path, "query")
+    assert "first" in journal and "second" not in journal
+
+    journal.add("second", [ ("hit", 3) ])
+    journal.close()
+
+    journal = Journal(journal_path, "query")
+    assert list(journal.replay([ "first", "second" ])) == [ [ ("hit", 1) ], [ ("hit", 3) ] ]
+    journal.close()
+
+def test_journal_of_another_query_is_refused(tmp_path):
+    journal_path = str(tmp_path / "run.journal")
+    Journal(journal_path, "query").close()
+
+    with pytest.raises(Exception, match="different query"):
+        Journal(journal_path, "other query")
@@ -0,0 +1,63 @@
+from flashtext import KeywordProcessor
+from mattenklopper.KeywordScanner import KeywordScanner
+from mattenklopper.RoodGroen import RoodGroen
+from mattenklopper.SentenceSplitter import SentenceSplitter
+from mattenklopper.SyntheticCorpus import SyntheticCorpus
+
+import json
+
+with open("data/RoodGroen/closed_items.json", "rt") as reader:
+    CLOSED_CLASS_ITEMS = json.loads(reader.read())
+
+def treebank(*sentences: str) -> bytes:
+    return ("<treebank>\n" + "".join(f'<alpino_ds version="1.3"><node id="0" word="heeft"/><sentence sentid="{position}">{sentence}</sentence></alpino_ds>\n'
+                                     for position, sentence in enumerate(sentences)) + "</treebank>\n").encode("utf-8")
+
+def sentence_ids(scanner: KeywordScanner, splitter: SentenceSplitter, *args) -> list[str]:
+    return [ splitter.sentence_id(start, end) for start, end in scanner.spans(splitter, *args) ]
+
+def test_keywords_are_whole_words_in_the_sentence_text():
+    splitter = SentenceSplitter(treebank("hij heeft gewerkt", "hij hebbende", "HEEFT hij?", "zonder", "Zij is weg"))
+
+    # The keyword in the word attribute of the first node does not count
+    assert sentence_ids(KeywordScanner([ "heeft", "is" ]), splitter) == [ "0", "2", "4" ]
+
+def test_no_keywords_match_nothing():
+    assert sentence_ids(KeywordScanner([]), SentenceSplitter(treebank("hij heeft gewerkt"))) == []
+
+def test_offsets_are_offsets_in_the_file():
+    buffer = treebank("hij heeft gewerkt", "zonder", "dat heeft hij")
+    spans = list(SentenceSplitter(buffer).spans())
+    scanner = KeywordScanner([ "heeft" ])
+
+    # Only part of the file, as read ahead for a byte range
+    start = spans[1][0]
+    splitter = SentenceSplitter(buffer[start:], start)
+
+    assert list(scanner.spans(splitter)) == [ spans[2] ]
+    assert list(scanner.spans(SentenceSplitter(buffer), spans[1][0], spans[1][1])) == []
+
+def test_same_candidates_as_the_keyword_processor():
+    keywords = [ keyword for keyword_list in CLOSED_CLASS_ITEMS.values() for keyword in keyword_list ]
+
+    corpus = SyntheticCorpus(hit_density=0.3)
+    splitter = SentenceSplitter(("<treebank>\n" + "".join(corpus.sentence(str(position)) for position in range(300)) + "</treebank>\n").encode("utf-8"))
+
+    keyword_processor = KeywordProcessor()
+    keyword_processor.add_keywords_from_list(keywords)
+    expected = [ (start, end) for start, end in splitter.spans() if len(keyword_processor.extract_keywords(splitter.sentence(start, end))) > 0 ]
+
+    assert len(expected) > 0
+    assert list(KeywordScanner(keywords).spans(splitter)) == expected
+
+def test_rejected_sentences_are_counted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    SyntheticCorpus(hit_density=0.3).generate(str(tmp_path / "corpus"), file_count=2, sentences_per_file=100)
+
+    case_study = RoodGroen(str(tmp_path / "corpus"), CLOSED_CLASS_ITEMS, workers=1)
+    hits = case_study.filter("red_green")
+    report = case_study.statistics.report()
+
+    assert report["sentences"] == 200
+    assert report["scanner_rejected"] > 0
+    assert report["prefilter_pass_rate"] == len(hits) / 200
@@ -0,0 +1,57 @@
+from concurrent.futures import Future
+from mattenklopper.CorpusFile import CorpusFile
+from mattenklopper.RoodGroen import RoodGroen
+from mattenklopper.SyntheticCorpus import SyntheticCorpus
+
+import gzip
+import json
+import pytest
+import shutil
+
+with open("data/RoodGroen/closed_items.json", "rt") as reader:
+    CLOSED_CLASS_ITEMS = json.loads(reader.read())
+
+@pytest.fixture
+def corpus_directory(tmp_path, monkeypatch):
+    # Sentences for which secondary processing fails are written to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    directory = tmp_path / "corpus"
+    paths = SyntheticCorpus(hit_density=0.5).generate(str(directory), file_count=3, sentences_per_file=200)
+
+    # One compressed file, the other files are large enough to be split into several ranges
+    with open(paths[0], "rb") as reader, gzip.open(str(paths[0]) + ".gz", "wb") as writer:
+        shutil.copyfileobj(reader, writer)
+    paths[0].unlink()
+
+    return directory
+
+def run(corpus_directory, **kwargs) -> list[tuple]:
+    case_study = RoodGroen(str(corpus_directory), CLOSED_CLASS_ITEMS, workers=1, split_size=16 * 1024, **kwargs)
+    return sorted(case_study.filter("red_green"))
+
+def test_read_ahead_gives_the_same_hits(corpus_directory):
+    hits = run(corpus_directory)
+
+    assert len(hits) > 0
+    assert run(corpus_directory, read_ahead=2) == hits
+    assert run(corpus_directory, read_ahead=2, read_ahead_size=1) == hits
+
+def test_read_ahead_contents_are_not_read_again(corpus_directory):
+    case_study = RoodGroen(str(corpus_directory), CLOSED_CLASS_ITEMS, workers=1)
+    case_study.prepare(case_study.query("red_green"))
+
+    for path in sorted(corpus_directory.iterdir()):
+        for file in CorpusFile(path).split(16 * 1024):
+            expected = case_study.filter_single(file)
+
+            contents = Future()
+            contents.set_result(file.load())
+
+            # The offsets of a range which was read ahead are offsets in the whole file
+            moved = path.with_name(path.name + ".moved")
+            path.rename(moved)
+            try:
+                assert case_study.filter_single(file, contents=contents) == expected
+            finally:
+                moved.rename(path)
@@ -0,0 +1,78 @@
+from mattenklopper.CorpusFile import CorpusFile
+from mattenklopper.ResultCache import ResultCache
+from mattenklopper.RoodGroen import RoodGroen
+from mattenklopper.SyntheticCorpus import SyntheticCorpus
+
+import json
+import os
+import pytest
+
+with open("data/RoodGroen/closed_items.json", "rt") as reader:
+    CLOSED_CLASS_ITEMS = json.loads(reader.read())
+
+@pytest.fixture
+def corpus_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    directory = tmp_path / "corpus"
+    SyntheticCorpus(hit_density=0.5).generate(str(directory), file_count=3, sentences_per_file=50)
+
+    return directory
+
+def run(corpus_directory, cache_directory, closed_class_items=CLOSED_CLASS_ITEMS) -> tuple[list[tuple], int]:
+    case_study = RoodGroen(str(corpus_directory), closed_class_items, workers=1, cache_directory=str(cache_directory))
+    hits = sorted(case_study.filter("red_green"))
+
+    return hits, case_study.statistics.counters.get("cached_files", 0)
+
+def test_key_depends_on_file_query_and_spans(corpus_directory):
+    file = CorpusFile(corpus_directory / "synthetic-00000.xml")
+    key = ResultCache.key(file, "query")
+
+    assert ResultCache.key(file, "query") == key
+    assert ResultCache.key(file, "other query") != key
+    assert ResultCache.key(file, "query", [ (0, 10) ]) != key
+    assert ResultCache.key(CorpusFile(corpus_directory / "synthetic-00001.xml"), "query") != key
+
+    # A changed file gets a new key, even if its size stays the same
+    stat = file.stat()
+    os.utime(file.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert ResultCache.key(file, "query") != key
+
+def test_unchanged_files_come_from_the_cache(corpus_directory, tmp_path):
+    cache_directory = tmp_path / "cache"
+
+    hits, cached_files = run(corpus_directory, cache_directory)
+    assert len(hits) > 0 and cached_files == 0
+
+    assert run(corpus_directory, cache_directory) == (hits, 3)
+
+def test_changed_files_and_queries_are_processed_again(corpus_directory, tmp_path):
+    cache_directory = tmp_path / "cache"
+    hits, _ = run(corpus_directory, cache_directory)
+
+    # Only the changed file is processed again
+    path = corpus_directory / "synthetic-00000.xml"
+    path.write_bytes(path.read_bytes() + b"\n")
+    assert run(corpus_directory, cache_directory) == (hits, 2)
+
+    # Other closed class items make a different query
+    closed_class_items = { name: items[:1] for name, items in CLOSED_CLASS_ITEMS.items() }
+    assert run(corpus_directory, cache_directory, closed_class_items)[1] == 0
+
+def test_evict_removes_the_least_recently_used_entries(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    keys = [ "aa01", "aa02", "bb03" ]
+    for position, key in enumerate(keys):
+        cache.put(key, [ ("hit",) ] * 100)
+        os.utime(cache.path(key), (position, position))
+
+    # Reading an entry marks it as recently used
+    cache.get("aa01")
+
+    # Room for two entries
+    cache.max_size = 2 * os.path.getsize(cache.path("aa01"))
+    cache.evict()
+
+    assert [ os.path.exists(cache.path(key)) for key in keys ] == [ True, False, True ]
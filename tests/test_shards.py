@@ -0,0 +1,64 @@
+from mattenklopper.HitSchema import HitSchema
+from mattenklopper.RoodGroen import RoodGroen
+from mattenklopper.Shards import Shards
+from mattenklopper.Sinks import CsvSink
+from mattenklopper.SyntheticCorpus import SyntheticCorpus
+
+import json
+import pandas as pd
+
+with open("data/RoodGroen/closed_items.json", "rt") as reader:
+    CLOSED_CLASS_ITEMS = json.loads(reader.read())
+
+SCHEMA = HitSchema({ "index": "int", "word": "string", "file": "category", "sentence_id": "string" })
+
+def write(output_path: str, schema: HitSchema, hits: list[tuple]) -> str:
+    with CsvSink(output_path, schema) as sink:
+        sink.write_all(hits)
+
+    return output_path
+
+def test_shards_cover_every_file_once(tmp_path):
+    SyntheticCorpus().generate(str(tmp_path / "corpus"), file_count=5, sentences_per_file=10)
+
+    shards = Shards.create(str(tmp_path / "corpus"), 2)
+
+    assert sorted(sum(shards.shards, [])) == [ f"synthetic-{number:05d}.xml" for number in range(5) ]
+    assert Shards.select(str(tmp_path / "corpus"), "2/2") == set(shards.shards[1])
+
+def test_integers_are_sorted_by_value(tmp_path):
+    first = write(str(tmp_path / "first.csv"), SCHEMA, [ (10, "b", "a.xml", "1"), (None, "a", "a.xml", "1") ])
+    second = write(str(tmp_path / "second.csv"), SCHEMA, [ (9, "c", "a.xml", "1"), (2, "d", "a.xml", "0") ])
+
+    count = Shards.merge([ second, first ], str(tmp_path / "merged.csv"), schema=SCHEMA)
+    merged = pd.read_csv(tmp_path / "merged.csv", keep_default_na=False, dtype=str)
+
+    assert count == 4
+    assert list(merged["word"]) == [ "d", "c", "b", "a" ]
+
+def test_duplicates_are_removed(tmp_path):
+    hits = [ (1, "a", "a.xml", "1"), (1, "b", "a.xml", "1") ]
+    first = write(str(tmp_path / "first.csv"), SCHEMA, hits)
+    second = write(str(tmp_path / "second.csv"), SCHEMA, hits)
+
+    assert Shards.merge([ first, second ], str(tmp_path / "merged.csv"), schema=SCHEMA, duplicate_columns=[ "sentence_id", "index" ]) == 1
+    assert list(pd.read_csv(tmp_path / "merged.csv", dtype=str)["word"]) == [ "a" ]
+
+def test_merged_shards_equal_a_single_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    corpus_directory = str(tmp_path / "corpus")
+    SyntheticCorpus(hit_density=0.5).generate(corpus_directory, file_count=4, sentences_per_file=30)
+
+    def run(shard: set[str] | None, output_path: str) -> str:
+        rood_groen = RoodGroen(corpus_directory, CLOSED_CLASS_ITEMS, workers=1, shard=shard)
+        return write(output_path, RoodGroen.SCHEMA, rood_groen.filter("red_green"))
+
+    shard_paths = [ run(Shards.select(corpus_directory, f"{number}/3"), str(tmp_path / f"shard{number}.csv")) for number in range(1, 4) ]
+    single_path = run(None, str(tmp_path / "single.csv"))
+
+    merged_count = Shards.merge(shard_paths, str(tmp_path / "merged.csv"), schema=RoodGroen.SCHEMA, duplicate_columns=RoodGroen.DUPLICATE_COLUMNS)
+    single_count = Shards.merge([ single_path ], str(tmp_path / "single-merged.csv"), schema=RoodGroen.SCHEMA, duplicate_columns=RoodGroen.DUPLICATE_COLUMNS)
+
+    assert merged_count == single_count > 0
+    assert (tmp_path / "merged.csv").read_text() == (tmp_path / "single-merged.csv").read_text()
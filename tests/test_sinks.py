@@ -0,0 +1,48 @@
+from mattenklopper.HitSchema import HitSchema
+from mattenklopper.Shards import Shards
+from mattenklopper.Sinks import CsvSink, ParquetSink
+
+import pandas as pd
+import pytest
+
+SCHEMA = HitSchema({ "sentence": "text", "word": "string", "lemma": "category", "index": "int" })
+
+# The first batch of two hits has no lemmas, no sentences and no indices
+HITS = [ (None, "gezien", None, None), (None, "gedaan", None, None),
+         ("hij heeft gezien", "gezien", "zien", 2), ("zij heeft gedaan", "gedaan", "doen", 10), ("het is gedaan", "gedaan", "doen", None) ]
+
+def test_csv_sink_writes_one_header(tmp_path):
+    with CsvSink(str(tmp_path / "hits.csv"), SCHEMA, batch_size=2) as sink:
+        assert sink.write_all(HITS) == len(HITS)
+
+    df = pd.read_csv(tmp_path / "hits.csv", keep_default_na=False, dtype=str)
+
+    assert list(df.columns) == SCHEMA.names
+    assert list(df["index"]) == [ "", "", "2", "10", "" ]
+
+def test_parquet_sink_keeps_the_declared_types(tmp_path):
+    pytest.importorskip("pyarrow")
+
+    with ParquetSink(str(tmp_path / "hits.parquet"), SCHEMA, batch_size=2) as sink:
+        assert sink.write_all(HITS) == len(HITS)
+
+    df = pd.read_parquet(tmp_path / "hits.parquet")
+
+    assert list(df.columns) == SCHEMA.names
+    assert isinstance(df["lemma"].dtype, pd.CategoricalDtype)
+    assert list(df["lemma"].astype("string")) == [ pd.NA, pd.NA, "zien", "doen", "doen" ]
+    assert list(df["word"]) == [ "gezien", "gedaan", "gezien", "gedaan", "gedaan" ]
+    assert list(df["index"].astype("Int64")) == [ pd.NA, pd.NA, 2, 10, pd.NA ]
+
+def test_parquet_shards_are_merged(tmp_path):
+    pytest.importorskip("pyarrow")
+
+    input_paths = []
+    for number, hits in enumerate([ HITS[:2], HITS[2:] ]):
+        with ParquetSink(str(tmp_path / f"shard{number}.parquet"), SCHEMA) as sink:
+            sink.write_all(hits)
+
+        input_paths.append(str(tmp_path / f"shard{number}.parquet"))
+
+    assert Shards.merge(input_paths, str(tmp_path / "merged.parquet"), "parquet", SCHEMA, batch_size=2) == len(HITS)
+    assert len(pd.read_parquet(tmp_path / "merged.parquet")) == len(HITS)
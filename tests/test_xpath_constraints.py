@@ -0,0 +1,46 @@
+from mattenklopper.CorpusIndex import CorpusIndex
+from mattenklopper.XPathConstraints import XPathConstraints
+from mattenklopper.XPathQuery import XPathQuery
+
+import pytest
+
+# The same sentence, serialised in different ways which are all valid XML
+SENTENCES = [ b'<alpino_ds version="1.3"><node begin="0" end="1" id="0" lemma="zien" rel="hd"/><sentence sentid="1">zien</sentence></alpino_ds>',
+              b"<alpino_ds version='1.3'><node begin='0' end='1' id='0' lemma='zien' rel='hd'/><sentence sentid='2'>zien</sentence></alpino_ds>",
+              b'<alpino_ds version="1.3"><node begin="0" end="1" id="0"\n\tlemma = "zien"\n\trel="hd"/><sentence sentid="3">zien</sentence></alpino_ds>' ]
+
+def test_constraints_follow_the_boolean_structure_of_the_xpath():
+    constraints = XPathConstraints('//node[@cat="ppart" and (@rel="vc" or @rel="body")]//node[@wvorm="vd"]')
+
+    assert constraints.expression == ("and", (("attribute", "cat", "ppart"),
+                                              ("or", (("attribute", "rel", "vc"), ("attribute", "rel", "body"))),
+                                              ("attribute", "wvorm", "vd")))
+
+@pytest.mark.parametrize("xpath", [ '//node[not(@cat="np")]', '//node[@begin > 3]', '//node[@pt="ww" or @cat]' ])
+def test_uninterpretable_terms_are_no_constraint(xpath):
+    assert XPathConstraints(xpath).expression is None
+
+@pytest.mark.parametrize("sentence", SENTENCES)
+def test_attributes_are_found_however_they_are_serialised(sentence):
+    assert XPathConstraints('//node[@lemma="zien"]').matches(sentence)
+    assert not XPathConstraints('//node[@lemma="zie"]').matches(sentence)
+    assert not XPathConstraints('//node[@emma="zien"]').matches(sentence)
+
+def test_quotes_inside_values():
+    assert XPathConstraints("""//node[@word='"']""").matches(b"""<node word='"'/>""")
+    assert XPathConstraints("""//node[@word='"']""").matches(b'<node word="&quot;"/>')
+
+def test_index_and_prefilter_keep_every_serialisation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    corpus_directory = tmp_path / "corpus"
+    corpus_directory.mkdir()
+    (corpus_directory / "quotes.xml").write_bytes(b"<treebank>\n" + b"\n".join(SENTENCES) + b"\n</treebank>\n")
+
+    index = CorpusIndex.build(str(corpus_directory), str(tmp_path / "corpus.index"))
+    candidates = list(index.candidates(str(corpus_directory), None, XPathConstraints('//node[@lemma="zien"]')))
+    assert len(candidates) == 1 and len(candidates[0][1]) == len(SENTENCES)
+
+    for index_path in [ None, str(tmp_path / "corpus.index") ]:
+        hits = XPathQuery(str(corpus_directory), workers=1, index_path=index_path).filter('//node[@lemma="zien"]')
+        assert sorted(hit[-1] for hit in hits) == [ "1", "2", "3" ]
@@ -0,0 +1,58 @@
+from mattenklopper.Constants import Constants
+from mattenklopper.SyntheticCorpus import SyntheticCorpus
+from mattenklopper.XPathOptimiser import XPathOptimiser
+
+import pytest
+import warnings
+
+@pytest.fixture(scope="module")
+def sentences() -> list[bytes]:
+    corpus = SyntheticCorpus(hit_density=0.5)
+    return [ corpus.sentence(str(sentence_id)).encode("utf-8") for sentence_id in range(200) ]
+
+def test_every_branch_of_a_union_is_made_relative():
+    assert XPathOptimiser.normalise('//node[@cat="np"] | //node[@cat="pp"]') == './/node[@cat="np"] | .//node[@cat="pp"]'
+
+    # Unions inside predicates and strings are not split
+    assert XPathOptimiser.normalise('//node[@rel="su" | @rel="obj1"]') == './/node[@rel="su" | @rel="obj1"]'
+    assert XPathOptimiser.normalise('//node[@word="|"]') == './/node[@word="|"]'
+
+def test_number_of_begin_is_rewritten():
+    assert XPathOptimiser.normalise("//node[number(@begin) < 3]") == ".//node[@begin < 3]"
+
+def test_absolute_paths_in_predicates_are_hoisted():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        optimised = XPathOptimiser.optimise('//node[@cat="ssub" and //node[@wvorm="vd"]]')
+
+    assert optimised == 'self::node()[//node[@wvorm="vd"]]//node[@cat="ssub"]'
+
+def test_absolute_paths_are_reported_once():
+    xpath = '//node[@cat="cp" and //node[@pt="vg"]]'
+
+    with pytest.warns(UserWarning, match="Absolute path"):
+        XPathOptimiser.optimise(xpath)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        XPathOptimiser.optimise(xpath)
+
+@pytest.mark.parametrize("name", list(Constants.GENERAL_XPATHS))
+def test_general_xpaths_are_equivalent(name, sentences):
+    xpath = Constants.GENERAL_XPATHS[name]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        optimised = XPathOptimiser.optimise(xpath)
+
+    assert XPathOptimiser.check_equivalence(XPathOptimiser.normalise(xpath), optimised, sentences) == []
+
+@pytest.mark.parametrize("xpath", [ '//node[@cat="ssub" and //node[@wvorm="vd"]]',
+                                    '//node[@rel="hd" and //node[@cat="ppart"] and //node[@lemma="hij"]]',
+                                    '//node[@cat="ppart"] | //node[@rel="vc" and //node[@pt="vg"]]' ])
+def test_hoisted_xpaths_are_equivalent(xpath, sentences):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        optimised = XPathOptimiser.optimise(xpath)
+
+    assert XPathOptimiser.check_equivalence(XPathOptimiser.normalise(xpath), optimised, sentences) == []
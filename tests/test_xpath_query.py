@@ -0,0 +1,18 @@
+from mattenklopper.XPathOptimiser import XPathOptimiser
+from mattenklopper.XPathQuery import XPathQuery
+
+import pytest
+
+@pytest.mark.parametrize("xpath", [ '//node[@cat="np"]', '//node[@cat="np"] | //node[@cat="pp"]/node', '//node[text()]',
+                                    '//node[@rel="hd"]/..', 'self::node()[//node[@wvorm="vd"]]//node[@cat="ssub"]' ])
+def test_element_queries_are_accepted(xpath):
+    assert XPathOptimiser.selects_elements(xpath)
+
+@pytest.mark.parametrize("xpath", [ "//node()", "//text()", "//comment()", "//processing-instruction()", "//node/text ()",
+                                    "//node/self::node()", '//node[@cat="np"] | //text()', "//node/@word", "count(//node)",
+                                    '//node[@cat="np"] = //node[@cat="pp"]' ])
+def test_other_queries_are_refused(xpath, tmp_path):
+    assert not XPathOptimiser.selects_elements(xpath)
+
+    with pytest.raises(ValueError, match="should return elements"):
+        XPathQuery(str(tmp_path), workers=1).query(xpath)